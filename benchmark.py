@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the conversion pipeline.
+
+Generates synthetic animations and times each stage of the
+conversion on them, writing the timings as JSON. With --compare, the
+timings are checked against a stored baseline and any stage that got
+slower than the threshold allows is reported as a regression.
+
+Example:
+```
+    python benchmark.py --sizes 10x10 64x64 --output baseline.json
+    python benchmark.py --sizes 10x10 64x64 --compare baseline.json
+```
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+from pathlib import Path
+from statistics import median
+from time import perf_counter, strftime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add the project root to the Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy
+from numpy import random, uint8
+from cv2 import imwrite
+
+from tvlib.comparator import (_nonzero, _realign, comparator, convert_dir,
+                              save_frames_json)
+from tvlib.sprites import sprite_to_array
+
+SIZES: Tuple[str, ...] = ("10x10", "32x32", "128x128")
+BENCHMARKS: Tuple[str, ...] = ("realign", "comparator", "nonzero",
+                               "save_frames_json", "sprite_to_array",
+                               "convert_dir")
+# Largest slowdown (as a fraction of the baseline) not flagged
+THRESHOLD: float = 0.25
+
+
+def synthetic_animation(width: int,
+                        height: int,
+                        frames: int,
+                        density: float = 0.1,
+                        seed: int = 0) -> numpy.ndarray:
+    """
+    Generate an animation in which a set fraction of pixels change.
+
+    The first frame lights about half of the pixels, like a typical
+    sprite on a black background. Every following frame recolors
+    `density` of the pixels, a quarter of them to black.
+
+    Args:
+        width: Frame width
+        height: Frame height
+        frames: Number of frames
+        density: Fraction of pixels changed from one frame to the next
+        seed: Seed for the random generator
+
+    Returns:
+        (frames, height, width, 3) uint8 array of BGR images
+    """
+    rng = random.default_rng(seed)
+    frame = rng.integers(1, 256, size=(height, width, 3), dtype=uint8)
+    frame[rng.random((height, width)) < 0.5] = 0
+
+    images = numpy.empty((frames, height, width, 3), dtype=uint8)
+    for n in range(frames):
+        images[n] = frame
+        changed = rng.random((height, width)) < density
+        colors = rng.integers(1, 256, size=(int(changed.sum()), 3), dtype=uint8)
+        colors[rng.random(len(colors)) < 0.25] = 0
+        frame = frame.copy()
+        frame[changed] = colors
+    return images
+
+
+def write_frames(images: numpy.ndarray, folder: str) -> None:
+    """
+    Write an animation as numbered PNG frames.
+    """
+    os.makedirs(folder, exist_ok=True)
+    for n, img in enumerate(images):
+        imwrite(os.path.join(folder, f"frame-{n:04d}.png"), img)
+
+
+def write_sheet(images: numpy.ndarray, file: str, columns: int = 8) -> None:
+    """
+    Tile an animation into a sprite sheet, row by row.
+    """
+    count, height, width, _ = images.shape
+    rows = -(-count // columns)
+    sheet = numpy.zeros((rows * height, columns * width, 3), dtype=uint8)
+    for n, img in enumerate(images):
+        y, x = divmod(n, columns)
+        sheet[y*height:(y+1)*height, x*width:(x+1)*width] = img
+    imwrite(file, sheet)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Time repeated calls of fn, after one warm-up call.
+    """
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    return {"min": min(times), "median": median(times), "repeat": repeat}
+
+
+def _benchmarks(images: numpy.ndarray,
+                root: str
+                ) -> Dict[str, Callable[[], Any]]:
+    """
+    The benchmarked calls for one synthetic animation, keyed by name.
+    """
+    _, height, width, _ = images.shape
+    realigned = [_realign(img, width, height) for img in images]
+    frames = comparator(images, width, height)
+
+    write_frames(images, os.path.join(root, "animations", "synthetic"))
+    sheet = os.path.join(root, "sheet.png")
+    write_sheet(images, sheet)
+
+    return {
+        "realign": lambda: [_realign(img, width, height) for img in images],
+        "comparator": lambda: comparator(images, width, height),
+        "nonzero": lambda: [_nonzero(frame) for frame in realigned],
+        "save_frames_json": lambda: save_frames_json(frames, "synthetic",
+                                                     (width, height)),
+        "sprite_to_array": lambda: sprite_to_array((width, height), sheet),
+        "convert_dir": lambda: convert_dir("synthetic", (width, height)),
+    }
+
+
+def run(sizes: List[Tuple[int, int]],
+        frames: int,
+        density: float,
+        repeat: int,
+        only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Run the benchmarks on a synthetic animation of each size.
+
+    Args:
+        sizes: (width, height) of each animation
+        frames: Frames per animation
+        density: Fraction of pixels changed per frame
+        repeat: Timed runs per benchmark
+        only: Names of the benchmarks to run, default all
+
+    Returns:
+        {"meta": {...}, "results": [{"benchmark", "case", "min",
+        "median", "repeat"}, ...]}, times in seconds
+    """
+    results = []
+    cwd = os.getcwd()
+    for width, height in sizes:
+        case = f"{width}x{height}x{frames}@{density}"
+        images = synthetic_animation(width, height, frames, density)
+        with tempfile.TemporaryDirectory() as root:
+            try:
+                os.chdir(root)
+                for name, fn in _benchmarks(images, root).items():
+                    if only and name not in only:
+                        continue
+                    timing = _time(fn, repeat)
+                    results.append({"benchmark": name, "case": case, **timing})
+                    print(f"{name:>18} {case:>20} "
+                          f"{1000 * timing['median']:10.3f} ms")
+            finally:
+                os.chdir(cwd)
+
+    return {
+        "meta": {
+            "time": strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "machine": platform.machine(),
+            "frames": frames,
+            "density": density,
+        },
+        "results": results,
+    }
+
+
+def compare(results: Dict[str, Any],
+            baseline: Dict[str, Any],
+            threshold: float = THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare results against a baseline run.
+
+    Args:
+        results: Output of `run`
+        baseline: Output of an earlier `run`
+        threshold: Largest slowdown not flagged, as a fraction
+
+    Returns:
+        One entry per benchmark found in both runs, with the "ratio"
+        of median times and whether it is a "regression"
+    """
+    before = {(r["benchmark"], r["case"]): r["median"]
+              for r in baseline["results"]}
+    report = []
+    for r in results["results"]:
+        key = (r["benchmark"], r["case"])
+        if key not in before:
+            continue
+        ratio = r["median"] / before[key] if before[key] > 0 else 1.0
+        report.append({"benchmark": r["benchmark"], "case": r["case"],
+                       "baseline": before[key], "median": r["median"],
+                       "ratio": ratio, "regression": ratio > 1 + threshold})
+    return report
+
+
+def _size(text: str) -> Tuple[int, int]:
+    """
+    Parse a WIDTHxHEIGHT argument.
+    """
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got {text}")
+    return (width, height)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="TV Head conversion benchmarks")
+    parser.add_argument("--sizes", type=_size, nargs="+",
+                        default=[_size(s) for s in SIZES],
+                        help="Animation sizes as WIDTHxHEIGHT "
+                             f"(default: {' '.join(SIZES)})")
+    parser.add_argument("--frames", type=int, default=30,
+                        help="Frames per animation (default: 30)")
+    parser.add_argument("--density", type=float, default=0.1,
+                        help="Fraction of pixels changed per frame (default: 0.1)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Timed runs per benchmark (default: 5)")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS,
+                        help="Benchmarks to run (default: all)")
+    parser.add_argument("--output", "-o",
+                        help="Write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="Flag regressions against a saved results file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="Slowdown flagged as a regression, as a fraction "
+                             f"(default: {THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    # Keep per-file conversion messages out of the timings table
+    logging.disable(logging.INFO)
+
+    results = run(args.sizes, args.frames, args.density, args.repeat, args.only)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    report = compare(results, baseline, args.threshold)
+    for r in report:
+        flag = "REGRESSION" if r["regression"] else "ok"
+        print(f"{r['benchmark']:>18} {r['case']:>20} "
+              f"{r['ratio']:6.2f}x  {flag}")
+    regressions = sum(r["regression"] for r in report)
+    print(f"{regressions} regression(s) in {len(report)} benchmarks")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,12 +11,17 @@ import sys
 import argparse
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple
 
 from controller import TVHeadController, ImageSettings
 from tvlib._config import Config
-from tvlib.comparator import convert_all, convert_dir
+from tvlib.comparator import (convert_all, convert_dir, convert_video,
+                              build_frame_store)
 from tvlib.transformations import Rotation, Flip
+from tvlib._fileio import OutputFormat
+from tvlib.encoding import Encoding, MAX_PALETTE
+from tvlib._profile import Profile, format_profiles, profiling, write_profiles
+from tvlib._watch import watch
 
 
 def setup_logging(verbose: bool = False) -> None:
@@ -45,7 +50,27 @@ def configure_settings() -> Optional[ImageSettings]:
         return None
 
 
-def convert_animations(settings: ImageSettings, target_dir: Optional[str] = None) -> bool:
+def tile_size(text: str) -> Tuple[int, int]:
+    """Parse a WIDTHxHEIGHT tile size argument."""
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got {text}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"Tile size must be positive, got {text}")
+    return (width, height)
+
+
+def convert_animations(settings: ImageSettings,
+                       target_dir: Optional[str] = None,
+                       stream: bool = False,
+                       jobs: int = 1,
+                       workers: Optional[int] = None,
+                       cache: bool = True,
+                       formats: Sequence[OutputFormat] = (OutputFormat.JSON,),
+                       encoding: Optional[Encoding] = None,
+                       profiles: Optional[List[Profile]] = None,
+                       tile: Optional[Tuple[int, int]] = None) -> bool:
     """Convert animation frames based on settings."""
     try:
         if not settings.resolution:
@@ -54,11 +79,22 @@ def convert_animations(settings: ImageSettings, target_dir: Optional[str] = None
             
         if target_dir:
             logging.info(f"Converting animations in directory: {target_dir}")
-            result = convert_dir(target_dir, settings.resolution, settings.rotation, settings.flip)
+            with profiling(target_dir) as profile:
+                result = convert_dir(target_dir, settings.resolution,
+                                     settings.rotation, settings.flip,
+                                     stream=stream, workers=workers,
+                                     formats=formats, encoding=encoding,
+                                     tile_size=tile)
+            if profiles is not None:
+                profiles.append(profile)
             success = result is not None
         else:
             logging.info("Converting all animations")
-            success = convert_all(settings.resolution, settings.rotation, settings.flip)
+            success = convert_all(settings.resolution, settings.rotation, settings.flip,
+                                  stream=stream, jobs=jobs, workers=workers,
+                                  cache=cache, formats=formats,
+                                  encoding=encoding, profiles=profiles,
+                                  tile_size=tile)
         
         if success:
             logging.info("Animation conversion completed successfully")
@@ -94,7 +130,159 @@ def main() -> int:
     parser.add_argument(
         "--convert-dir", "-d",
         metavar="DIR",
-        help="Convert animations in specific directory"
+        help="Convert animations in specific directory, or a sprite sheet, "
+             "video or GIF in animations/"
+    )
+    
+    parser.add_argument(
+        "--convert-video",
+        metavar="FILE",
+        help="Convert a video or GIF from anywhere, streaming its frames"
+    )
+    
+    parser.add_argument(
+        "--tile",
+        type=tile_size,
+        default=None,
+        metavar="WxH",
+        help="Tile size of sprite sheets (default: the configured resolution)"
+    )
+    
+    parser.add_argument(
+        "--watch", "-w",
+        action="store_true",
+        help="Convert all animations, then keep reconverting the folders "
+             "that change until interrupted"
+    )
+    
+    parser.add_argument(
+        "--frame-store",
+        action="store_true",
+        help="Build the shared frame store of every animation's unique frames, "
+             "as plain full frames (json and/or tvb; no encoding options)"
+    )
+    
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Convert one frame at a time to keep memory use flat"
+    )
+    
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Convert folders in N parallel processes (0 = all cores, default: 1)"
+    )
+    
+    parser.add_argument(
+        "--decode-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Threads used to decode frame images (default: based on CPU count)"
+    )
+    
+    parser.add_argument(
+        "--force", "-f",
+        action="store_true",
+        help="Rebuild every animation, ignoring the build cache"
+    )
+    
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=[fmt.value for fmt in OutputFormat],
+        default=[OutputFormat.JSON.value],
+        metavar="FORMAT",
+        help="Output formats to write: json, tvb and/or py, a frozen "
+             "MicroPython module of the .tvb data (default: json)"
+    )
+    
+    parser.add_argument(
+        "--keyframes",
+        type=int,
+        default=None,
+        metavar="K",
+        help="Store each frame as a diff or a full keyframe, whichever is "
+             "smaller, forcing a keyframe every K frames (0 = never force)"
+    )
+    
+    parser.add_argument(
+        "--spans",
+        action="store_true",
+        help="Store runs of consecutive changed pixels as spans"
+    )
+    
+    parser.add_argument(
+        "--palette",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Store palette indices instead of colors, quantizing to at most "
+             "N colors (2-256; 0 = the animation's own colors, up to 256)"
+    )
+    
+    parser.add_argument(
+        "--hold",
+        action="store_true",
+        help="Fold repeated frames into one frame with a duration"
+    )
+    
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=0,
+        metavar="T",
+        help="Leave out pixel changes of at most T (0-255) from what is "
+             "already displayed"
+    )
+    
+    parser.add_argument(
+        "--perceptual",
+        action="store_true",
+        help="Measure --tolerance with a perceptual color distance instead "
+             "of the largest per-channel change"
+    )
+    
+    parser.add_argument(
+        "--brightness",
+        type=float,
+        nargs="+",
+        default=None,
+        metavar="B",
+        help="Brightness (0-1) the device plays at: store LED values at B, "
+             "or give a range B_MIN B_MAX to only drop changes invisible "
+             "across it"
+    )
+    
+    parser.add_argument(
+        "--gamma",
+        type=float,
+        default=1.0,
+        help="Gamma to apply to colors before brightness (default: 1.0)"
+    )
+    
+    parser.add_argument(
+        "--fps",
+        type=float,
+        default=None,
+        help="Frame rate the frames are timed at, recorded in the JSON; "
+             "videos are sampled at it (default: the video's own rate)"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time spent decoding, realigning, diffing and "
+             "serializing each folder"
+    )
+    
+    parser.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="Append the --profile breakdown to FILE as JSON lines"
     )
     
     parser.add_argument(
@@ -129,7 +317,8 @@ def main() -> int:
             return 1
     
     # Handle conversion modes
-    if args.convert_all or args.convert_dir:
+    if (args.convert_all or args.convert_dir or args.convert_video
+            or args.frame_store or args.watch):
         if not settings:
             # Use default settings if not configured interactively
             settings = ImageSettings()
@@ -139,20 +328,100 @@ def main() -> int:
                 logging.error(f"Configuration error: {e}")
                 return 1
         
+        formats = [OutputFormat(fmt) for fmt in args.formats]
+        brightness = args.brightness or [None]
+        if (len(brightness) > 2 or args.gamma <= 0
+                or (args.brightness and not 0 < brightness[0] <= brightness[-1] <= 1)):
+            logging.error("Brightness must be B or B_MIN B_MAX within (0, 1], "
+                          "and gamma above 0")
+            return 1
+        if args.fps is not None and args.fps <= 0:
+            logging.error("Frame rate must be above 0")
+            return 1
+        if args.palette is not None and not (args.palette == 0
+                                             or 2 <= args.palette <= MAX_PALETTE):
+            logging.error(f"Palette size must be 0 or 2-{MAX_PALETTE}")
+            return 1
+        if args.frame_store:
+            # The store holds plain full frames addressed by id
+            unsupported = [flag for flag, used in (
+                ("--keyframes", args.keyframes is not None),
+                ("--spans", args.spans),
+                ("--palette", args.palette is not None),
+                ("--hold", args.hold),
+                ("--tolerance", args.tolerance != 0),
+                ("--brightness", args.brightness is not None),
+                ("--gamma", args.gamma != 1.0),
+                ("--formats py", OutputFormat.PY in formats)) if used]
+            if unsupported:
+                logging.error("--frame-store writes plain full frames as json "
+                              "and/or tvb and cannot be combined with "
+                              f"{', '.join(unsupported)}")
+                return 1
+        encoding = Encoding(keyframe_interval=args.keyframes, spans=args.spans,
+                            palette=args.palette, hold=args.hold,
+                            tolerance=args.tolerance,
+                            perceptual=args.perceptual,
+                            brightness=brightness[0],
+                            max_brightness=brightness[1] if len(brightness) > 1 else None,
+                            gamma=args.gamma, fps=args.fps)
+        profiles = [] if args.profile or args.profile_json else None
         success = False
-        if args.convert_all:
-            success = convert_animations(settings)
+        if args.convert_all or args.watch:
+            success = convert_animations(settings, stream=args.stream, jobs=args.jobs,
+                                         workers=args.decode_workers,
+                                         cache=not args.force,
+                                         formats=formats, encoding=encoding,
+                                         profiles=profiles, tile=args.tile)
         elif args.convert_dir:
             if not Path(f"animations/{args.convert_dir}").exists():
                 logging.error(f"Directory not found: animations/{args.convert_dir}")
                 return 1
-            success = convert_animations(settings, args.convert_dir)
+            success = convert_animations(settings, args.convert_dir, args.stream,
+                                         workers=args.decode_workers,
+                                         formats=formats, encoding=encoding,
+                                         profiles=profiles, tile=args.tile)
+        elif args.convert_video:
+            if not Path(args.convert_video).is_file():
+                logging.error(f"Video not found: {args.convert_video}")
+                return 1
+            with profiling(args.convert_video) as profile:
+                success = convert_video(args.convert_video,
+                                        Path(args.convert_video).stem,
+                                        settings.resolution, settings.rotation,
+                                        settings.flip, formats,
+                                        encoding) is not None
+            if profiles is not None:
+                profiles.append(profile)
+        else:
+            success = True
+
+        if profiles:
+            print(format_profiles(profiles))
+            if args.profile_json:
+                write_profiles(args.profile_json, profiles)
+
+        if success and args.frame_store:
+            success = build_frame_store(settings.resolution, settings.rotation,
+                                        settings.flip, args.decode_workers,
+                                        formats) is not None
+
+        if args.watch:
+            watch(lambda changed: convert_all(settings.resolution,
+                                              settings.rotation, settings.flip,
+                                              stream=args.stream, jobs=args.jobs,
+                                              workers=args.decode_workers,
+                                              cache=True, formats=formats,
+                                              encoding=encoding,
+                                              tile_size=args.tile,
+                                              only=changed))
         
         if not success:
             return 1
     
     # If no specific action was requested, run configuration
-    if not any([args.configure, args.convert_all, args.convert_dir]):
+    if not any([args.configure, args.convert_all, args.convert_dir,
+                args.convert_video, args.frame_store, args.watch]):
         settings = configure_settings()
         if not settings:
             return 1
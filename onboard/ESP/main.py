@@ -8,8 +8,9 @@ https://rose.systems/tv_head/
 from machine import Pin, UART, freq
 from neopixel import NeoPixel
 from time import sleep_ms
-from os import listdir, ilistdir, statvfs
+from os import ilistdir, statvfs
 from random import randint
+from tvb import load_animation
 import gc
 
 
@@ -42,8 +43,10 @@ SPEED = "Speed"
 # Variable to keep running script or not.
 RUNNING: bool = True
 
-# Folder for animation csvs
-ANIMATION_FOLDER: str = "/csvs/"
+# Folder for .tvb animations
+ANIMATION_FOLDER: str = "/tvb/"
+# Folder for animation csvs, played when there is no .tvb folder
+CSV_FOLDER: str = "/csvs/"
 
 # Pin number to address
 P = 21
@@ -70,10 +73,16 @@ debug(f"-> Current speed is: {(freq()/1000000):.3f} MHZ")
 
 def get_animation_paths(folder_path: str = ANIMATION_FOLDER) -> tuple[str]:
     """
-    Get a tuple of the animation folder paths.
+    Get a tuple of the .tvb animation file paths, or of the CSV
+    animation folder paths on boards flashed without a .tvb folder.
     """
-    return tuple(ANIMATION_FOLDER+file[0]
-                 for file in ilistdir(folder_path) if file[1] == 0x4000)
+    try:
+        return tuple(ANIMATION_FOLDER+file[0]
+                     for file in ilistdir(folder_path)
+                     if file[1] == 0x8000 and file[0].endswith('.tvb'))
+    except OSError:
+        return tuple(CSV_FOLDER+file[0]
+                     for file in ilistdir(CSV_FOLDER) if file[1] == 0x4000)
 
 
 animation_paths = get_animation_paths()
@@ -87,33 +96,6 @@ values: dict[str, float | int] = {
 }
 
 
-def read_frames(folder_path: str) -> tuple[tuple[tuple[int, int, int, int]]]:
-    """
-    Read the frames within a given animation folder and return it
-    as a tuple[index, r, g, b] of ints.
-    """
-    def assemble(filename: str) -> tuple[tuple[int, int, int, int]]:
-        frame: tuple[tuple[int, int, int, int]] = None
-        with open(filename, 'r', encoding="utf-8") as csvfile:
-            """
-            Skip the first line so we can directly
-            convert each line to tuple[int, int, int, int].
-            """
-            next(csvfile)
-            frame = tuple((int(i), int(a), int(b), int(c))
-                          for i, a, b, c in (
-                              line.rstrip('\n').rstrip('\r').split(",")
-                              for line in csvfile))
-
-        return frame
-
-    frames = tuple(assemble("/".join([folder_path, filename]))
-                   for filename in listdir(folder_path)
-                   if filename.endswith('.csv'))
-
-    return frames
-
-
 def clear() -> None:
     """
     Clear the display.
@@ -147,17 +129,17 @@ def free(full=False) -> str:
         return ('Total:{0} Free:{1} ({2})'.format(T, F, P))
 
 
-def animate(frames: tuple[tuple[tuple[int, int, int, int]]]) -> None:
+def animate(animation) -> None:
     """
     Play frames with a set time interval in ms.
+    Frames are read from flash one at a time.
     """
     global display
     b = values["Brightness"]
-    for frame in frames:
-        for p in frame:
-            display[p[0]] = int(p[3]*b), int(p[2]*b), int(p[1]*b)
+    for k in range(len(animation)):
+        hold = animation.draw(k, display, b)
         display.write()
-        sleep_ms(int(values["Speed"]*20))
+        sleep_ms(int(values["Speed"]*20) * hold)
 
 
 def main() -> None:
@@ -165,8 +147,9 @@ def main() -> None:
     global values
     global RUNNING
 
-    # Pre-load animations in a tuple.
-    animations = tuple(read_frames(folder) for folder in animation_paths)
+    # Open .tvb animations for streaming; only headers stay in memory.
+    # CSV animations are read into memory whole.
+    animations = tuple(load_animation(path) for path in animation_paths)
 
     debug(free())
 
@@ -1,5 +1,6 @@
 from micropython import const
-from os import listdir, ilistdir
+from os import ilistdir
+from tvb import load_animation
 
 
 # If debug is True, our debug lines throughtout the code will print.
@@ -32,8 +33,10 @@ BRIGHTNESS: str = const("Brightness")
 CHANNEL: str = const("Channel")
 SPEED: str = const("Speed")
 
-# Folder for animation csvs
-ANIMATION_FOLDER: str = "/csvs/"
+# Folder for .tvb animations
+ANIMATION_FOLDER: str = "/tvb/"
+# Folder for animation csvs, played when there is no .tvb folder
+CSV_FOLDER: str = "/csvs/"
 
 # Pin number to address
 P: int = const(16)
@@ -51,40 +54,20 @@ RENDER_VALUES: dict[str, int | float] = {
 def get_animation_paths(folder_path: str = ANIMATION_FOLDER) -> tuple[str]:
     global ANIMATION_FOLDER
     """
-    Get a tuple of the animation folder paths.
+    Get a tuple of the .tvb animation file paths, or of the CSV
+    animation folder paths on boards flashed without a .tvb folder.
     """
-    return tuple(ANIMATION_FOLDER+file[0]
-                 for file in ilistdir(folder_path) if file[1] == 0x4000)
+    try:
+        return tuple(ANIMATION_FOLDER+file[0]
+                     for file in ilistdir(folder_path)
+                     if file[1] == 0x8000 and file[0].endswith('.tvb'))
+    except OSError:
+        return tuple(CSV_FOLDER+file[0]
+                     for file in ilistdir(CSV_FOLDER) if file[1] == 0x4000)
 
 
-def read_frames(folder_path: str) -> tuple[tuple[tuple[int, int, int, int]]]:
-    """
-    Read the frames within a given animation
-    folder and return it as a tuple[index, r, g, b] of ints.
-    """
-    def assemble(filename: str) -> tuple[tuple[int, int, int, int]]:
-        frame: tuple[tuple[int, int, int, int]] = None
-        with open(filename, 'r', encoding="utf-8") as csvfile:
-            """
-            Skip the first line so we can directly convert
-            each line to tuple[int, int, int, int].
-            """
-            next(csvfile)
-            frame = tuple((int(i), int(a), int(b), int(c))
-                          for i, a, b, c in
-                          (line.rstrip('\n').rstrip('\r').split(",")
-                           for line in csvfile))
-
-        return frame
-
-    frames = tuple(assemble("/".join([folder_path, filename]))
-                   for filename in listdir(folder_path)
-                   if filename.endswith('.csv'))
-
-    return frames
-
-
-# Pre-load animations in a tuple.
+# Open .tvb animations for streaming; frames are read from flash as they
+# play. CSV animations are read into memory whole.
 animation_paths = get_animation_paths()
 animation_amount = len(animation_paths)
-animations = tuple(read_frames(folder) for folder in animation_paths)
+animations = tuple(load_animation(path) for path in animation_paths)
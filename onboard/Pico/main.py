@@ -39,17 +39,16 @@ async def read_gyro():
             await asyncio.sleep_ms(50)
 
 
-async def render(frames: tuple[tuple[tuple[int, int, int, int]]]) -> bool:
+async def render(animation) -> bool:
 
     b = RENDER_VALUES[BRIGHTNESS]
     ch = RENDER_VALUES[CHANNEL]
-    for frame in frames:
-        for p in frame:
-            if RENDER_VALUES[CHANNEL] != ch or RENDER_VALUES[BRIGHTNESS] != b:
-                return 1
-            display[p[0]] = int(p[3]*b), int(p[2]*b), int(p[1]*b)
+    for k in range(len(animation)):
+        if RENDER_VALUES[CHANNEL] != ch or RENDER_VALUES[BRIGHTNESS] != b:
+            return 1
+        hold = animation.draw(k, display, b)
         display.write()
-        await asyncio.sleep_ms(int(RENDER_VALUES[SPEED]*100))
+        await asyncio.sleep_ms(int(RENDER_VALUES[SPEED]*100) * hold)
     return 0
 
 
@@ -0,0 +1,487 @@
+"""
+Streaming player for .tvb animations (see tvlib/_binary.py).
+
+Copy this file next to main.py on the board. Only the header, the
+frame offset table (4 bytes per frame) and a single frame buffer are
+kept in RAM; every frame is read from flash when it is drawn.
+
+Span files (FLAG_SPANS) are drawn a span at a time, straight into
+the NeoPixel byte buffer with one slice assignment per span. Palette
+files (FLAG_PALETTE) store a palette index per pixel, expanded through
+a lookup table of ready-scaled NeoPixel bytes. Files baked for a
+brightness (FLAG_BAKED) already hold LED values, so drawing them at
+that brightness skips the float multiply altogether.
+
+Animations frozen into the firmware as modules (`--formats py`) are
+played with `open_frozen`. Their bytes constant already sits in flash,
+so the offset table and every frame are read through memoryview
+slices of it and nothing is copied into RAM.
+
+Boards still flashed with a /csvs/ folder of CSV frames instead of
+.tvb files are played with `open_csv`, which loads every frame into
+RAM as before.
+
+Works under CPython too, with any binary file object standing in
+for a file on flash.
+"""
+
+try:
+    from ustruct import unpack
+except ImportError:
+    from struct import unpack
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+from array import array
+from os import listdir
+
+MAGIC = b"TVB1"
+FORMAT_VERSION = 2
+FLAG_WIDE = 0x01
+FLAG_SPANS = 0x02
+FLAG_PALETTE = 0x04
+FLAG_NIBBLES = 0x08
+FLAG_HOLD = 0x10
+FLAG_BAKED = 0x20
+BRIGHTNESS_SCALE = 10000
+TYPE_FULL = 1
+TYPE_MIXED = 2
+KIND_KEY = 0x01
+
+HEADER_FORMAT = "<4sBBHHIBBBII"
+HEADER_SIZE = 25
+
+
+class Animation:
+    """
+    A .tvb animation played straight from a file.
+    """
+
+    def __init__(self, f) -> None:
+        self.f = f
+        # Frozen data is sliced in place instead of read
+        self.data = getattr(f, "data", None)
+        (magic, version, flags, self.width, self.height, self.frame_count,
+         self.color_format, self.frame_type, name_length, max_frame,
+         index_offset) = unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a supported TVB file")
+
+        self.name = f.read(name_length).decode()
+        self.baked = 0
+        if flags & FLAG_BAKED:
+            b = f.read(2)
+            self.baked = (b[0] | b[1] << 8) / BRIGHTNESS_SCALE
+        self.wide = flags & FLAG_WIDE
+        self.spans = flags & FLAG_SPANS
+        self.nibbles = flags & FLAG_NIBBLES
+        self.palette = None
+        if flags & FLAG_PALETTE:
+            self.palette = f.read(3 * (f.read(1)[0] + 1))
+        self._lut_key = None
+        self._lut_bytes = None
+        self.index_offset = index_offset
+        # Frames start with a kind byte in mixed files, then a duration
+        # in hold files
+        self.duration_at = 1 if self.frame_type == TYPE_MIXED else 0
+        self.start = self.duration_at + (2 if flags & FLAG_HOLD else 0)
+
+        if self.data is not None:
+            self.offsets = self.data[index_offset:
+                                     index_offset + 4 * self.frame_count]
+            self.buffer = self.data[:0]
+            return
+
+        f.seek(index_offset)
+        self.offsets = bytearray(4 * self.frame_count)
+        f.readinto(self.offsets)
+
+        self.buffer = bytearray(max_frame)
+        self.view = memoryview(self.buffer)
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def _offset(self, k: int) -> int:
+        o = self.offsets
+        i = 4 * k
+        return o[i] | o[i+1] << 8 | o[i+2] << 16 | o[i+3] << 24
+
+    def _word(self, i: int) -> int:
+        buf = self.buffer
+        if self.wide:
+            return buf[i] | buf[i+1] << 8 | buf[i+2] << 16 | buf[i+3] << 24
+        return buf[i] | buf[i+1] << 8
+
+    def read_frame(self, k: int) -> int:
+        """
+        Read frame k into the shared buffer and return its pixel count
+        (its span count in a span file).
+        """
+        start = self._offset(k)
+        if k + 1 < self.frame_count:
+            end = self._offset(k + 1)
+        else:
+            end = self.index_offset
+
+        if self.data is not None:
+            self.buffer = self.data[start:end]
+        else:
+            self.f.seek(start)
+            self.f.readinto(self.view[:end - start])
+
+        return self._word(self.start)
+
+    def duration(self) -> int:
+        """
+        Number of frame times the frame last read stays on the display.
+        """
+        if self.start == self.duration_at:
+            return 1
+        d = self.duration_at
+        return self.buffer[d] | self.buffer[d+1] << 8
+
+    def is_key(self) -> bool:
+        """
+        Whether the frame last read clears the display before it is drawn.
+        """
+        if self.frame_type == TYPE_MIXED:
+            return bool(self.buffer[0] & KIND_KEY)
+        return self.frame_type == TYPE_FULL
+
+    def _value(self, c: int, n: int) -> int:
+        """
+        Palette index of the n-th color stored from offset c.
+        """
+        if self.nibbles:
+            return self.buffer[c + (n >> 1)] >> (4 * (n & 1)) & 0x0F
+        return self.buffer[c + n]
+
+    def _color(self, c: int, n: int):
+        """
+        (b, g, r) of the n-th color stored from offset c.
+        """
+        if self.palette is None:
+            buf = self.buffer
+            o = c + 3 * n
+        else:
+            buf = self.palette
+            o = 3 * self._value(c, n)
+        return buf[o], buf[o+1], buf[o+2]
+
+    def _color_size(self, n: int) -> int:
+        """
+        Bytes taken by n colors.
+        """
+        if self.palette is None:
+            return 3 * n
+        if self.nibbles:
+            return (n + 1) >> 1
+        return n
+
+    def _scale(self, brightness: float):
+        """
+        Factor to multiply stored levels by at a brightness, or None
+        to write them as they are. Baked files are never drawn
+        brighter than they were baked for.
+        """
+        if self.baked:
+            if brightness >= self.baked:
+                return None
+            return brightness / self.baked
+        if brightness == 1.0:
+            return None
+        return brightness
+
+    def _lut(self, display, scale) -> bytes:
+        """
+        The palette as scaled NeoPixel bytes, rebuilt when the
+        scale changes.
+        """
+        key = (scale, display.bpp, tuple(display.ORDER))
+        if self._lut_key != key:
+            bpp = display.bpp
+            order = display.ORDER
+            pal = self.palette
+            s = 1.0 if scale is None else scale
+            lut = bytearray(bpp * (len(pal) // 3))
+            for p in range(len(pal) // 3):
+                o = bpp * p
+                lut[o+order[0]] = int(pal[3*p+2]*s)
+                lut[o+order[1]] = int(pal[3*p+1]*s)
+                lut[o+order[2]] = int(pal[3*p]*s)
+            self._lut_bytes = bytes(lut)
+            self._lut_key = key
+        return self._lut_bytes
+
+    def _entries(self, count: int):
+        """
+        Yield (index, b, g, r) for each pixel of the frame in the buffer.
+        """
+        buf = self.buffer
+        size = 4 if self.wide else 2
+        head = self.start + size
+        colors = head + size * count
+        for n in range(count):
+            i = head + size * n
+            index = buf[i] | buf[i+1] << 8
+            if self.wide:
+                index |= buf[i+2] << 16 | buf[i+3] << 24
+            b, g, r = self._color(colors, n)
+            yield index, b, g, r
+
+    def _spans(self, count: int):
+        """
+        Yield (start, length, solid, color offset) for each span of the
+        frame in the buffer.
+        """
+        size = 4 if self.wide else 2
+        solid_bit = 0x80000000 if self.wide else 0x8000
+        i = self.start + size
+        for _ in range(count):
+            start = self._word(i)
+            length = self._word(i + size)
+            i += 2 * size
+            solid = length & solid_bit
+            if solid:
+                length ^= solid_bit
+            yield start, length, solid, i
+            if solid:
+                i += 3 if self.palette is None else 1
+            else:
+                i += self._color_size(length)
+
+    def _span_entries(self, count: int):
+        for start, length, solid, c in self._spans(count):
+            for n in range(length):
+                b, g, r = self._color(c, 0 if solid else n)
+                yield start + n, b, g, r
+
+    def pixels(self, k: int):
+        """
+        Yield (index, b, g, r) for each pixel of frame k.
+        """
+        count = self.read_frame(k)
+        if self.spans:
+            return self._span_entries(count)
+        return self._entries(count)
+
+    def _draw_spans(self, count: int, display, scale) -> None:
+        """
+        Write each span into the NeoPixel byte buffer with one slice
+        assignment.
+        """
+        buf = self.buffer
+        out = display.buf
+        bpp = display.bpp
+        if self.palette is not None:
+            lut = self._lut(display, scale)
+            for start, length, solid, c in self._spans(count):
+                if solid:
+                    p = bpp * buf[c]
+                    out[bpp*start:bpp*(start+length)] = lut[p:p+bpp] * length
+                else:
+                    run = bytearray(bpp * length)
+                    for n in range(length):
+                        p = bpp * self._value(c, n)
+                        run[bpp*n:bpp*(n+1)] = lut[p:p+bpp]
+                    out[bpp*start:bpp*(start+length)] = run
+            return
+
+        rp, gp, bp = display.ORDER[0], display.ORDER[1], display.ORDER[2]
+        for start, length, solid, c in self._spans(count):
+            if solid:
+                px = bytearray(bpp)
+                if scale is None:
+                    px[rp], px[gp], px[bp] = buf[c+2], buf[c+1], buf[c]
+                else:
+                    px[rp] = int(buf[c+2]*scale)
+                    px[gp] = int(buf[c+1]*scale)
+                    px[bp] = int(buf[c]*scale)
+                out[bpp*start:bpp*(start+length)] = bytes(px) * length
+            elif scale is None:
+                run = bytearray(bpp * length)
+                for n in range(length):
+                    o = bpp * n
+                    s = c + 3 * n
+                    run[o+rp] = buf[s+2]
+                    run[o+gp] = buf[s+1]
+                    run[o+bp] = buf[s]
+                out[bpp*start:bpp*(start+length)] = run
+            else:
+                run = bytearray(bpp * length)
+                for n in range(length):
+                    o = bpp * n
+                    s = c + 3 * n
+                    run[o+rp] = int(buf[s+2]*scale)
+                    run[o+gp] = int(buf[s+1]*scale)
+                    run[o+bp] = int(buf[s]*scale)
+                out[bpp*start:bpp*(start+length)] = run
+
+    def draw(self, k: int, display, brightness: float = 1.0) -> int:
+        """
+        Draw frame k into a NeoPixel-style display (without writing it).
+        Keyframes clear the display first. Returns the number of frame
+        times to show the frame for.
+        """
+        count = self.read_frame(k)
+        scale = self._scale(brightness)
+        if self.is_key():
+            display.fill((0, 0, 0))
+        if self.spans and hasattr(display, "buf"):
+            self._draw_spans(count, display, scale)
+            return self.duration()
+        if self.spans:
+            entries = self._span_entries(count)
+        else:
+            entries = self._entries(count)
+        if scale is None:
+            for index, b, g, r in entries:
+                display[index] = (r, g, b)
+            return self.duration()
+        for index, b, g, r in entries:
+            display[index] = (int(r*scale),
+                              int(g*scale),
+                              int(b*scale))
+        return self.duration()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def open_animation(filename: str) -> Animation:
+    """
+    Open a .tvb file for streaming playback.
+    """
+    return Animation(open(filename, 'rb'))
+
+
+class FrozenData:
+    """
+    File-like reader over a bytes object, such as the DATA constant of
+    a frozen animation module. Only the header is read through it;
+    `Animation` slices the offset table and frames straight from `data`.
+    """
+
+    def __init__(self, data) -> None:
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def read(self, n: int):
+        start = self.pos
+        self.pos = min(start + n, len(self.data))
+        return bytes(self.data[start:self.pos])
+
+    def seek(self, pos: int) -> None:
+        self.pos = pos
+
+    def close(self) -> None:
+        pass
+
+
+def open_frozen(data) -> Animation:
+    """
+    Open the DATA of a frozen animation module for playback:
+
+        import tvb_blink
+        animation = open_frozen(tvb_blink.DATA)
+    """
+    return Animation(FrozenData(data))
+
+
+class StoredAnimation:
+    """
+    An animation drawn from the frames of a shared frame store
+    (see tvlib.comparator.build_frame_store).
+    """
+
+    def __init__(self, store: Animation, frame_ids) -> None:
+        self.store = store
+        self.frame_ids = array('H', frame_ids)
+
+    def __len__(self) -> int:
+        return len(self.frame_ids)
+
+    def draw(self, k: int, display, brightness: float = 1.0) -> int:
+        """
+        Draw frame k of the animation. Returns its duration.
+        """
+        return self.store.draw(self.frame_ids[k], display, brightness)
+
+    def close(self) -> None:
+        pass
+
+
+def open_store(folder: str) -> dict:
+    """
+    Open a shared frame store folder holding frames.tvb and
+    animations.json, returning {name: StoredAnimation}.
+    """
+    store = open_animation(folder + "/frames.tvb")
+    with open(folder + "/animations.json") as f:
+        refs = json.load(f)
+    return {name: StoredAnimation(store, ids) for name, ids in refs.items()}
+
+
+class CSVAnimation:
+    """
+    An animation held in RAM as tuples of (index, b, g, r) per frame,
+    read from a folder of CSV frames.
+    """
+
+    def __init__(self, frames) -> None:
+        self.frames = frames
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def pixels(self, k: int):
+        """
+        Yield (index, b, g, r) for each pixel of frame k.
+        """
+        return iter(self.frames[k])
+
+    def draw(self, k: int, display, brightness: float = 1.0) -> int:
+        """
+        Draw frame k of the animation. Returns its duration.
+        """
+        for index, b, g, r in self.frames[k]:
+            display[index] = (int(r*brightness),
+                              int(g*brightness),
+                              int(b*brightness))
+        return 1
+
+    def close(self) -> None:
+        pass
+
+
+def open_csv(folder: str) -> CSVAnimation:
+    """
+    Read a folder of CSV frames, each a header line followed by one
+    index,b,g,r line per pixel, in file name order.
+    """
+    def assemble(filename: str):
+        with open(filename, 'r') as csvfile:
+            # Skip the header so each line converts straight to a tuple
+            next(csvfile)
+            return tuple((int(i), int(a), int(b), int(c))
+                         for i, a, b, c in (
+                             line.rstrip('\n').rstrip('\r').split(",")
+                             for line in csvfile))
+
+    return CSVAnimation(tuple(assemble(folder + "/" + filename)
+                              for filename in sorted(listdir(folder))
+                              if filename.endswith('.csv')))
+
+
+def load_animation(path: str):
+    """
+    Open a .tvb file for streaming, or read a folder of CSV frames.
+    """
+    if path.endswith('.tvb'):
+        return open_animation(path)
+    return open_csv(path)
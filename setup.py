@@ -38,7 +38,7 @@ setup(
         "toml>=0.10.0",
     ],
     extras_require={
-        "sprites": ["pygame>=2.0.0"],
+        "fast": ["orjson>=3.0.0"],
         "dev": [
             "pytest>=6.0.0",
             "black>=21.0.0",
@@ -108,6 +108,1381 @@ def test_controller():
         print(f"✗ Controller test failed: {e}")
         return False
 
+def test_comparator_paths():
+    """Test that the vectorized diff engine matches the reference loop."""
+    print("\nTesting comparator...")
+
+    from numpy import random, uint8
+    from tvlib.comparator import comparator
+
+    rng = random.default_rng(0)
+    images = rng.integers(0, 4, size=(12, 10, 10, 3)).astype(uint8)
+    images[3] = images[2]
+
+    fast = comparator(images.copy(), 10, 10)
+    slow = comparator(images.copy(), 10, 10, vectorized=False)
+    assert fast is not None and fast == slow
+    assert fast[3] == [(0, 0, 0, 0)]
+    print(f"✓ Vectorized and loop diffs agree over {len(fast)} frames")
+
+    return True
+
+def _write_animation(root, name, images):
+    """Write frames as PNGs into root/animations/name and return the folder."""
+    from cv2 import imwrite
+
+    folder = os.path.join(root, "animations", name)
+    os.makedirs(folder, exist_ok=True)
+    for i, img in enumerate(images):
+        imwrite(os.path.join(folder, f"frame-{i:04d}.png"), img)
+    return folder
+
+def test_streaming_conversion():
+    """Test that streamed conversion writes the same JSON as the batch path."""
+    print("\nTesting streaming conversion...")
+
+    import tempfile
+    from numpy import random, uint8
+    from tvlib.comparator import convert_dir, stream_images, convert_images
+
+    rng = random.default_rng(1)
+    images = rng.integers(0, 3, size=(8, 10, 10, 3)).astype(uint8) * 100
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as root:
+        folder = _write_animation(root, "clip", images)
+        paths = sorted(os.path.join(folder, f) for f in os.listdir(folder))
+        assert list(stream_images(paths, (10, 10))) == convert_images(paths, (10, 10))
+
+        try:
+            os.chdir(root)
+            out = os.path.join("json", "clip", "clip.json")
+            assert convert_dir("clip", (10, 10)) is not None
+            with open(out, "rb") as f:
+                batch = f.read()
+            assert convert_dir("clip", (10, 10), stream=True) == []
+            with open(out, "rb") as f:
+                streamed = f.read()
+        finally:
+            os.chdir(cwd)
+
+    assert batch == streamed
+    print("✓ Streamed and batch JSON output are identical")
+
+    return True
+
+def test_parallel_convert_all():
+    """Test that a process pool converts folders and isolates failures."""
+    print("\nTesting parallel conversion...")
+
+    import pickle
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import Rotation, Flip
+    from tvlib.comparator import convert_all
+
+    assert pickle.loads(pickle.dumps(Rotation.ROTATE_90)) is Rotation.ROTATE_90
+    assert pickle.loads(pickle.dumps(Flip.HORIZONTAL_FLIP)) is Flip.HORIZONTAL_FLIP
+
+    rng = random.default_rng(2)
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as root:
+        for name in ("a", "b", "c"):
+            images = rng.integers(0, 255, size=(4, 10, 10, 3)).astype(uint8)
+            _write_animation(root, name, images)
+        os.makedirs(os.path.join(root, "animations", "empty"))
+
+        try:
+            os.chdir(root)
+            assert convert_all((10, 10), Rotation.ROTATE_180, jobs=2)
+            written = sorted(f for f in os.listdir("json") if not f.startswith("."))
+        finally:
+            os.chdir(cwd)
+
+    assert written == ["a", "b", "c"]
+    print(f"✓ Converted {len(written)} folders in parallel, bad folder skipped")
+
+    return True
+
+def test_threaded_decoding():
+    """Test that threaded decoding keeps frame order and reports bad files."""
+    print("\nTesting threaded decoding...")
+
+    import logging
+    import tempfile
+    from numpy import random, uint8
+    from tvlib.comparator import _iter_images
+
+    rng = random.default_rng(3)
+    images = rng.integers(0, 255, size=(20, 10, 10, 3)).astype(uint8)
+
+    class Collect(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    with tempfile.TemporaryDirectory() as root:
+        folder = _write_animation(root, "clip", images)
+        paths = sorted(os.path.join(folder, f) for f in os.listdir(folder))
+        broken = os.path.join(folder, "frame-0005.png")
+        with open(broken, "w") as f:
+            f.write("not an image")
+
+        collect = Collect()
+        logging.getLogger().addHandler(collect)
+        try:
+            threaded = list(_iter_images(paths, workers=4))
+        finally:
+            logging.getLogger().removeHandler(collect)
+        serial = list(_iter_images(paths, workers=1))
+
+    assert len(threaded) == len(serial) == 19
+    assert all((a == b).all() for a, b in zip(threaded, serial))
+    assert all((a == b).all() for a, b in zip(threaded[5:], images[6:]))
+    assert any(broken in m for m in collect.messages)
+    print("✓ Threaded decoding preserved order and reported the broken file")
+
+    return True
+
+def test_build_cache():
+    """Test that convert_all only rebuilds folders whose inputs changed."""
+    print("\nTesting build cache...")
+
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import Rotation, Flip
+    from tvlib._cache import BuildCache
+    from tvlib import comparator
+    from tvlib.comparator import convert_all, _build_settings, _build_outputs
+
+    rng = random.default_rng(4)
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as root:
+        for name in ("a", "b"):
+            images = rng.integers(0, 255, size=(3, 10, 10, 3)).astype(uint8)
+            _write_animation(root, name, images)
+
+        try:
+            os.chdir(root)
+            settings = _build_settings((10, 10), Rotation.NONE, Flip.NONE)
+            assert convert_all((10, 10))
+
+            cache = BuildCache.load()
+            assert cache.check("a", settings, _build_outputs("a"))[0] is None
+
+            with open(os.path.join("animations", "a", "frame-0001.png"), "ab") as f:
+                f.write(b"\0")
+            reason = cache.check("a", settings, _build_outputs("a"))[0]
+            assert reason == "frames changed: modified frame-0001.png"
+            assert cache.check("b", settings, _build_outputs("b"))[0] is None
+
+            rotated = dict(settings, rotation="ROTATE_90")
+            reason = cache.check("b", rotated, _build_outputs("b"))[0]
+            assert reason == "settings changed: rotation"
+
+            before = os.stat(os.path.join("json", "b", "b.json")).st_mtime_ns
+            assert convert_all((10, 10))
+            after = os.stat(os.path.join("json", "b", "b.json")).st_mtime_ns
+            assert BuildCache.load().check("a", settings, _build_outputs("a"))[0] is None
+
+            # A failed write must not mark the folder as built
+            with open(os.path.join("animations", "a", "frame-0001.png"), "ab") as f:
+                f.write(b"\0")
+            write = comparator.write_json_stream
+            comparator.write_json_stream = lambda *args, **kwargs: None
+            try:
+                convert_all((10, 10))
+            finally:
+                comparator.write_json_stream = write
+            reason = BuildCache.load().check("a", settings, _build_outputs("a"))[0]
+            assert reason is not None
+        finally:
+            os.chdir(cwd)
+
+    assert before == after
+    print("✓ Only the modified folder was rebuilt")
+    print("✓ Folders that failed to save are rebuilt on the next run")
+
+    return True
+
+def test_pixel_order():
+    """Test the precomputed strip order against step-by-step transforms."""
+    print("\nTesting pixel order lookup...")
+
+    from numpy import random, uint8, flip
+    from tvlib import Rotation, Flip
+    from tvlib.comparator import _realign_stack
+
+    rng = random.default_rng(5)
+    images = rng.integers(0, 255, size=(3, 6, 9, 3)).astype(uint8)
+
+    for rot in Rotation:
+        for flp in Flip:
+            frames = _realign_stack(images, 9, 6, rot, flp)
+            for img, frame in zip(images, frames):
+                expected = flp(rot(img.copy()))
+                expected[1::2, :] = flip(expected[1::2, :], axis=1)
+                assert (frame == expected.reshape(-1, 3)).all(), (rot, flp)
+
+    print("✓ Lookup table matches rotation, flip and serpentine order")
+
+    return True
+
+def test_resample():
+    """Test that off-size sources are area-averaged to the target size."""
+    print("\nTesting resampling...")
+
+    from numpy import random, uint8
+    from tvlib.comparator import comparator
+    from tvlib.transformations import resample
+
+    rng = random.default_rng(6)
+    small = rng.integers(0, 255, size=(4, 10, 10, 3)).astype(uint8)
+    large = small.repeat(3, axis=1).repeat(3, axis=2)
+
+    assert (resample(large, 10, 10) == small).all()
+    assert comparator(large, 10, 10) == comparator(small, 10, 10)
+
+    mixed = rng.integers(0, 255, size=(2, 8, 20, 3)).astype(uint8)
+    assert resample(mixed, 10, 10).shape == (2, 10, 10, 3)
+    print("✓ Block-scaled frames resample back to the original pixels")
+
+    return True
+
+def test_tvb_roundtrip():
+    """Test that .tvb output reads back to the same frames as the JSON."""
+    print("\nTesting binary format...")
+
+    import io
+    import json
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import read_tvb, OutputFormat
+    from tvlib._binary import write_tvb
+    from tvlib.comparator import convert_dir
+
+    rng = random.default_rng(7)
+    images = rng.integers(0, 3, size=(6, 10, 10, 3)).astype(uint8) * 120
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as root:
+        _write_animation(root, "clip", images)
+        try:
+            os.chdir(root)
+            formats = (OutputFormat.JSON, OutputFormat.TVB)
+            assert convert_dir("clip", (10, 10), stream=True, formats=formats) == []
+            with open(os.path.join("json", "clip", "clip.json")) as f:
+                expected = json.load(f)
+            decoded = read_tvb(os.path.join("json", "clip", "clip.tvb"))
+        finally:
+            os.chdir(cwd)
+
+    assert decoded["metadata"] == expected["metadata"]
+    assert [[list(p) for p in frame] for frame in decoded["frames"]] == expected["frames"]
+
+    # Large displays switch to 32-bit indices
+    frames = [[(70000, 1, 2, 3), (0, 4, 5, 6)], [(0, 0, 0, 0)]]
+    with tempfile.TemporaryDirectory() as root:
+        savepath = os.path.join(root, "wide.tvb")
+        write_tvb(savepath, {"name": "wide", "width": 300, "height": 300}, frames)
+        with open(savepath, "rb") as f:
+            assert read_tvb(io.BytesIO(f.read()))["frames"] == frames
+    print("✓ Binary frames round-trip to the JSON output")
+
+    return True
+
+def _load_onboard_tvb():
+    """Import the MicroPython .tvb player from onboard/."""
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        "onboard_tvb", Path(__file__).parent / "onboard" / "tvb.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class _FakeDisplay(list):
+    """Stand-in for a NeoPixel strip."""
+    def fill(self, color):
+        self[:] = [color] * len(self)
+
+def test_onboard_seek():
+    """Test that the device player seeks to and decodes any frame."""
+    print("\nTesting onboard streaming player...")
+
+    import io
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import read_tvb
+    from tvlib._binary import write_tvb
+    from tvlib.comparator import comparator
+
+    tvb = _load_onboard_tvb()
+    rng = random.default_rng(8)
+    images = rng.integers(0, 2, size=(10, 10, 10, 3)).astype(uint8) * 200
+    frames = comparator(images, 10, 10)
+
+    with tempfile.TemporaryDirectory() as root:
+        savepath = os.path.join(root, "clip.tvb")
+        write_tvb(savepath, {"name": "clip", "width": 10, "height": 10}, frames)
+        expected = read_tvb(savepath)["frames"]
+        with open(savepath, "rb") as f:
+            flash = io.BytesIO(f.read())
+
+    animation = tvb.Animation(flash)
+    assert len(animation) == len(frames)
+    for k in reversed(range(len(animation))):
+        assert list(animation.pixels(k)) == expected[k] == frames[k]
+
+    display = _FakeDisplay([(0, 0, 0)] * 100)
+    for k in range(len(animation)):
+        animation.draw(k, display)
+    final = comparator(images[-1:], 10, 10)[0]
+    assert [p for p in display if p != (0, 0, 0)] == [(r, g, b) for _, b, g, r in final]
+    print("✓ Player reads frames in any order into a single buffer")
+
+    return True
+
+def test_tvb_unchanged_frames():
+    """Test that frames without changes leave pixel 0 lit on playback."""
+    print("\nTesting unchanged frames in .tvb...")
+
+    import json
+    import tempfile
+    from numpy import zeros, uint8
+    from tvlib import Encoding, OutputFormat, read_tvb
+    from tvlib.comparator import convert_dir
+    from tvlib.encoding import play
+
+    tvb = _load_onboard_tvb()
+    images = zeros((4, 10, 10, 3), dtype=uint8)
+    images[:, 0, 0] = (180, 120, 120)
+    images[2, 5, 5] = (0, 0, 200)
+    cwd = os.getcwd()
+
+    for encoding in (Encoding(), Encoding(keyframe_interval=0),
+                     Encoding(spans=True), Encoding(palette=0),
+                     Encoding(brightness=0.5)):
+        with tempfile.TemporaryDirectory() as root:
+            _write_animation(root, "still", images)
+            try:
+                os.chdir(root)
+                formats = (OutputFormat.JSON, OutputFormat.TVB)
+                assert convert_dir("still", (10, 10), formats=formats,
+                                   encoding=encoding) is not None
+                with open(os.path.join("json", "still", "still.json")) as f:
+                    expected = json.load(f)
+                base = os.path.join("json", "still", "still.tvb")
+                decoded = read_tvb(base)
+                animation = tvb.open_animation(base)
+            finally:
+                os.chdir(cwd)
+
+        frames = [[list(p) for p in frame] for frame in decoded["frames"]]
+        assert frames == expected["frames"]
+        assert len(frames[1]) == 1 and not any(frames[1][0][2:])
+        assert animation.read_frame(1) == 0
+
+        display = _FakeDisplay([(0, 0, 0)] * 100)
+        for k in range(len(animation)):
+            animation.draw(k, display)
+            assert display[0] != (0, 0, 0), (encoding, k)
+        animation.close()
+        palette = [tuple(c) for c in decoded["metadata"].get("palette", [])] or None
+        for shown in play(decoded["frames"], 100, palette):
+            assert shown[0].any(), encoding
+    print("✓ Repeated frames are stored empty and keep pixel 0 lit")
+
+    return True
+
+def test_onboard_csv_fallback():
+    """Test that boards without .tvb files still play CSV frame folders."""
+    print("\nTesting onboard CSV fallback...")
+
+    import tempfile
+
+    tvb = _load_onboard_tvb()
+    frames = [[(0, 10, 20, 30), (7, 200, 100, 0)], [(3, 1, 2, 3)]]
+
+    with tempfile.TemporaryDirectory() as root:
+        for n, frame in enumerate(frames):
+            with open(os.path.join(root, f"{n:03d}.csv"), "w", newline="") as f:
+                f.write("index,b,g,r\r\n")
+                f.writelines(",".join(map(str, p)) + "\r\n" for p in frame)
+        animation = tvb.load_animation(root)
+
+    assert len(animation) == 2
+    assert [list(animation.pixels(k)) for k in range(2)] == frames
+    display = _FakeDisplay([(0, 0, 0)] * 10)
+    for k in range(len(animation)):
+        assert animation.draw(k, display, 0.5) == 1
+    assert display[7] == (0, 50, 100) and display[3] == (1, 1, 0)
+    print("✓ CSV frame folders play through the same interface as .tvb")
+
+    return True
+
+def test_adaptive_keyframes():
+    """Test that keyframe encoding plays back the same as plain diffs."""
+    print("\nTesting adaptive keyframes...")
+
+    import io
+    import json
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import Encoding, OutputFormat, read_tvb
+    from tvlib.comparator import comparator, convert_dir
+    from tvlib.encoding import is_key, play
+
+    rng = random.default_rng(10)
+    base = rng.integers(0, 2, size=(10, 10, 3)).astype(uint8) * 200
+    images = base[None].repeat(9, axis=0)
+    for k in range(9):
+        images[k, k, :3] = 30 * k
+    images[5] = 0
+    images[5, 0, 0] = 255
+
+    plain = comparator(images, 10, 10)
+    keyed = comparator(images, 10, 10, encoding=Encoding(keyframe_interval=4))
+    assert [is_key(f) for f in plain] == [False] * 9
+    assert [k for k, f in enumerate(keyed) if is_key(f)] == [0, 4, 5, 8]
+    assert comparator(images, 10, 10, vectorized=False,
+                      encoding=Encoding(keyframe_interval=4)) == keyed
+    adaptive = comparator(images, 10, 10, encoding=Encoding(keyframe_interval=0))
+    assert [k for k, f in enumerate(adaptive) if is_key(f)] == [0, 5]
+    assert sum(map(len, adaptive)) < sum(map(len, plain))
+    for a, b in zip(play(plain, 100), play(keyed, 100)):
+        assert (a == b).all()
+    print("✓ Keyframes are forced every K frames and chosen when cheaper")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        _write_animation(root, "clip", images)
+        try:
+            os.chdir(root)
+            encoding = Encoding(keyframe_interval=4)
+            formats = (OutputFormat.JSON, OutputFormat.TVB)
+            base = os.path.join("json", "clip", "clip")
+            assert convert_dir("clip", (10, 10), formats=formats,
+                               encoding=encoding) is not None
+            with open(base + ".json", "rb") as f:
+                batch = f.read()
+            assert convert_dir("clip", (10, 10), stream=True, formats=formats,
+                               encoding=encoding) == []
+            with open(base + ".json", "rb") as f:
+                streamed = f.read()
+            with open(base + ".tvb", "rb") as f:
+                flash = io.BytesIO(f.read())
+            decoded = read_tvb(base + ".tvb")
+        finally:
+            os.chdir(cwd)
+
+    assert batch == streamed
+    types = json.loads(batch)["metadata"]["type"]
+    assert types == decoded["metadata"]["type"] == ["full" if is_key(f) else "diff"
+                                                    for f in keyed]
+    assert decoded["frames"] == keyed
+    assert [is_key(f) for f in decoded["frames"]] == [is_key(f) for f in keyed]
+
+    tvb = _load_onboard_tvb()
+    animation = tvb.Animation(flash)
+    display = _FakeDisplay([(0, 0, 0)] * 100)
+    for k, expected in enumerate(play(keyed, 100)):
+        animation.draw(k, display)
+        assert display == [(r, g, b) for b, g, r in expected.tolist()]
+    print("✓ JSON, .tvb and the onboard player agree on frame types")
+
+    return True
+
+class _FakeNeoPixel:
+    """Stand-in for a MicroPython NeoPixel with its GRB byte buffer."""
+    ORDER = (1, 0, 2, 3)
+    bpp = 3
+
+    def __init__(self, n):
+        self.buf = bytearray(3 * n)
+
+    def __len__(self):
+        return len(self.buf) // 3
+
+    def __getitem__(self, i):
+        g, r, b = self.buf[3*i:3*i+3]
+        return (r, g, b)
+
+    def __setitem__(self, i, color):
+        r, g, b = color
+        self.buf[3*i:3*i+3] = bytes((g, r, b))
+
+    def fill(self, color):
+        for i in range(len(self)):
+            self[i] = color
+
+def test_span_encoding():
+    """Test that span encoded frames play back the same as pixel entries."""
+    print("\nTesting span encoding...")
+
+    import io
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import Encoding, read_tvb
+    from tvlib._binary import write_tvb
+    from tvlib.comparator import comparator
+    from tvlib.encoding import expand, is_key, play, to_spans
+
+    frame = [(0, 1, 2, 3), (1, 1, 2, 3), (2, 9, 9, 9), (3, 9, 9, 9),
+             (4, 9, 9, 9), (5, 9, 9, 9), (6, 4, 5, 6), (9, 7, 7, 7),
+             (10, 7, 7, 7)]
+    assert to_spans(frame) == [(0, 2, 1, 2, 3, 1, 2, 3), (2, 4, 9, 9, 9),
+                               (6, 1, 4, 5, 6), (9, 2, 7, 7, 7)]
+    assert list(expand(to_spans(frame))) == frame
+    print("✓ Consecutive pixels are grouped and solid runs merged")
+
+    rng = random.default_rng(11)
+    images = rng.integers(0, 2, size=(6, 10, 10, 3)).astype(uint8) * 200
+    images[:, 2:5] = (0, 0, 255)
+    images[3, 6:] = 0
+
+    plain = comparator(images, 10, 10)
+    for encoding in (Encoding(spans=True),
+                     Encoding(keyframe_interval=3, spans=True)):
+        spans = comparator(images, 10, 10, encoding=encoding)
+        assert sum(map(len, spans)) < sum(map(len, plain))
+        for a, b in zip(play(plain, 100), play(spans, 100)):
+            assert (a == b).all()
+
+        metadata = {"name": "clip", "width": 10, "height": 10,
+                    "type": "mixed" if encoding.keyframe_interval else "diff",
+                    "layout": "spans"}
+        with tempfile.TemporaryDirectory() as root:
+            savepath = os.path.join(root, "clip.tvb")
+            write_tvb(savepath, metadata, spans)
+            decoded = read_tvb(savepath)
+            with open(savepath, "rb") as f:
+                flash = io.BytesIO(f.read())
+        assert decoded["metadata"]["layout"] == "spans"
+        assert decoded["frames"] == spans
+        assert [is_key(f) for f in decoded["frames"]] == [is_key(f) for f in spans]
+
+        animation = _load_onboard_tvb().Animation(flash)
+        strip = _FakeNeoPixel(100)
+        display = _FakeDisplay([(0, 0, 0)] * 100)
+        for k, expected in enumerate(play(plain, 100)):
+            assert list(animation.pixels(k)) == list(expand(spans[k]))
+            animation.draw(k, strip)
+            animation.draw(k, display)
+            pixels = [(r, g, b) for b, g, r in expected.tolist()]
+            assert [strip[i] for i in range(100)] == display == pixels
+    print("✓ .tvb spans round-trip and draw into the NeoPixel buffer")
+
+    return True
+
+def test_palette_encoding():
+    """Test that palette frames play back through their palette."""
+    print("\nTesting palette encoding...")
+
+    import io
+    import json
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import Encoding, OutputFormat, read_tvb
+    from tvlib.comparator import comparator, convert_dir, _realign_stack
+    from tvlib.encoding import build_palette, count_colors, play, quantize
+
+    rng = random.default_rng(12)
+    images = rng.integers(0, 2, size=(6, 10, 10, 3)).astype(uint8) * 200
+    images[:, 4:6] = (10, 20, 30)
+
+    plain = comparator(images, 10, 10)
+    frames = comparator(images, 10, 10, encoding=Encoding(palette=0))
+    assert frames.palette[0] == (0, 0, 0) and len(frames.palette) == 9
+    assert all(len(entry) == 2 for frame in frames for entry in frame)
+    for a, b in zip(play(plain, 100), play(frames, 100, frames.palette)):
+        assert (a == b).all()
+    print("✓ Exact palette reproduces every color")
+
+    colorful = rng.integers(0, 255, size=(4, 10, 10, 3)).astype(uint8)
+    colorful[:, :3] = 0
+    FRAMES = _realign_stack(colorful, 10, 10)
+    palette = build_palette(count_colors(FRAMES), 8)
+    assert len(palette) <= 8 and palette[0] == (0, 0, 0)
+    quantized = comparator(colorful, 10, 10, encoding=Encoding(palette=8))
+    assert quantized.palette == palette
+    for a, b in zip(quantize(FRAMES, palette),
+                    play(quantized, 100, quantized.palette)):
+        assert (a == b).all()
+    assert len(build_palette(count_colors(FRAMES), 2)) == 2
+    for size in (1, -1, 257):
+        try:
+            build_palette(count_colors(FRAMES), size)
+        except ValueError:
+            continue
+        raise AssertionError(f"palette size {size} was accepted")
+    print("✓ Colors are quantized to the nearest of N palette entries")
+
+    cwd = os.getcwd()
+    tvb = _load_onboard_tvb()
+    for name, source, encoding in (
+            ("nibbles", images, Encoding(palette=0, spans=True,
+                                         keyframe_interval=3)),
+            ("bytes", colorful, Encoding(palette=40)),
+            ("byte-spans", colorful, Encoding(palette=40, spans=True))):
+        with tempfile.TemporaryDirectory() as root:
+            _write_animation(root, name, source)
+            try:
+                os.chdir(root)
+                base = os.path.join("json", name, name)
+                formats = (OutputFormat.JSON, OutputFormat.TVB)
+                convert_dir(name, (10, 10), formats=formats, encoding=encoding)
+                with open(base + ".json", "rb") as f:
+                    batch = f.read()
+                convert_dir(name, (10, 10), stream=True, formats=formats,
+                            encoding=encoding)
+                with open(base + ".json", "rb") as f:
+                    streamed = f.read()
+                with open(base + ".tvb", "rb") as f:
+                    flash = io.BytesIO(f.read())
+                decoded = read_tvb(base + ".tvb")
+            finally:
+                os.chdir(cwd)
+
+        assert batch == streamed
+        data = json.loads(batch)
+        assert decoded["metadata"]["palette"] == data["metadata"]["palette"]
+        assert [list(map(list, f)) for f in decoded["frames"]] == data["frames"]
+
+        animation = tvb.Animation(flash)
+        assert bool(animation.nibbles) == (name == "nibbles")
+        strip = _FakeNeoPixel(100)
+        display = _FakeDisplay([(0, 0, 0)] * 100)
+        for k in range(len(animation)):
+            animation.draw(k, strip, 0.5)
+            animation.draw(k, display, 0.5)
+            assert [strip[i] for i in range(100)] == display
+        display = _FakeDisplay([(0, 0, 0)] * 100)
+        for k, expected in enumerate(play(decoded["frames"], 100,
+                                          data["metadata"]["palette"])):
+            animation.draw(k, display)
+            assert display == [(r, g, b) for b, g, r in expected.tolist()]
+    print("✓ .tvb palette files round-trip and draw through the lookup table")
+
+    return True
+
+def test_hold_encoding():
+    """Test that repeated frames fold into held frames."""
+    print("\nTesting hold encoding...")
+
+    import io
+    import json
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import Encoding, OutputFormat, read_tvb
+    from tvlib.comparator import comparator, convert_dir, _realign_stack
+    from tvlib.encoding import duration, play
+
+    rng = random.default_rng(13)
+    distinct = rng.integers(0, 2, size=(4, 10, 10, 3)).astype(uint8) * 200
+    images = distinct[[0, 0, 0, 1, 2, 2, 3, 3, 3, 3]]
+
+    plain = comparator(images, 10, 10)
+    assert plain[1] == [(0, 0, 0, 0)]
+    held = comparator(images, 10, 10, encoding=Encoding(hold=True))
+    assert [duration(f) for f in held] == [3, 1, 2, 4]
+    assert [(0, 0, 0, 0)] not in held
+    for a, b in zip(_realign_stack(images, 10, 10), play(held, 100), strict=True):
+        assert (a == b).all()
+    print("✓ Repeats become durations and placeholders are gone")
+
+    cwd = os.getcwd()
+    encoding = Encoding(hold=True, keyframe_interval=2, spans=True)
+    with tempfile.TemporaryDirectory() as root:
+        _write_animation(root, "blink", images)
+        try:
+            os.chdir(root)
+            base = os.path.join("json", "blink", "blink")
+            formats = (OutputFormat.JSON, OutputFormat.TVB)
+            convert_dir("blink", (10, 10), formats=formats, encoding=encoding)
+            with open(base + ".json", "rb") as f:
+                batch = f.read()
+            convert_dir("blink", (10, 10), stream=True, formats=formats,
+                        encoding=encoding)
+            with open(base + ".json", "rb") as f:
+                streamed = f.read()
+            with open(base + ".tvb", "rb") as f:
+                flash = io.BytesIO(f.read())
+            decoded = read_tvb(base + ".tvb")
+        finally:
+            os.chdir(cwd)
+
+    assert batch == streamed
+    metadata = json.loads(batch)["metadata"]
+    assert metadata["frame_count"] == 4
+    assert metadata["durations"] == decoded["metadata"]["durations"] == [3, 1, 2, 4]
+
+    animation = _load_onboard_tvb().Animation(flash)
+    display = _FakeDisplay([(0, 0, 0)] * 100)
+    shown = []
+    for k in range(len(animation)):
+        hold = animation.draw(k, display)
+        shown.extend([list(display)] * hold)
+    expected = [[(r, g, b) for b, g, r in frame.tolist()]
+                for frame in _realign_stack(images, 10, 10)]
+    assert shown == expected
+    print("✓ The onboard player holds each frame for its duration")
+
+    return True
+
+def test_frame_store():
+    """Test that the shared frame store keeps each distinct frame once."""
+    print("\nTesting shared frame store...")
+
+    import json
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import build_frame_store, read_tvb, OutputFormat
+    from tvlib.comparator import _realign_stack
+
+    rng = random.default_rng(14)
+    faces = rng.integers(0, 2, size=(4, 10, 10, 3)).astype(uint8) * 200
+    clips = {"blink": faces[[0, 1, 0, 0]], "smile": faces[[0, 2, 3, 2]]}
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as root:
+        for name, images in clips.items():
+            _write_animation(root, name, images)
+        try:
+            os.chdir(root)
+            stats = build_frame_store((10, 10), formats=(OutputFormat.JSON,
+                                                         OutputFormat.TVB))
+            with open(os.path.join("json", "_shared", "animations.json")) as f:
+                refs = json.load(f)
+            with open(os.path.join("json", "_shared", "frames.json")) as f:
+                frames = json.load(f)["frames"]
+            store = _load_onboard_tvb().open_store(os.path.join("json", "_shared"))
+            tvb_frames = read_tvb(os.path.join("json", "_shared", "frames.tvb"))["frames"]
+        finally:
+            os.chdir(cwd)
+
+    assert stats["frames"] == 8 and stats["unique"] == 4
+    assert stats["store"] < stats["full"]
+    assert refs == {"blink": [0, 1, 0, 0], "smile": [0, 2, 3, 2]}
+    assert [list(map(list, f)) for f in tvb_frames] == frames
+    print("✓ Frames shared between animations are stored once")
+
+    for name, images in clips.items():
+        display = _FakeDisplay([(0, 0, 0)] * 100)
+        for k, expected in enumerate(_realign_stack(images, 10, 10)):
+            store[name].draw(k, display)
+            assert display == [(r, g, b) for b, g, r in expected.tolist()]
+    print("✓ Onboard player draws animations from the store by frame id")
+
+    return True
+
+def test_change_tolerance():
+    """Test that a change tolerance drops small writes without drifting."""
+    print("\nTesting change tolerance...")
+
+    import tempfile
+    from numpy import random, uint8, int16, clip
+    from tvlib import Encoding, OutputFormat
+    from tvlib.comparator import comparator, convert_dir, _realign_stack
+    from numpy import stack
+    from tvlib.encoding import apply_tolerance, color_distance, count_writes, play
+
+    rng = random.default_rng(15)
+    base = rng.integers(60, 200, size=(10, 10, 3))
+    steps = rng.integers(-3, 4, size=(12, 10, 10, 3)).cumsum(axis=0)
+    images = clip(base + steps, 0, 255).astype(uint8)
+    truth = _realign_stack(images, 10, 10)
+
+    for perceptual in (False, True):
+        encoding = Encoding(tolerance=6, perceptual=perceptual, hold=True)
+        frames = comparator(images, 10, 10, encoding=encoding)
+        shown = list(play(frames, 100))
+        assert len(shown) == len(truth)
+        assert sum(len(f) for f in frames) < count_writes(truth)
+        for a, b in zip(shown, truth):
+            assert color_distance(a, b, perceptual).max() <= 6
+    assert (abs(truth.astype(int16)[-1] - truth[0]).max() > 6)
+    print("✓ Fewer writes, and the display never drifts past the tolerance")
+
+    from numpy import array, isfinite
+    black = array([[0, 0, 0]] * 4, dtype=uint8)
+    bright = array([[0, 255, 0], [0, 100, 0], [255, 0, 0], [0, 0, 255]],
+                   dtype=uint8)
+    for a, b in ((black, bright), (bright, black)):
+        distance = color_distance(a, b, perceptual=True)
+        assert isfinite(distance).all() and (distance > 6).all()
+        assert (apply_tolerance(stack([a, b]), 6, True)[1] == b).all()
+    print("✓ Full-range changes measure past the tolerance")
+
+    cwd = os.getcwd()
+    encoding = Encoding(tolerance=6, perceptual=True)
+    with tempfile.TemporaryDirectory() as root:
+        _write_animation(root, "noise", images)
+        try:
+            os.chdir(root)
+            base_path = os.path.join("json", "noise", "noise.json")
+            convert_dir("noise", (10, 10), formats=(OutputFormat.JSON,),
+                        encoding=encoding)
+            with open(base_path, "rb") as f:
+                batch = f.read()
+            convert_dir("noise", (10, 10), stream=True,
+                        formats=(OutputFormat.JSON,), encoding=encoding)
+            with open(base_path, "rb") as f:
+                streamed = f.read()
+        finally:
+            os.chdir(cwd)
+
+    assert batch == streamed
+    print("✓ Streamed and batch conversion drop the same writes")
+
+    return True
+
+def test_brightness_encoding():
+    """Test that brightness-aware encoding diffs what the LEDs show."""
+    print("\nTesting brightness encoding...")
+
+    import io
+    import tempfile
+    from numpy import random, uint8, clip
+    from tvlib import Encoding, OutputFormat, read_tvb
+    from tvlib.comparator import comparator, convert_dir, _realign_stack
+    from tvlib.encoding import count_writes
+
+    tvb = _load_onboard_tvb()
+    rng = random.default_rng(16)
+    base = rng.integers(0, 256, size=(10, 10, 3))
+    steps = rng.integers(-4, 5, size=(10, 10, 10, 3)).cumsum(axis=0)
+    images = clip(base + steps, 0, 255).astype(uint8)
+    truth = _realign_stack(images, 10, 10)
+
+    def shown_at(encoding, brightness, display):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as root:
+            _write_animation(root, "fade", images)
+            try:
+                os.chdir(root)
+                convert_dir("fade", (10, 10), formats=(OutputFormat.TVB,),
+                            encoding=encoding)
+                with open(os.path.join("json", "fade", "fade.tvb"), "rb") as f:
+                    data = f.read()
+            finally:
+                os.chdir(cwd)
+        animation = tvb.Animation(io.BytesIO(data))
+        shown = []
+        for k in range(len(animation)):
+            hold = animation.draw(k, display, brightness)
+            shown.extend([[display[i] for i in range(100)]] * hold)
+        return shown, data
+
+    def expected(b):
+        return [[(int(r*b), int(g*b), int(bl*b)) for bl, g, r in frame.tolist()]
+                for frame in truth]
+
+    baked = Encoding(brightness=0.15, hold=True, spans=True)
+    frames = comparator(images, 10, 10, encoding=baked)
+    assert sum(len(f) for f in frames) < count_writes(truth)
+    for display in (_FakeDisplay([(0, 0, 0)] * 100), _FakeNeoPixel(100)):
+        shown, data = shown_at(baked, 0.15, display)
+        assert shown == expected(0.15)
+    assert read_tvb(io.BytesIO(data))["metadata"]["brightness"] == 0.15
+    assert tvb.Animation(io.BytesIO(data))._scale(0.15) is None
+    print("✓ Baked LED values play unscaled and skip invisible changes")
+
+    ranged = Encoding(brightness=0.1, max_brightness=0.15, hold=True)
+    for b in (0.1, 0.12, 0.15):
+        shown, _ = shown_at(ranged, b, _FakeDisplay([(0, 0, 0)] * 100))
+        assert shown == expected(b)
+    print("✓ A brightness range only merges levels no brightness in it shows")
+
+    cwd = os.getcwd()
+    encoding = Encoding(brightness=0.15, gamma=2.2, palette=8, tolerance=1)
+    with tempfile.TemporaryDirectory() as root:
+        _write_animation(root, "fade", images)
+        try:
+            os.chdir(root)
+            json_path = os.path.join("json", "fade", "fade.json")
+            convert_dir("fade", (10, 10), formats=(OutputFormat.JSON,),
+                        encoding=encoding)
+            with open(json_path, "rb") as f:
+                batch = f.read()
+            convert_dir("fade", (10, 10), stream=True,
+                        formats=(OutputFormat.JSON,), encoding=encoding)
+            with open(json_path, "rb") as f:
+                streamed = f.read()
+        finally:
+            os.chdir(cwd)
+    assert batch == streamed
+    print("✓ Streamed and batch conversion bake the same values")
+
+    return True
+
+def test_benchmark_suite():
+    """Test the synthetic animations and regression check of benchmark.py."""
+    print("\nTesting benchmark suite...")
+
+    import benchmark
+
+    images = benchmark.synthetic_animation(16, 8, 12, density=0.2)
+    assert images.shape == (12, 8, 16, 3)
+    changed = (images[1:] != images[:-1]).any(axis=-1).mean()
+    assert 0.1 < changed < 0.3
+    print("✓ Synthetic animations change the requested share of pixels")
+
+    results = benchmark.run([(10, 10)], frames=3, density=0.5, repeat=1)
+    names = {r["benchmark"] for r in results["results"]}
+    assert names == set(benchmark.BENCHMARKS)
+    assert all(r["median"] > 0 for r in results["results"])
+
+    slower = {"results": [dict(r, median=r["median"] * 2)
+                          for r in results["results"]]}
+    assert not any(r["regression"] for r in benchmark.compare(slower, slower))
+    report = benchmark.compare(slower, results, threshold=0.5)
+    assert len(report) == len(names)
+    assert all(r["regression"] for r in report)
+    print("✓ Benchmarks run and slowdowns past the threshold are flagged")
+
+    return True
+
+def test_stage_profile():
+    """Test that conversions record per-stage timings and counters."""
+    print("\nTesting stage profiling...")
+
+    import json
+    import tempfile
+    from time import perf_counter
+    from numpy import random, uint8
+    from tvlib.comparator import convert_all, convert_dir
+    from tvlib._profile import STAGES, profiling, stage, write_profiles
+
+    with stage("diff"):
+        pass
+    print("✓ Stages are free when nothing is profiled")
+
+    rng = random.default_rng(18)
+    images = rng.integers(0, 2, size=(6, 10, 10, 3)).astype(uint8) * 200
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as root:
+        _write_animation(root, "blink", images)
+        _write_animation(root, "smile", images[::-1])
+        try:
+            os.chdir(root)
+            for stream in (False, True):
+                start = perf_counter()
+                with profiling("blink") as profile:
+                    convert_dir("blink", (10, 10), stream=stream, workers=1)
+                elapsed = perf_counter() - start
+                assert all(profile.times[name] > 0 for name in STAGES)
+                assert profile.total() <= elapsed
+                assert profile.counts["frames"] == 6
+                assert profile.counts["bytes"] == os.path.getsize(
+                    os.path.join("json", "blink", "blink.json"))
+            pixels = profile.counts["pixels"]
+
+            profiles = []
+            assert convert_all((10, 10), cache=False, profiles=profiles)
+            write_profiles("profile.jsonl", profiles)
+            with open("profile.jsonl") as f:
+                lines = [json.loads(line) for line in f]
+        finally:
+            os.chdir(cwd)
+
+    assert [p.label for p in profiles] == ["blink", "smile"]
+    assert profiles[0].counts["pixels"] == pixels
+    assert [line["label"] for line in lines] == ["blink", "smile", "total"]
+    assert lines[2]["frames"] == 12
+    print("✓ Stage times and counters are recorded per folder and in total")
+
+    return True
+
+def test_frame_serializer():
+    """Test that the direct frame writer matches json.dumps with NpEncoder."""
+    print("\nTesting frame serializer...")
+
+    import json
+    import tempfile
+    from numpy import array, int64, random, uint8
+    import tvlib._fileio as fileio
+    from tvlib.comparator import comparator
+
+    rng = random.default_rng(19)
+    images = rng.integers(0, 3, size=(5, 10, 10, 3)).astype(uint8) * 100
+    frames = comparator(images, 10, 10)
+    frames += [[tuple(int64(v) for v in p) for p in frames[1]],
+               array(frames[2], dtype=uint8)]
+    data = {"metadata": {"name": "blïnk", "brightness": 0.15}, "frames": frames}
+    expected = json.dumps(data, cls=fileio.NpEncoder, separators=(',', ':'),
+                          ensure_ascii=False)
+
+    backend = fileio.orjson
+    with tempfile.TemporaryDirectory() as root:
+        savepath = os.path.join(root, "blink.json")
+        try:
+            for fileio.orjson in {backend, None}:
+                fileio._write_json(savepath, data)
+                with open(savepath, encoding="utf-8") as f:
+                    assert f.read() == expected
+                assert fileio.write_json_stream(savepath, dict(data["metadata"]),
+                                                iter(frames)) is not None
+                with open(savepath, encoding="utf-8") as f:
+                    streamed = json.load(f)
+                assert streamed["frames"] == json.loads(expected)["frames"]
+        finally:
+            fileio.orjson = backend
+    print("✓ Output is byte-identical with and without the fast backend")
+
+    return True
+
+def test_json_writer():
+    """Test that JSON frames are written after the metadata as they arrive."""
+    print("\nTesting incremental JSON writer...")
+
+    import json
+    import tempfile
+    from tvlib._fileio import JSONWriter, write_json_stream
+
+    metadata = {"name": "blink", "frame_count": 0, "type": "diff"}
+    frames = [[(n, 10, 20, 30)] * (n + 1) for n in range(12)]
+
+    with tempfile.TemporaryDirectory() as root:
+        savepath = os.path.join(root, "blink.json")
+        with JSONWriter(savepath, dict(metadata)) as writer:
+            for frame in frames[:5]:
+                writer.write(frame)
+            writer._file.flush()
+            assert not os.path.exists(savepath)
+            with open(writer.partpath) as f:
+                partial = f.read()
+            for frame in frames[5:]:
+                writer.write(frame)
+        with open(savepath) as f:
+            data = json.load(f)
+        assert partial.startswith('{"metadata":{"name":"blink"')
+        assert len(json.loads(partial + "]}")["frames"]) == 5
+        assert data["metadata"] == dict(metadata, frame_count=12)
+        assert data["frames"] == [[list(p) for p in f] for f in frames]
+        print("✓ Frames follow the metadata and frame_count is patched in")
+
+        late = {"name": "blink", "frame_count": 0, "durations": []}
+        def held():
+            for n, frame in enumerate(frames):
+                late["durations"].append(n + 1)
+                yield frame
+        assert write_json_stream(savepath, late, held(), True) == (12, 78)
+        with open(savepath) as f:
+            assert json.load(f)["metadata"]["durations"] == list(range(1, 13))
+
+        assert write_json_stream(savepath + ".empty", dict(metadata), iter(())) == (0, 0)
+        def broken():
+            yield frames[0]
+            raise ValueError("decode failed")
+        assert write_json_stream(savepath + ".broken", dict(metadata), broken()) is None
+        assert not os.path.exists(savepath + ".empty")
+        assert not os.path.exists(savepath + ".broken")
+
+        # A failed rewrite keeps the last good output
+        with open(savepath, "rb") as f:
+            good = f.read()
+        assert write_json_stream(savepath, dict(metadata), broken()) is None
+        with open(savepath, "rb") as f:
+            assert f.read() == good
+        assert os.listdir(root) == ["blink.json"]
+
+        # Frames given as a list get their exact count, unpadded
+        assert write_json_stream(savepath, dict(metadata), frames) == (12, 78)
+        with open(savepath, encoding="utf-8") as f:
+            assert f.read() == json.dumps(
+                {"metadata": dict(metadata, frame_count=12), "frames": frames},
+                separators=(',', ':'))
+    print("✓ Late metadata, empty and failed animations are handled")
+    print("✓ Output only replaces the previous file once it is complete")
+
+    return True
+
+def test_frozen_module():
+    """Test that frozen animation modules round-trip the .tvb frames."""
+    print("\nTesting frozen module output...")
+
+    import io
+    import json
+    import tempfile
+    from numpy import random, uint8
+    from tvlib import Encoding, OutputFormat, read_tvb
+    from tvlib._binary import module_name
+    from tvlib.comparator import convert_dir
+
+    rng = random.default_rng(21)
+    images = rng.integers(0, 2, size=(8, 10, 10, 3)).astype(uint8) * 200
+    assert module_name("00-big eye") == "tvb_00_big_eye"
+
+    cwd = os.getcwd()
+    tvb = _load_onboard_tvb()
+    for encoding in (None, Encoding(palette=0, spans=True, keyframe_interval=3)):
+        with tempfile.TemporaryDirectory() as root:
+            _write_animation(root, "00-blink", images)
+            try:
+                os.chdir(root)
+                base = os.path.join("json", "00-blink")
+                assert convert_dir("00-blink", (10, 10), encoding=encoding,
+                                   formats=(OutputFormat.JSON, OutputFormat.PY))
+                assert not os.path.exists(os.path.join(base, "00-blink.tvb"))
+                with open(os.path.join(base, "00-blink.json")) as f:
+                    data = json.load(f)
+                with open(os.path.join(base, "tvb_00_blink.py")) as f:
+                    source = f.read()
+
+                convert_dir("00-blink", (10, 10), encoding=encoding, stream=True,
+                            formats=(OutputFormat.TVB, OutputFormat.PY))
+                with open(os.path.join(base, "00-blink.tvb"), "rb") as f:
+                    stored = f.read()
+            finally:
+                os.chdir(cwd)
+
+        module = {}
+        exec(compile(source, "tvb_00_blink.py", "exec"), module)
+        assert module["NAME"] == "00-blink"
+        assert module["DATA"] == stored
+        decoded = read_tvb(io.BytesIO(module["DATA"]))
+        assert [list(map(list, f)) for f in decoded["frames"]] == data["frames"]
+
+        frozen = tvb.open_frozen(module["DATA"])
+        flash = tvb.Animation(io.BytesIO(stored))
+        strip, expected = _FakeNeoPixel(100), _FakeNeoPixel(100)
+        for k in range(len(frozen)):
+            assert list(frozen.pixels(k)) == list(flash.pixels(k))
+            assert frozen.buffer.obj is module["DATA"]
+            frozen.draw(k, strip, 0.5)
+            flash.draw(k, expected, 0.5)
+            assert strip.buf == expected.buf
+    print("✓ Module DATA matches the .tvb file and plays without copying")
+
+    return True
+
+def test_sprite_slicer():
+    """Test that sprite sheets are sliced into tiles without a display."""
+    print("\nTesting sprite sheet slicer...")
+
+    import tempfile
+    import benchmark
+    from numpy import zeros, uint8
+    from tvlib.sprites import _filter_pixels, slice_sheet, sprite_to_array
+
+    images = benchmark.synthetic_animation(6, 4, 11, density=0.3)
+    images[3] = 0
+    with tempfile.TemporaryDirectory() as root:
+        sheet = os.path.join(root, "sheet.png")
+        benchmark.write_sheet(images, sheet, columns=4)
+        sprites = sprite_to_array((6, 4), sheet)
+        assert sprite_to_array((6, 4), os.path.join(root, "missing.png")) is None
+
+    assert sprites.shape == (10, 4, 6, 3)
+    assert (sprites == images[[k for k in range(11) if k != 3]]).all()
+    print("✓ Tiles come out row by row with blank tiles dropped")
+
+    sheet = zeros((9, 14, 3), dtype=uint8)
+    sheet[4:8, 6:12] = 7
+    tiles = slice_sheet(sheet, (6, 4))
+    assert tiles.shape == (4, 4, 6, 3)
+    assert (tiles[3] == 7).all() and not tiles[:3].any()
+    assert slice_sheet(sheet, (20, 4)).shape == (0, 4, 20, 3)
+    assert len(_filter_pixels(tiles, 0)) == 1
+    assert len(_filter_pixels(tiles[:0], 0)) == 0
+    print("✓ Partial edge tiles are cut off")
+
+    return True
+
+def test_sheet_conversion():
+    """Test that sprite sheets convert like the same frames in a folder."""
+    print("\nTesting sprite sheet conversion...")
+
+    import json
+    import tempfile
+    import benchmark
+    import tvlib.sprites
+    from cv2 import imread
+    from tvlib import convert_all, convert_dir, convert_sheet
+    from tvlib.comparator import comparator
+    from tvlib.sprites import load_sheet, slice_sheet, trim_tiles, unique_tiles
+    from tvlib._watch import scan
+
+    images = benchmark.synthetic_animation(10, 10, 9, density=0.3)
+    images[4] = images[7] = images[1]
+    images[5] = 0
+    large = benchmark.synthetic_animation(20, 20, 5, density=0.3, seed=2)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        _write_animation(root, "frames", images)
+        benchmark.write_sheet(images, os.path.join(root, "animations", "walk.sheet.png"),
+                              columns=4)
+        # A loose image that is not a sheet, like animations/00-smile.png
+        benchmark.write_sheet(images[:1], os.path.join(root, "animations", "still.png"))
+        benchmark.write_sheet(large, os.path.join(root, "big.png"), columns=3)
+        try:
+            os.chdir(root)
+            tiles = trim_tiles(slice_sheet(load_sheet("animations/walk.sheet.png"),
+                                           (10, 10)))
+            distinct, order = unique_tiles(tiles)
+            assert len(tiles) == 9 and len(distinct) == 7
+            assert (distinct[order] == images).all()
+
+            folder = convert_dir("frames", (10, 10))
+            sheet = convert_dir("walk.sheet.png", (10, 10))
+            assert sheet == folder
+            assert convert_dir("still.png", (10, 10)) is None
+            with open(os.path.join("json", "walk", "walk.json")) as f:
+                assert len(json.load(f)["frames"]) == 9
+
+            old = tvlib.sprites.SHEET_MMAP_SIZE
+            tvlib.sprites.SHEET_MMAP_SIZE = 0
+            try:
+                assert (load_sheet("big.png") == imread("big.png")).all()
+                mapped = convert_sheet("big.png", "big", (10, 10), tile_size=(20, 20))
+            finally:
+                tvlib.sprites.SHEET_MMAP_SIZE = old
+            assert mapped == comparator(large, 10, 10)
+            assert convert_sheet("missing.png", "missing", (10, 10)) is None
+
+            assert convert_all((10, 10))
+            assert os.path.exists(os.path.join("json", "frames", "frames.json"))
+            assert not os.path.exists(os.path.join("json", "still"))
+            assert convert_all((10, 10))
+            assert sorted(scan("animations")) == ["frames", "walk.sheet.png"]
+        finally:
+            os.chdir(cwd)
+    print("✓ Tiles convert once per distinct tile, read straight from the sheet")
+    print("✓ Only images named NAME.sheet.EXT are taken as sheets")
+
+    return True
+
+def test_video_conversion():
+    """Test that videos stream into frames at their own or a set frame rate."""
+    print("\nTesting video conversion...")
+
+    import json
+    import tempfile
+    import benchmark
+    from cv2 import VideoWriter, VideoWriter_fourcc
+    from tvlib import Encoding, convert_dir, convert_video
+    from tvlib.comparator import comparator
+
+    images = benchmark.synthetic_animation(20, 20, 6, density=0.3)
+
+    def frames_of(name):
+        with open(os.path.join("json", name, f"{name}.json")) as f:
+            data = json.load(f)
+        return data["metadata"], data["frames"]
+
+    def as_json(frames):
+        return [[list(p) for p in f] for f in frames]
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "animations"))
+        # FFV1 is lossless, so the decoded frames match the source
+        writer = VideoWriter(os.path.join(root, "animations", "clip.avi"),
+                             VideoWriter_fourcc(*"FFV1"), 10, (20, 20))
+        for img in images:
+            writer.write(img)
+        writer.release()
+        try:
+            os.chdir(root)
+            assert convert_dir("clip.avi", (10, 10)) == []
+            metadata, frames = frames_of("clip")
+            assert metadata["fps"] == 10
+            assert frames == as_json(comparator(images, 10, 10))
+            print("✓ Frames stream from the video at its own rate")
+
+            video = os.path.join("animations", "clip.avi")
+            assert convert_video(video, "fast", (10, 10),
+                                 encoding=Encoding(fps=20, hold=True)) == []
+            metadata, frames = frames_of("fast")
+            assert metadata["fps"] == 20 and metadata["durations"] == [2] * 6
+            assert frames == as_json(comparator(images, 10, 10))
+
+            assert convert_video(video, "slow", (10, 10),
+                                 encoding=Encoding(fps=5, palette=0)) == []
+            metadata, frames = frames_of("slow")
+            expected = comparator(images[::2], 10, 10, encoding=Encoding(palette=0))
+            assert metadata["palette"] == [list(c) for c in expected.palette]
+            assert frames == as_json(expected)
+            print("✓ Resampled frame rates keep the source timing")
+
+            assert convert_video("missing.avi", "missing", (10, 10)) is None
+            assert not os.path.exists(os.path.join("json", "missing"))
+        finally:
+            os.chdir(cwd)
+
+    return True
+
+def test_watch_mode():
+    """Test that watch mode reconverts only folders whose frames settle."""
+    print("\nTesting watch mode...")
+
+    import tempfile
+    import benchmark
+    import tvlib._watch
+    from time import sleep
+    from tvlib import convert_all
+    from tvlib._watch import Watcher, scan, watch
+
+    images = benchmark.synthetic_animation(10, 10, 4, density=0.3)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        blink = _write_animation(root, "blink", images)
+        _write_animation(root, "smile", images[::-1])
+        animations = os.path.join(root, "animations")
+        assert sorted(scan(animations)) == ["blink", "smile"]
+        assert len(scan(animations)["blink"]) == 4
+
+        watcher = Watcher(animations, debounce=1.0)
+        assert watcher.poll(now=0.0) == []
+        with open(os.path.join(blink, "frame-0000.png"), "ab") as f:
+            f.write(b"\0")
+        assert watcher.poll(now=10.0) == []
+        os.remove(os.path.join(blink, "frame-0003.png"))
+        assert watcher.poll(now=10.5) == []
+        assert watcher.poll(now=11.0) == []
+        assert watcher.poll(now=11.5) == ["blink"]
+        assert watcher.poll(now=20.0) == []
+        print("✓ A burst of saves is reported once, after it settles")
+
+        try:
+            os.chdir(root)
+            assert convert_all((10, 10))
+            smile = os.path.join("json", "smile", "smile.json")
+            before = os.stat(smile).st_mtime_ns
+            converted = []
+            def convert(changed):
+                converted.append(changed)
+                assert convert_all((10, 10), only=changed)
+            # Add a sheet while the watcher sleeps before its first poll
+            naps = []
+            def nap(seconds):
+                if not naps:
+                    benchmark.write_sheet(images, os.path.join("animations",
+                                                               "sheet.sheet.png"))
+                naps.append(seconds)
+            tvlib._watch.sleep = nap
+            try:
+                watch(convert, "animations", interval=0.25, debounce=0, polls=3)
+            finally:
+                tvlib._watch.sleep = sleep
+            assert naps == [0.25] * 3
+            assert converted == [["sheet.sheet.png"]]
+            assert os.path.exists(os.path.join("json", "sheet", "sheet.json"))
+            assert os.stat(smile).st_mtime_ns == before
+        finally:
+            os.chdir(cwd)
+    print("✓ Only the changed entries are reconverted")
+
+    return True
+
 def main():
     """Run all tests."""
     print("=" * 50)
@@ -119,6 +1494,33 @@ def main():
         test_config,
         test_transformations, 
         test_controller,
+        test_comparator_paths,
+        test_streaming_conversion,
+        test_parallel_convert_all,
+        test_threaded_decoding,
+        test_build_cache,
+        test_pixel_order,
+        test_resample,
+        test_tvb_roundtrip,
+        test_onboard_seek,
+        test_tvb_unchanged_frames,
+        test_onboard_csv_fallback,
+        test_adaptive_keyframes,
+        test_span_encoding,
+        test_palette_encoding,
+        test_hold_encoding,
+        test_frame_store,
+        test_change_tolerance,
+        test_brightness_encoding,
+        test_benchmark_suite,
+        test_stage_profile,
+        test_frame_serializer,
+        test_json_writer,
+        test_frozen_module,
+        test_sprite_slicer,
+        test_sheet_conversion,
+        test_video_conversion,
+        test_watch_mode,
     ]
     
     passed = 0
@@ -7,8 +7,13 @@ for TV Head cosplay projects.
 
 from .transformations import Rotation, Flip
 from ._config import Config
-from .comparator import convert_all, convert_dir, convert_images
+from .comparator import (convert_all, convert_dir, convert_images,
+                         convert_sheet, convert_video, stream_images,
+                         build_frame_store)
 from .sprites import sprite_to_array
+from ._fileio import OutputFormat
+from ._binary import read_tvb
+from .encoding import Encoding
 
 __version__ = "1.0.0"
 __author__ = "Your Name"
@@ -20,5 +25,12 @@ __all__ = [
     "convert_all",
     "convert_dir",
     "convert_images",
-    "sprite_to_array"
+    "convert_sheet",
+    "convert_video",
+    "stream_images",
+    "build_frame_store",
+    "sprite_to_array",
+    "OutputFormat",
+    "read_tvb",
+    "Encoding"
 ]
\ No newline at end of file
@@ -0,0 +1,528 @@
+"""
+Compact binary animation format (.tvb).
+
+All values are little-endian. A file is a fixed header, one record
+per frame, then a table of frame offsets:
+
+    magic        4s   b"TVB1"
+    version      B    FORMAT_VERSION
+    flags        B    FLAG_* bits
+    width        H
+    height       H
+    frame_count  I
+    format       B    index into COLOR_FORMATS
+    type         B    index into FRAME_TYPES
+    name_length  B
+    max_frame    I    size in bytes of the largest frame record
+    index_offset I    file offset of the frame offset table
+    name         name_length bytes of UTF-8
+
+    with FLAG_BAKED:
+    brightness   H    brightness the colors are baked for, in
+                      1/BRIGHTNESS_SCALE
+
+    with FLAG_PALETTE:
+    colors       B    palette size - 1
+    palette      palette size * 3 bytes, in the animation's color format
+
+    per frame:
+    kind         B    only with type "mixed": KIND_KEY for a keyframe
+    duration     H    only with FLAG_HOLD: frame times the frame is shown
+    count        H    number of pixel entries (I with FLAG_WIDE)
+    indices      count * H (I with FLAG_WIDE)
+    colors       count * 3 bytes, in the animation's color format
+
+    per frame, with FLAG_SPANS:
+    kind         B    as above
+    duration     H    as above
+    count        H    number of spans (I with FLAG_WIDE)
+    per span:
+    start        H    index of the first pixel (I with FLAG_WIDE)
+    length       H    pixel count, top bit set for a solid span
+    colors       3 bytes if solid, else length * 3 bytes
+
+    With FLAG_PALETTE every color above is a palette index instead:
+    one byte each, or one nibble each (low nibble first, padded to a
+    byte) with FLAG_NIBBLES. A solid span always takes a whole byte.
+
+    offset table:
+    offsets      frame_count * I, file offset of each frame record
+
+The offset table lets a player seek straight to frame k and read it
+into a buffer of max_frame bytes, so only one frame has to be in
+memory (see onboard/tvb.py). It sits at the end so frames can be
+written as they are produced.
+
+The frames hold exactly the same (index, b, g, r) entries as the
+JSON output, except that a diff without changes is stored with a
+count of 0 instead of the (0, 0, 0, 0) placeholder, so players leave
+pixel 0 alone; `read_tvb` gives the placeholder back. In a "mixed" file each frame is either a diff or a
+keyframe, which is drawn onto a cleared display. Span files hold the
+frames of `tvlib.encoding.to_spans`, so a player can write each span
+into the LED buffer in one go. Baked files hold the LED values at
+their brightness, which a player writes without scaling.
+"""
+from __future__ import annotations
+from array import array
+from struct import Struct
+from sys import byteorder
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+import logging
+
+from tvlib.encoding import (Frame, duration, is_key, unchanged,
+                            NIBBLE_PALETTE)
+
+MAGIC: bytes = b"TVB1"
+FORMAT_VERSION: int = 2
+
+# Indices and counts are 32-bit instead of 16-bit
+FLAG_WIDE: int = 0x01
+# Frames are stored as spans of consecutive pixels
+FLAG_SPANS: int = 0x02
+# Colors are indices into a palette stored after the name
+FLAG_PALETTE: int = 0x04
+# Palette indices are packed two to a byte
+FLAG_NIBBLES: int = 0x08
+# Frames carry a duration
+FLAG_HOLD: int = 0x10
+# Colors are LED values at a brightness stored after the name
+FLAG_BAKED: int = 0x20
+BRIGHTNESS_SCALE: int = 10000
+
+LAYOUTS: Tuple[str, ...] = ("pixels", "spans")
+
+COLOR_FORMATS: Tuple[str, ...] = ("bgr",)
+FRAME_TYPES: Tuple[str, ...] = ("diff", "full", "mixed")
+
+# Per-frame kind byte of "mixed" files
+KIND_KEY: int = 0x01
+
+# Frozen modules are named after the animation with this prefix, so
+# they cannot shadow a firmware module of the same name
+MODULE_PREFIX: str = "tvb_"
+# Bytes per literal line of a frozen module
+MODULE_LINE: int = 32
+
+HEADER = Struct("<4sBBHHIBBBII")
+FRAME_COUNT_OFFSET: int = 10
+MAX_FRAME_OFFSET: int = 17
+
+
+def _typecode(wide: bool) -> str:
+    """
+    array typecode for indices and counts.
+    """
+    return 'I' if wide else 'H'
+
+
+def _solid_bit(wide: bool) -> int:
+    """
+    Bit of a span length that marks a solid span.
+    """
+    return 0x80000000 if wide else 0x8000
+
+
+def _color_size(values: int, nibbles: bool) -> int:
+    """
+    Bytes taken by a number of color values.
+    """
+    return (values + 1) // 2 if nibbles else values
+
+
+def _pack_colors(values: Iterable[int], nibbles: bool) -> bytes:
+    """
+    Pack color values, two palette indices to a byte with nibbles.
+    """
+    if not nibbles:
+        return bytes(values)
+    values = list(values)
+    if len(values) % 2:
+        values.append(0)
+    return bytes(lo | hi << 4 for lo, hi in zip(values[::2], values[1::2]))
+
+
+def _unpack_colors(data: bytes, count: int, nibbles: bool) -> List[int]:
+    """
+    Unpack count color values packed by `_pack_colors`.
+    """
+    if not nibbles:
+        return list(data)
+    return [data[n >> 1] >> (4 * (n & 1)) & 0x0F for n in range(count)]
+
+
+class TVBWriter:
+    """
+    Write frames to a .tvb file one at a time.
+
+    The header is written up front with placeholder counts and patched
+    once the writer is closed, after the frame offset table has been
+    appended, so frames can be streamed straight from the encoder.
+
+    Example:
+    ```Python
+        with TVBWriter(savepath, "blink", 10, 10) as writer:
+            for frame in frames:
+                writer.write(frame)
+    ```
+    """
+
+    def __init__(self,
+                 savepath: str,
+                 name: str,
+                 width: int,
+                 height: int,
+                 color_format: str = "bgr",
+                 frame_type: str = "diff",
+                 layout: str = "pixels",
+                 palette: Optional[List[Tuple[int, int, int]]] = None,
+                 hold: bool = False,
+                 brightness: Optional[float] = None) -> None:
+        self.savepath = savepath
+        self.mixed = frame_type == "mixed"
+        self.hold = hold
+        self.spans = LAYOUTS.index(layout) == 1
+        # Values per color: a palette index or b, g, r
+        self.channels = 3 if palette is None else 1
+        self.nibbles = palette is not None and len(palette) <= NIBBLE_PALETTE
+        # Span lengths lose their top bit to the solid marker
+        self.wide = width * height > (0x7FFF if self.spans else 0xFFFF)
+        self.frame_count = 0
+        self.bytes_written = 0
+        self.max_frame = 0
+        self.offsets = array('I')
+
+        encoded_name = name.encode("utf-8")[:255]
+        header = HEADER.pack(MAGIC, FORMAT_VERSION,
+                             (FLAG_WIDE if self.wide else 0)
+                             | (FLAG_SPANS if self.spans else 0)
+                             | (FLAG_PALETTE if palette is not None else 0)
+                             | (FLAG_NIBBLES if self.nibbles else 0)
+                             | (FLAG_HOLD if hold else 0)
+                             | (FLAG_BAKED if brightness is not None else 0),
+                             width, height, 0,
+                             COLOR_FORMATS.index(color_format),
+                             FRAME_TYPES.index(frame_type),
+                             len(encoded_name), 0, 0)
+
+        self._file: Optional[BinaryIO] = open(savepath, 'wb')
+        self._write(header + encoded_name)
+        if brightness is not None:
+            self._write(round(brightness * BRIGHTNESS_SCALE).to_bytes(2, "little"))
+        if palette is not None:
+            self._write(bytes((len(palette) - 1,))
+                        + bytes(c for color in palette for c in color))
+
+    def __enter__(self) -> 'TVBWriter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def write(self, frame: List[Tuple[int, int, int, int]]) -> None:
+        """
+        Append a frame of (index, b, g, r) entries.
+
+        In a "mixed" file the frame is stored as a keyframe if
+        `is_key(frame)`, otherwise as a diff. A span file takes a frame
+        of spans instead, and a palette file takes palette indices in
+        place of colors. A hold file also records `duration(frame)`.
+        A frame without changes (see `unchanged`) is stored empty.
+        """
+        entries = [] if unchanged(frame) else frame
+        if self.spans:
+            record = self._span_record(entries)
+        else:
+            code = _typecode(self.wide)
+            indices = array(code, (p[0] for p in entries))
+            colors = _pack_colors((c for p in entries for c in p[1:]),
+                                  self.nibbles)
+            count = array(code, (len(entries),))
+            if byteorder != "little":
+                indices.byteswap()
+                count.byteswap()
+            record = count.tobytes() + indices.tobytes() + colors
+        if self.hold:
+            record = duration(frame).to_bytes(2, "little") + record
+        if self.mixed:
+            record = bytes((KIND_KEY if is_key(frame) else 0,)) + record
+        self.offsets.append(self.bytes_written)
+        self.max_frame = max(self.max_frame, len(record))
+        self._write(record)
+        self.frame_count += 1
+
+    def _span_record(self, frame: List[Tuple[int, ...]]) -> bytes:
+        """
+        Pack a frame of (start, length, colors...) spans.
+        """
+        code = _typecode(self.wide)
+        solid = _solid_bit(self.wide)
+        parts: List[bytes] = []
+        for span in frame:
+            start, length = span[0], span[1]
+            if len(span) == 2 + self.channels and length > 1:
+                colors = bytes(span[2:])
+                length |= solid
+            else:
+                colors = _pack_colors(span[2:], self.nibbles)
+            header = array(code, (start, length))
+            if byteorder != "little":
+                header.byteswap()
+            parts.append(header.tobytes())
+            parts.append(colors)
+        count = array(code, (len(frame),))
+        if byteorder != "little":
+            count.byteswap()
+        return count.tobytes() + b"".join(parts)
+
+    def close(self) -> None:
+        """
+        Append the frame offset table, patch the header and close the file.
+        """
+        if self._file is None:
+            return
+        index_offset = self.bytes_written
+        offsets = array('I', self.offsets)
+        if byteorder != "little":
+            offsets.byteswap()
+        self._write(offsets.tobytes())
+
+        self._file.seek(FRAME_COUNT_OFFSET)
+        self._file.write(self.frame_count.to_bytes(4, "little"))
+        self._file.seek(MAX_FRAME_OFFSET)
+        self._file.write(self.max_frame.to_bytes(4, "little")
+                         + index_offset.to_bytes(4, "little"))
+        self._file.close()
+        self._file = None
+
+
+def write_tvb(savepath: str,
+              metadata: Dict[str, Any],
+              frames: Iterable[List[Tuple[int, int, int, int]]]
+              ) -> Optional[Tuple[int, int]]:
+    """
+    Write an animation to a .tvb file.
+
+    Args:
+        savepath: Path to save the file
+        metadata: Animation metadata, as written to the JSON output
+        frames: Iterable of frame data, consumed one frame at a time
+
+    Returns:
+        (frame count, bytes written) or None if failed
+    """
+    try:
+        with TVBWriter(savepath,
+                       metadata["name"],
+                       metadata["width"],
+                       metadata["height"],
+                       metadata.get("format", "bgr"),
+                       metadata.get("type", "diff"),
+                       metadata.get("layout", "pixels"),
+                       metadata.get("palette"),
+                       metadata.get("hold", False),
+                       metadata.get("brightness")) as writer:
+            for frame in frames:
+                writer.write(frame)
+        logging.info(f"Successfully wrote TVB file: {savepath}")
+        return (writer.frame_count, writer.bytes_written)
+    except Exception as e:
+        logging.error(f"Error writing to tvb file: {e}")
+        return None
+
+
+def module_name(name: str) -> str:
+    """
+    Python module name a frozen animation is written under.
+    """
+    return MODULE_PREFIX + "".join(c if c.isalnum() and c.isascii() else "_"
+                                   for c in name)
+
+
+def frozen_module(data: bytes, name: str) -> str:
+    """
+    Source of a MicroPython module holding a .tvb file as a bytes
+    literal, for freezing into firmware.
+
+    Frozen bytes constants stay in flash, so `onboard/tvb.py` can play
+    the animation from `DATA` without parsing or copying it.
+
+    Args:
+        data: Contents of a .tvb file
+        name: Animation name
+
+    Returns:
+        Module source defining NAME and DATA
+    """
+    lines = [f'"""Animation {name!r}, generated by tvlib. Do not edit."""',
+             f"NAME = {name!r}",
+             "DATA = ("]
+    lines += [f"    {data[i:i + MODULE_LINE]!r}"
+              for i in range(0, len(data), MODULE_LINE)]
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def write_frozen(savepath: str, tvb_path: str, name: str) -> Optional[int]:
+    """
+    Write a .tvb file out again as a frozen module (see `frozen_module`).
+
+    Returns:
+        Size of the embedded data in bytes, or None if failed
+    """
+    try:
+        with open(tvb_path, 'rb') as f:
+            data = f.read()
+        with open(savepath, 'w', encoding="utf-8") as f:
+            f.write(frozen_module(data, name))
+        logging.info(f"Successfully wrote frozen module: {savepath}")
+        return len(data)
+    except Exception as e:
+        logging.error(f"Error writing frozen module: {e}")
+        return None
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+    """
+    Read exactly size bytes or raise.
+    """
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of TVB data")
+    return data
+
+
+def _read_spans(source: BinaryIO,
+                count: int,
+                wide: bool,
+                channels: int = 3,
+                nibbles: bool = False) -> List[Tuple[int, ...]]:
+    """
+    Read a frame's spans back into (start, length, colors...) tuples.
+    """
+    code = _typecode(wide)
+    solid = _solid_bit(wide)
+    size = 2 * array(code).itemsize
+    spans: List[Tuple[int, ...]] = []
+    for _ in range(count):
+        header = array(code, _read_exact(source, size))
+        if byteorder != "little":
+            header.byteswap()
+        start, length = header
+        if length & solid:
+            colors = list(_read_exact(source, channels))
+            length &= ~solid
+        else:
+            values = channels * length
+            colors = _unpack_colors(
+                _read_exact(source, _color_size(values, nibbles)),
+                values, nibbles)
+        spans.append((start, length) + tuple(colors))
+    return spans
+
+
+def read_tvb(source: Union[str, BinaryIO]) -> Dict[str, Any]:
+    """
+    Read a .tvb file back into the same structure as the JSON output.
+
+    Args:
+        source: Path to a .tvb file or a binary file object
+
+    Returns:
+        {"metadata": {...}, "frames": [[(index, b, g, r), ...], ...]}
+        For a "mixed" file the frames are `Frame`s and metadata "type"
+        lists "full" or "diff" per frame, as in the JSON output. A span
+        file gives frames of spans and a "layout" of "spans". A palette
+        file gives (index, p) entries and the metadata "palette". A
+        hold file gives `Frame`s with durations and metadata "durations".
+        A baked file gives the metadata "brightness".
+
+    Raises:
+        ValueError: If the data is not a valid TVB file
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return read_tvb(f)
+
+    (magic, version, flags, width, height, frame_count, color_format,
+     frame_type, name_length, _, index_offset) = HEADER.unpack(
+        _read_exact(source, HEADER.size))
+
+    if magic != MAGIC:
+        raise ValueError(f"Not a TVB file (magic {magic!r})")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported TVB version: {version}")
+
+    metadata = {
+        "name": _read_exact(source, name_length).decode("utf-8"),
+        "width": width,
+        "height": height,
+        "total_pixels": width * height,
+        "frame_count": frame_count,
+        "format": COLOR_FORMATS[color_format],
+        "type": FRAME_TYPES[frame_type],
+    }
+
+    if flags & FLAG_SPANS:
+        metadata["layout"] = "spans"
+    if flags & FLAG_BAKED:
+        metadata["brightness"] = int.from_bytes(
+            _read_exact(source, 2), "little") / BRIGHTNESS_SCALE
+
+    channels = 3
+    nibbles = bool(flags & FLAG_NIBBLES)
+    if flags & FLAG_PALETTE:
+        palette_size = _read_exact(source, 1)[0] + 1
+        palette = _read_exact(source, 3 * palette_size)
+        metadata["palette"] = [list(palette[3*n:3*n+3])
+                               for n in range(palette_size)]
+        channels = 1
+
+    mixed = FRAME_TYPES[frame_type] == "mixed"
+    # Empty diffs after the first frame stand for the NO_CHANGE placeholder
+    diffs = FRAME_TYPES[frame_type] != "full"
+    placeholder = ((0, 1) if flags & FLAG_SPANS else (0,)) + (0,) * channels
+    wide = bool(flags & FLAG_WIDE)
+    code = _typecode(wide)
+    size = array(code).itemsize
+    source.seek(index_offset)
+    offsets = array('I', _read_exact(source, 4 * frame_count))
+    if byteorder != "little":
+        offsets.byteswap()
+
+    frames: List[List[Tuple[int, int, int, int]]] = []
+    for offset in offsets:
+        source.seek(offset)
+        key = mixed and bool(_read_exact(source, 1)[0] & KIND_KEY)
+        hold = 1
+        if flags & FLAG_HOLD:
+            hold = int.from_bytes(_read_exact(source, 2), "little")
+        count = array(code, _read_exact(source, size))
+        if byteorder != "little":
+            count.byteswap()
+        if flags & FLAG_SPANS:
+            pixels = _read_spans(source, count[0], wide, channels, nibbles)
+        else:
+            indices = array(code, _read_exact(source, size * count[0]))
+            if byteorder != "little":
+                indices.byteswap()
+            values = channels * len(indices)
+            colors = _unpack_colors(
+                _read_exact(source, _color_size(values, nibbles)),
+                values, nibbles)
+            pixels = [(i,) + tuple(colors[channels*n:channels*(n+1)])
+                      for n, i in enumerate(indices)]
+        if not pixels and frames and diffs and not key:
+            pixels = [placeholder]
+        if mixed or flags & FLAG_HOLD:
+            pixels = Frame(pixels, key, hold)
+        frames.append(pixels)
+
+    if mixed:
+        metadata["type"] = ["full" if is_key(f) else "diff" for f in frames]
+    if flags & FLAG_HOLD:
+        metadata["durations"] = [duration(f) for f in frames]
+    return {"metadata": metadata, "frames": frames}
@@ -0,0 +1,169 @@
+from __future__ import annotations
+from hashlib import sha256
+from os import path, listdir, stat
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+
+from tvlib._fileio import FOLDERS, isimage, mkdir, write_json
+
+CACHE_FILE: str = path.join(FOLDERS.JSON_DIR.value, ".buildcache.json")
+CHUNK_SIZE: int = 1 << 16
+
+
+def _hash_file(file_path: str) -> str:
+    """
+    Hash the contents of a file.
+    """
+    digest = sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Persistent record of the inputs each animation was last built from.
+
+    Every entry holds the settings used for the build and a
+    (size, mtime, sha256) triple per frame file. A file whose size and
+    mtime are unchanged reuses its stored hash, so checking an untouched
+    folder only costs a stat per file.
+
+    Example:
+    ```Python
+        cache = BuildCache.load()
+        reason, entry = cache.check("blink", settings, outputs)
+        if reason is not None:
+            convert_dir("blink", ...)
+            cache.update("blink", entry)
+        cache.save()
+    ```
+    """
+
+    def __init__(self,
+                 cache_path: str = CACHE_FILE,
+                 entries: Optional[Dict[str, Any]] = None) -> None:
+        self.cache_path = cache_path
+        self.entries: Dict[str, Any] = entries if entries is not None else {}
+
+    @staticmethod
+    def load(cache_path: str = CACHE_FILE) -> 'BuildCache':
+        """
+        Load the cache file, starting empty if it is missing or unreadable.
+        """
+        if not path.exists(cache_path):
+            return BuildCache(cache_path)
+
+        try:
+            with open(cache_path, 'r', encoding="utf-8") as f:
+                entries = json.load(f)
+            if not isinstance(entries, dict):
+                raise ValueError("cache root is not an object")
+            return BuildCache(cache_path, entries)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable build cache {cache_path}: {e}")
+            return BuildCache(cache_path)
+
+    def save(self) -> None:
+        """
+        Write the cache back to disk.
+        """
+        mkdir(path.dirname(self.cache_path) or ".")
+        write_json(self.cache_path, self.entries)
+
+    def _fingerprint(self,
+                     folder: str,
+                     settings: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fingerprint the frame files of a folder (or a sprite sheet)
+        together with the settings.
+        """
+        folder_path = path.join(FOLDERS.IMAGE_DIR.value, folder)
+        previous = self.entries.get(folder, {}).get("files", {})
+        files: Dict[str, List[Any]] = {}
+
+        if path.isdir(folder_path):
+            names = sorted(f for f in listdir(folder_path) if isimage(f))
+        else:
+            # A sprite sheet is its own only frame file
+            folder_path, name = path.split(folder_path)
+            names = [name]
+
+        for name in names:
+            st = stat(path.join(folder_path, name))
+            known = previous.get(name)
+            if known is not None and known[:2] == [st.st_size, st.st_mtime_ns]:
+                files[name] = known
+            else:
+                files[name] = [st.st_size, st.st_mtime_ns,
+                               _hash_file(path.join(folder_path, name))]
+
+        digest = sha256(json.dumps(settings, sort_keys=True).encode())
+        for name, (_, _, file_hash) in files.items():
+            digest.update(f"{name}:{file_hash}".encode())
+
+        return {"settings": settings, "files": files,
+                "digest": digest.hexdigest()}
+
+    def check(self,
+              folder: str,
+              settings: Dict[str, Any],
+              outputs: List[str]
+              ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Decide whether a folder needs rebuilding.
+
+        Args:
+            folder: Name of the folder in the animations directory
+            settings: Conversion settings the output depends on
+            outputs: Files the build is expected to produce
+
+        Returns:
+            (reason to rebuild or None if up to date, fresh cache entry)
+        """
+        entry = self._fingerprint(folder, settings)
+        old = self.entries.get(folder)
+
+        if old is None:
+            return ("not built before", entry)
+
+        missing = [o for o in outputs if not path.exists(o)]
+        if missing:
+            return (f"output missing: {', '.join(missing)}", entry)
+
+        if old.get("settings") != settings:
+            changed = sorted(k for k in set(settings) | set(old.get("settings", {}))
+                             if settings.get(k) != old.get("settings", {}).get(k))
+            return (f"settings changed: {', '.join(changed)}", entry)
+
+        if old.get("digest") != entry["digest"]:
+            old_files = old.get("files", {})
+            new_files = entry["files"]
+            added = sorted(set(new_files) - set(old_files))
+            removed = sorted(set(old_files) - set(new_files))
+            modified = sorted(n for n in set(new_files) & set(old_files)
+                              if new_files[n][2] != old_files[n][2])
+            parts = [f"{label} {', '.join(names)}"
+                     for label, names in (("added", added),
+                                          ("removed", removed),
+                                          ("modified", modified))
+                     if names]
+            return (f"frames changed: {'; '.join(parts)}", entry)
+
+        # Keep refreshed mtimes so the next check can skip hashing.
+        self.entries[folder] = entry
+        return (None, entry)
+
+    def update(self, folder: str, entry: Dict[str, Any]) -> None:
+        """
+        Record a successful build of a folder.
+        """
+        self.entries[folder] = entry
+
+    def discard(self, folder: str) -> None:
+        """
+        Forget a folder, forcing its next build.
+        """
+        self.entries.pop(folder, None)
@@ -1,7 +1,10 @@
 import json
-from json import dump, JSONEncoder
-from os import path, makedirs, walk, rename
-from typing import Any, Dict, LiteralString, List, Optional
+from json import JSONEncoder
+from os import path, makedirs, walk, rename, remove, replace
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from typing import (Any, BinaryIO, Dict, Iterable, LiteralString, List,
+                    Optional, Tuple)
 from enum import Enum
 import logging
 
@@ -11,6 +14,11 @@ try:
 except ImportError:
     toml = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     from numpy import integer, floating, ndarray
 except ImportError:
@@ -52,6 +60,20 @@ class FOLDERS(Enum):
     CONFIG_FILE: LiteralString = "conf.toml"
 
 
+# Marks an image in the animations directory as a sprite sheet
+SHEET_SUFFIX: str = ".sheet"
+
+
+class OutputFormat(Enum):
+    """
+    Animation output formats, valued by file extension.
+    """
+    JSON: str = "json"
+    TVB: str = "tvb"
+    # .tvb data as a MicroPython module, to freeze into firmware
+    PY: str = "py"
+
+
 class NpEncoder(JSONEncoder):
     def default(self, obj):
         if isinstance(obj, integer):
@@ -63,6 +85,63 @@ class NpEncoder(JSONEncoder):
         return super(NpEncoder, self).default(obj)
 
 
+# Compact encoders, built once instead of on every dumps() call
+_COMPACT = JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+_COMPACT_NP = NpEncoder(separators=(',', ':'), ensure_ascii=False)
+# Frames written per file write
+FRAME_BATCH: int = 256
+# Characters reserved for a streamed "frame_count", enough for any u32
+FRAME_COUNT_WIDTH: int = 10
+# Suffix of the file an animation is written to before it replaces the output
+PARTIAL_SUFFIX: str = ".part"
+
+
+def frame_json(frame: Any) -> str:
+    """
+    Compact JSON text of one frame.
+
+    Gives exactly the text `json.dumps` with NpEncoder would, but
+    frames of plain ints (or an integer array) are encoded in one call
+    with no per-element callback. orjson is used when it is installed.
+    Anything else falls back to NpEncoder.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(frame, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            pass
+    if isinstance(frame, ndarray):
+        frame = frame.tolist()
+    try:
+        return _COMPACT.encode(frame)
+    except TypeError:
+        return _COMPACT_NP.encode(frame)
+
+
+def _write_frames(f: Any, frames: Iterable[Any]) -> Tuple[int, int]:
+    """
+    Write frames to a text file as a JSON array, a batch at a time.
+
+    Returns:
+        (frame count, pixel count)
+    """
+    frame_count = 0
+    pixel_count = 0
+    batch: List[str] = []
+    f.write('[')
+    for frame in frames:
+        batch.append(frame_json(frame))
+        frame_count += 1
+        pixel_count += len(frame)
+        if len(batch) == FRAME_BATCH:
+            f.write((',' if frame_count > FRAME_BATCH else '') + ','.join(batch))
+            batch.clear()
+    if batch:
+        f.write((',' if frame_count > len(batch) else '') + ','.join(batch))
+    f.write(']')
+    return (frame_count, pixel_count)
+
+
 def mkdir(folder: str) -> str:
     """
     Ensure path exists before returning same path.
@@ -116,10 +195,22 @@ def load_toml(file_path: str) -> Optional[Dict[str, Any]]:
 def _write_json(savepath: str, data: dict) -> None:
     """
     Attempt to write to json file with optimized formatting for microcontrollers.
+
+    A top-level "frames" list is written frame by frame with `frame_json`.
     """
     with open(savepath, 'w', encoding="utf-8") as jsonfile:
         # Use compact formatting to minimize file size for microcontrollers
-        dump(data, jsonfile, cls=NpEncoder, separators=(',', ':'), ensure_ascii=False)
+        if not isinstance(data.get("frames"), list):
+            jsonfile.write(_COMPACT_NP.encode(data))
+            return
+        jsonfile.write('{')
+        for n, (key, value) in enumerate(data.items()):
+            jsonfile.write((',' if n else '') + _COMPACT.encode(key) + ':')
+            if key == "frames":
+                _write_frames(jsonfile, value)
+            else:
+                jsonfile.write(_COMPACT_NP.encode(value))
+        jsonfile.write('}')
 
 
 def write_json(savepath: str, data: dict) -> None:
@@ -138,6 +229,169 @@ def write_json(savepath: str, data: dict) -> None:
         return None
 
 
+class JSONWriter:
+    """
+    Write an animation to a JSON file one frame at a time.
+
+    The metadata is written first and each frame is appended as it
+    arrives, so only the current frame is held in memory. When the
+    number of frames is not known upfront, "frame_count" is written as
+    a fixed-width field, padded with spaces, and patched once the
+    writer is closed.
+
+    Metadata that depends on every frame (a per-frame "type" list or
+    "durations") cannot go ahead of the frames. With late_metadata set
+    the frames are spooled to a temporary file instead, and the
+    metadata as it stands when the writer is closed is written first,
+    with the exact count.
+
+    Everything goes to a file next to savepath, which only replaces
+    savepath once the writer is closed, so a crash or a discarded
+    animation leaves the previous output in place.
+
+    Example:
+    ```Python
+        with JSONWriter(savepath, metadata) as writer:
+            for frame in frames:
+                writer.write(frame)
+    ```
+    """
+
+    def __init__(self,
+                 savepath: str,
+                 metadata: Dict[str, Any],
+                 late_metadata: bool = False,
+                 frame_count: Optional[int] = None) -> None:
+        self.savepath = savepath
+        self.partpath = savepath + PARTIAL_SUFFIX
+        self.metadata = metadata
+        self.frame_count = 0
+        self.pixel_count = 0
+        self._expected = frame_count
+        self._count_offset = 0
+        self._file: Optional[BinaryIO] = open(self.partpath, 'wb')
+        self._frames: BinaryIO = TemporaryFile('w+b') if late_metadata else self._file
+        if not late_metadata:
+            self._write_header(frame_count)
+
+    def __enter__(self) -> 'JSONWriter':
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def _write_header(self, frame_count: Optional[int]) -> None:
+        """
+        Write the metadata, with the frame count if it is known and
+        room for it otherwise.
+        """
+        if frame_count is not None:
+            text = _COMPACT_NP.encode({**self.metadata, "frame_count": frame_count})
+            self._file.write(('{"metadata":' + text + ',"frames":[').encode("utf-8"))
+            return
+        text = _COMPACT_NP.encode({**self.metadata, "frame_count": 0})
+        # Escaped inside strings, so this only matches the key itself
+        at = text.index('"frame_count":0') + len('"frame_count":')
+        head = ('{"metadata":' + text[:at]).encode("utf-8")
+        self._count_offset = len(head)
+        self._file.write(head + b"0".ljust(FRAME_COUNT_WIDTH)
+                         + text[at + 1:].encode("utf-8") + b',"frames":[')
+
+    def write(self, frame: Any) -> None:
+        """
+        Append a frame.
+        """
+        data = frame_json(frame).encode("utf-8")
+        self._frames.write(b',' + data if self.frame_count else data)
+        self.frame_count += 1
+        self.pixel_count += len(frame)
+
+    def close(self) -> None:
+        """
+        Finish the frame array, fill in the frame count and move the
+        file over savepath.
+        """
+        if self._file is None:
+            return
+        if self._expected is not None and self._expected != self.frame_count:
+            self.discard()
+            raise ValueError(f"Expected {self._expected} frames, "
+                             f"got {self.frame_count}")
+        self.metadata["frame_count"] = self.frame_count
+        if self._frames is not self._file:
+            self._write_header(self.frame_count)
+            self._frames.seek(0)
+            copyfileobj(self._frames, self._file)
+            self._frames.close()
+        self._file.write(b']}')
+        if self._count_offset:
+            self._file.seek(self._count_offset)
+            self._file.write(str(self.frame_count).encode().ljust(FRAME_COUNT_WIDTH))
+        self._file.close()
+        self._file = None
+        replace(self.partpath, self.savepath)
+
+    def discard(self) -> None:
+        """
+        Close and delete the unfinished file. Any previous output at
+        savepath is left untouched.
+        """
+        if self._file is None:
+            return
+        if self._frames is not self._file:
+            self._frames.close()
+        self._file.close()
+        self._file = None
+        remove(self.partpath)
+
+
+def write_json_stream(savepath: str,
+                      metadata: dict,
+                      frames: Iterable[Any],
+                      late_metadata: bool = False) -> Optional[Tuple[int, int]]:
+    """
+    Write an animation to a JSON file while consuming its frames one at a time.
+
+    See `JSONWriter`. Nothing is written if there are no frames. A
+    list of frames is written with its exact "frame_count" up front,
+    byte for byte as `write_json` would write it.
+
+    Args:
+        savepath: Path to save the JSON file
+        metadata: Metadata dictionary for the animation, given its
+            "frame_count" once the frames are written
+        frames: Iterable of frame data
+        late_metadata: The metadata is only complete once every frame
+            has gone by
+
+    Returns:
+        (frame count, pixel count) or None if failed
+    """
+    try:
+        known = len(frames) if isinstance(frames, list) else None
+        writer = JSONWriter(savepath, metadata, late_metadata, known)
+        try:
+            for frame in frames:
+                writer.write(frame)
+        except BaseException:
+            writer.discard()
+            raise
+
+        if writer.frame_count == 0:
+            writer.discard()
+            return (0, 0)
+        writer.close()
+
+        logging.info(f"Successfully wrote JSON file: {savepath}")
+        return (writer.frame_count, writer.pixel_count)
+    except Exception as e:
+        logging.error(f"Error writing to json file: {e}")
+        return None
+
+
 def isimage(file_path: str) -> bool:
     """
     Check if file is an image.
@@ -148,6 +402,23 @@ def isimage(file_path: str) -> bool:
                                                    '.heif', '.heic', '.raw']
 
 
+def issheet(file_path: str) -> bool:
+    """
+    Check if file is a sprite sheet, an image named NAME.sheet.EXT.
+    """
+    stem = path.splitext(path.basename(file_path))[0]
+    return isimage(file_path) and path.splitext(stem)[1].lower() == SHEET_SUFFIX
+
+
+def isvideo(file_path: str) -> bool:
+    """
+    Check if file is a video or animated GIF.
+    """
+    return path.splitext(file_path)[1].lower() in ['.mp4', '.mov', '.avi',
+                                                   '.mkv', '.webm', '.m4v',
+                                                   '.gif']
+
+
 def _find_digit_bound(filename: str) -> tuple[bool, int] | tuple[bool, None]:
     """
     Find the ending digit of a filename.
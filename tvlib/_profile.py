@@ -0,0 +1,157 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import json
+
+# Conversion stages, in pipeline order
+STAGES = ("decode", "realign", "diff", "serialize")
+COUNTERS = ("frames", "pixels", "bytes")
+
+
+class Profile:
+    """
+    Time spent in each conversion stage of one animation, plus counters
+    for the frames and changed pixels produced and the bytes written.
+
+    Stage times are exclusive: while a stage runs inside another (as
+    decoding does inside serialization when streaming), the time goes
+    to the inner stage only.
+
+    Example:
+    ```Python
+        with profiling("blink") as profile:
+            convert_dir("blink", (10, 10))
+        print(profile.times["diff"], profile.counts["pixels"])
+    ```
+    """
+
+    def __init__(self, label: str = "") -> None:
+        self.label = label
+        self.times: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.counts: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self._stack: List[str] = []
+        self._mark = 0.0
+
+    def total(self) -> float:
+        """
+        Time spent in all stages.
+        """
+        return sum(self.times.values())
+
+    def merge(self, other: 'Profile') -> None:
+        """
+        Add another profile's times and counts to this one.
+        """
+        for name, seconds in other.times.items():
+            self.times[name] = self.times.get(name, 0.0) + seconds
+        for name, n in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The profile as plain values, times in seconds.
+        """
+        return {"label": self.label, **self.times, "total": self.total(),
+                **self.counts}
+
+    def _charge(self) -> None:
+        now = perf_counter()
+        if self._stack:
+            self.times[self._stack[-1]] += now - self._mark
+        self._mark = now
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the results travel back from pool workers
+        return {"label": self.label, "times": self.times, "counts": self.counts}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["label"])
+        self.times.update(state["times"])
+        self.counts.update(state["counts"])
+
+
+# Profile being recorded by `profiling` on this process, if any
+_current: Optional[Profile] = None
+
+
+@contextmanager
+def profiling(label: str = "") -> Iterator[Profile]:
+    """
+    Record the stages run inside the block into a new `Profile`.
+
+    Stages are timed from the thread that runs the conversion, so
+    image decoding on a thread pool counts as the time spent waiting
+    for each image.
+    """
+    global _current
+    previous = _current
+    _current = Profile(label)
+    try:
+        yield _current
+    finally:
+        _current = previous
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time the block as one stage of the active profile. Does nothing
+    when no profile is being recorded.
+    """
+    profile = _current
+    if profile is None:
+        yield
+        return
+
+    profile._charge()
+    profile._stack.append(name)
+    try:
+        yield
+    finally:
+        profile._charge()
+        profile._stack.pop()
+
+
+def count(**counters: int) -> None:
+    """
+    Add to the counters of the active profile, if any.
+    """
+    if _current is None:
+        return
+    for name, n in counters.items():
+        _current.counts[name] = _current.counts.get(name, 0) + n
+
+
+def format_profiles(profiles: Iterable[Profile]) -> str:
+    """
+    Per-animation and total breakdown as a table, times in ms.
+    """
+    profiles = list(profiles)
+    total = Profile("total")
+    for profile in profiles:
+        total.merge(profile)
+
+    width = max([len(p.label) for p in profiles] + [len(total.label)])
+    columns = STAGES + ("total",) + COUNTERS
+    lines = [f"{'':<{width}}" + "".join(f"{c:>11}" for c in columns)]
+    for profile in profiles + [total]:
+        row = profile.to_dict()
+        cells = [f"{1000 * row[c]:11.1f}" for c in STAGES + ("total",)]
+        cells += [f"{row[c]:11d}" for c in COUNTERS]
+        lines.append(f"{profile.label:<{width}}" + "".join(cells))
+    return "\n".join(lines)
+
+
+def write_profiles(file_path: str, profiles: Iterable[Profile]) -> None:
+    """
+    Append one JSON line per profile, then one for their total.
+    """
+    profiles = list(profiles)
+    total = Profile("total")
+    for profile in profiles:
+        total.merge(profile)
+
+    with open(file_path, 'a', encoding="utf-8") as f:
+        for profile in profiles + [total]:
+            f.write(json.dumps(profile.to_dict()) + "\n")
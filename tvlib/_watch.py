@@ -0,0 +1,127 @@
+from __future__ import annotations
+from os import path, scandir
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+from tvlib._fileio import FOLDERS, isimage, issheet, isvideo
+
+# Seconds between scans of the animations directory
+POLL_INTERVAL: float = 0.5
+# Seconds an entry must go unchanged before it is reconverted
+DEBOUNCE: float = 1.0
+
+# (name, size, mtime) of each frame file of an entry
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+def scan(root: str = FOLDERS.IMAGE_DIR.value) -> Dict[str, Signature]:
+    """
+    Index the animations directory by (name, size, mtime) of every
+    frame file, per folder, sprite sheet or video.
+
+    Only directory listings and stats are read, never file contents,
+    so a scan of thousands of files stays cheap enough to repeat
+    every poll.
+    """
+    index: Dict[str, Signature] = {}
+    try:
+        entries = list(scandir(root))
+    except OSError:
+        return index
+
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                files = []
+                with scandir(entry.path) as frames:
+                    for frame in frames:
+                        if isimage(frame.name) and frame.is_file():
+                            st = frame.stat()
+                            files.append((frame.name, st.st_size,
+                                          st.st_mtime_ns))
+                index[entry.name] = tuple(sorted(files))
+            elif issheet(entry.name) or isvideo(entry.name):
+                st = entry.stat()
+                index[entry.name] = ((entry.name, st.st_size, st.st_mtime_ns),)
+        except OSError:
+            # Removed while it was being scanned; the next poll sees it gone
+            continue
+    return index
+
+
+class Watcher:
+    """
+    Spot the entries of the animations directory that changed since
+    the last poll.
+
+    A changed entry is only reported once it has stayed unchanged for
+    `debounce` seconds, so a burst of saves (or an export of many
+    frames) triggers a single conversion after it settles.
+
+    Example:
+    ```Python
+        watcher = Watcher()
+        while True:
+            sleep(POLL_INTERVAL)
+            for folder in watcher.poll():
+                convert_dir(folder, ...)
+    ```
+    """
+
+    def __init__(self,
+                 root: str = FOLDERS.IMAGE_DIR.value,
+                 debounce: float = DEBOUNCE) -> None:
+        self.root = root
+        self.debounce = debounce
+        self.index = scan(root)
+        # Entries waiting to settle, with the time they last changed
+        self.pending: Dict[str, float] = {}
+
+    def poll(self, now: Optional[float] = None) -> List[str]:
+        """
+        Rescan and return the changed entries that have settled, sorted.
+        Entries that were removed are reported too.
+        """
+        now = monotonic() if now is None else now
+        index = scan(self.root)
+        for name in set(index) | set(self.index):
+            if index.get(name) != self.index.get(name):
+                self.pending[name] = now
+        self.index = index
+
+        ready = sorted(name for name, changed in self.pending.items()
+                       if now - changed >= self.debounce)
+        for name in ready:
+            del self.pending[name]
+        return ready
+
+
+def watch(convert: Callable[[List[str]], Any],
+          root: str = FOLDERS.IMAGE_DIR.value,
+          interval: float = POLL_INTERVAL,
+          debounce: float = DEBOUNCE,
+          polls: Optional[int] = None) -> None:
+    """
+    Poll the animations directory and pass the entries that changed,
+    and still exist, to convert.
+
+    Args:
+        convert: Called with the names of the changed entries
+        root: Animations directory
+        interval: Seconds to sleep between polls
+        debounce: Seconds an entry must be unchanged before it is
+            converted (see `Watcher`)
+        polls: Stop after this many polls, default never
+    """
+    watcher = Watcher(root, debounce)
+    logging.info(f"Watching {root} for changes")
+    n = 0
+    while polls is None or n < polls:
+        sleep(interval)
+        n += 1
+        changed = [name for name in watcher.poll()
+                   if path.exists(path.join(root, name))]
+        if changed:
+            logging.info(f"Changed: {', '.join(changed)}")
+            convert(changed)
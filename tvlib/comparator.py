@@ -1,52 +1,116 @@
 from __future__ import annotations
-from typing import List, Tuple, Optional, TYPE_CHECKING
-from os import path, listdir
+from typing import (Any, Dict, Iterable, Iterator, List, Tuple, Optional,
+                    TYPE_CHECKING)
+from os import path, listdir, cpu_count, remove
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+from functools import lru_cache
+from dataclasses import replace
+from hashlib import sha256
 import logging
 
 # Handle optional imports
 try:
-    from numpy import array, nonzero, array_equal, flip, uint8, resize
+    from numpy import (array, asarray, nonzero, array_equal, uint8,
+                       column_stack, cumsum, arange, int32, diff, append)
 except ImportError:
     logging.warning("NumPy not available. Some functionality may be limited.")
     array = list
+    asarray = list
     nonzero = lambda x: []
     array_equal = lambda x, y: x == y
-    flip = lambda x, axis=None: x
     uint8 = int
-    resize = lambda x, shape: x
+    column_stack = None
+    cumsum = None
+    arange = range
+    int32 = int
+    diff = None
+    append = None
 
 try:
-    from cv2 import imread
+    from cv2 import imread, VideoCapture, CAP_PROP_FPS, CAP_PROP_POS_MSEC
 except ImportError:
     logging.warning("OpenCV not available. Image loading will be limited.")
     def imread(path: str):
         """Fallback imread function."""
         logging.error(f"Cannot load image {path} - OpenCV not available")
         return None
+    VideoCapture = None
+    CAP_PROP_FPS = CAP_PROP_POS_MSEC = None
 
 if TYPE_CHECKING:
-    from tvlib._config import MatLike
+    from tvlib._config import MatLike, NDArray
 
-from tvlib.transformations import Flip, Rotation
+from tvlib.transformations import Flip, Rotation, resample
 from tvlib._config import Config
-from tvlib._fileio import write_json, FOLDERS, mkdir, isimage
+from tvlib._cache import BuildCache
+from tvlib._fileio import (write_json, write_json_stream, FOLDERS, mkdir,
+                           isimage, issheet, isvideo, OutputFormat,
+                           SHEET_SUFFIX)
+from tvlib._binary import TVBWriter, module_name, write_frozen, write_tvb
+from tvlib._profile import Profile, count, profiling, stage
+from tvlib.sprites import load_sheet, slice_sheet, trim_tiles, unique_tiles
+from tvlib.encoding import (Encoding, Frame, Frames, apply_tolerance,
+                            build_palette, count_colors, count_writes,
+                            duration, encode_frame, frame_cost, frame_types,
+                            is_key, output_levels, palette_lookup,
+                            quantize)
 
 
-def save_frames_json(frames: List[List[Tuple[int, int, int, int]]],
+def _track_types(frames: Iterable[List[Tuple[int, int, int, int]]],
+                 metadata: Dict[str, Any]
+                 ) -> Iterator[List[Tuple[int, int, int, int]]]:
+    """
+    Pass frames along, switching metadata["type"] to a per-frame
+    list once a keyframe goes by, and filling in metadata["durations"]
+    when it is present.
+    """
+    types: List[str] = []
+    durations = metadata.get("durations")
+    for frame in frames:
+        types.append("full" if is_key(frame) else "diff")
+        if is_key(frame):
+            metadata["type"] = types
+        if durations is not None:
+            durations.append(duration(frame))
+        yield frame
+
+
+def save_frames_json(frames: Iterable[List[Tuple[int, int, int, int]]],
                      label: str,
-                     target_dimensions: Tuple[int, int]) -> bool:
+                     target_dimensions: Tuple[int, int],
+                     encoding: Optional[Encoding] = None,
+                     palette: Optional[List[Tuple[int, int, int]]] = None
+                     ) -> bool:
     """
     Save the converted frames to an optimized JSON file for microcontrollers.
+
+    Frames are written out one at a time (see `JSONWriter`), so no
+    encoded copy of the animation is built in memory. Streamed frames
+    are spooled to a temporary file and follow the finished metadata,
+    so the output is the same as for a list of the frames.
+
+    When the frames include keyframes, metadata "type" becomes a list
+    with a "full" or "diff" entry per frame. Span encoded frames are
+    marked with a "layout" of "spans", and palette frames come with
+    their "palette" of [b, g, r] colors. With hold encoding, metadata
+    "durations" gives the number of frame times each frame is shown.
+    Colors baked for a brightness come with that "brightness", and
+    gamma corrected colors with their "gamma".
     
     Args:
-        frames: List of frame data
+        frames: List of frame data, or an iterator of frames (e.g. from
+            `stream_images`) which is written out as it is consumed
         label: Label for the output file
         target_dimensions: (width, height) of the display
+        encoding: Encoding the frames were produced with
+        palette: Palette the frames index into, if any
         
     Returns:
         True if successful, False otherwise
     """
-    if len(frames) == 0:
+    if isinstance(frames, list) and len(frames) == 0:
         logging.warning("No frames to save")
         return False
 
@@ -54,34 +118,61 @@ def save_frames_json(frames: List[List[Tuple[int, int, int, int]]],
         width, height = target_dimensions
         
         # Create minimal JSON structure matching the specified format
-        animation_data = {
-            "metadata": {
-                "name": label,
-                "width": width,
-                "height": height,
-                "total_pixels": width * height,
-                "frame_count": len(frames),
-                "format": "bgr",
-                "type": "diff"  # Global type for the animation
-            },
-            "frames": frames  # Simple array of frame data
+        metadata = {
+            "name": label,
+            "width": width,
+            "height": height,
+            "total_pixels": width * height,
+            "frame_count": 0,
+            "format": "bgr",
+            "type": "diff"  # Global type for the animation
         }
+        if encoding is not None and encoding.spans:
+            metadata["layout"] = "spans"
+        if palette is not None:
+            metadata["palette"] = [list(color) for color in palette]
+        if encoding is not None and encoding.baked() is not None:
+            metadata["brightness"] = encoding.baked()
+        if encoding is not None and encoding.gamma != 1.0:
+            metadata["gamma"] = encoding.gamma
+        if encoding is not None and encoding.fps is not None:
+            metadata["fps"] = encoding.fps
+        hold = encoding is not None and encoding.hold
+        if hold:
+            metadata["durations"] = []
 
         # Save to JSON file
         output_dir = path.join(FOLDERS.JSON_DIR.value, label)
         mkdir(output_dir)
         savepath = path.join(output_dir, f'{label}.json')
         
-        write_json(savepath, animation_data)
+        if isinstance(frames, list):
+            types = frame_types(frames)
+            if "full" in types:
+                metadata["type"] = types
+            if hold:
+                metadata["durations"] = [duration(f) for f in frames]
+            counts = write_json_stream(savepath, metadata, frames)
+        else:
+            # Spooled, so the exact count and any per-frame metadata,
+            # only known once every frame is seen, go ahead of the frames
+            counts = write_json_stream(savepath, metadata,
+                                       _track_types(frames, metadata), True)
+        if counts is None:
+            return False
+        frame_count, pixel_count = counts
+        if frame_count == 0:
+            logging.warning("No frames to save")
+            return False
         
         # Calculate compression statistics
-        total_pixels_uncompressed = len(frames) * width * height * 3  # 3 bytes per pixel
-        total_pixels_compressed = sum(len(frame_data) for frame_data in frames) * 3
+        total_pixels_uncompressed = frame_count * width * height * 3  # 3 bytes per pixel
+        total_pixels_compressed = pixel_count * 3
         compression_ratio = (1 - total_pixels_compressed / total_pixels_uncompressed) * 100
         
         logging.info(f"Saved animation '{label}' to JSON format: {savepath}")
         logging.info(f"Compression: {compression_ratio:.1f}% size reduction")
-        logging.info(f"Frame count: {len(frames)}, Resolution: {width}x{height}")
+        logging.info(f"Frame count: {frame_count}, Resolution: {width}x{height}")
         
         return True
         
@@ -90,6 +181,275 @@ def save_frames_json(frames: List[List[Tuple[int, int, int, int]]],
         return False
 
 
+def _tvb_metadata(label: str,
+                  target_dimensions: Tuple[int, int],
+                  encoding: Optional[Encoding],
+                  palette: Optional[List[Tuple[int, int, int]]] = None
+                  ) -> Dict[str, Any]:
+    """
+    Header fields for a .tvb file, which must be known before any frame.
+    """
+    width, height = target_dimensions
+    keyframes = encoding is not None and encoding.keyframe_interval is not None
+    spans = encoding is not None and encoding.spans
+    return {
+        "name": label,
+        "width": width,
+        "height": height,
+        "type": "mixed" if keyframes else "diff",
+        "layout": "spans" if spans else "pixels",
+        "palette": palette,
+        "hold": encoding is not None and encoding.hold,
+        "brightness": encoding.baked() if encoding is not None else None,
+    }
+
+
+def save_frames_tvb(frames: Iterable[List[Tuple[int, int, int, int]]],
+                    label: str,
+                    target_dimensions: Tuple[int, int],
+                    encoding: Optional[Encoding] = None,
+                    palette: Optional[List[Tuple[int, int, int]]] = None
+                    ) -> bool:
+    """
+    Save the converted frames to a compact binary .tvb file.
+
+    Args:
+        frames: List of frame data, or an iterator of frames
+        label: Label for the output file
+        target_dimensions: (width, height) of the display
+        encoding: Encoding the frames were produced with
+        palette: Palette the frames index into, if any
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if isinstance(frames, list) and len(frames) == 0:
+        logging.warning("No frames to save")
+        return False
+
+    output_dir = path.join(FOLDERS.JSON_DIR.value, label)
+    mkdir(output_dir)
+    savepath = path.join(output_dir, f'{label}.tvb')
+
+    result = write_tvb(savepath,
+                       _tvb_metadata(label, target_dimensions, encoding,
+                                     palette),
+                       frames)
+    if result is None:
+        return False
+
+    frame_count, size = result
+    logging.info(f"Saved animation '{label}' to TVB format: {savepath}")
+    logging.info(f"Frame count: {frame_count}, {size} bytes")
+    return True
+
+
+def _write_through(frames: Iterable[List[Tuple[int, int, int, int]]],
+                   writer: TVBWriter
+                   ) -> Iterator[List[Tuple[int, int, int, int]]]:
+    """
+    Pass frames along while also appending each one to a .tvb writer.
+    """
+    for frame in frames:
+        writer.write(frame)
+        yield frame
+
+
+def _output_path(label: str, fmt: OutputFormat) -> str:
+    """
+    Path of an animation's output file in the given format.
+    """
+    if fmt is OutputFormat.PY:
+        return path.join(FOLDERS.JSON_DIR.value, label,
+                         f'{module_name(label)}.py')
+    return path.join(FOLDERS.JSON_DIR.value, label, f'{label}.{fmt.value}')
+
+
+def save_frames_py(label: str) -> bool:
+    """
+    Write an animation's .tvb file out as a frozen MicroPython module.
+
+    Args:
+        label: Label of an animation already saved in TVB format
+
+    Returns:
+        True if successful, False otherwise
+    """
+    savepath = _output_path(label, OutputFormat.PY)
+    size = write_frozen(savepath, _output_path(label, OutputFormat.TVB), label)
+    if size is None:
+        return False
+
+    logging.info(f"Saved animation '{label}' as frozen module: {savepath}")
+    logging.info(f"Embedded {size} bytes")
+    return True
+
+
+def save_frames(frames: Iterable[List[Tuple[int, int, int, int]]],
+                label: str,
+                target_dimensions: Tuple[int, int],
+                formats: Iterable[OutputFormat] = (OutputFormat.JSON,),
+                encoding: Optional[Encoding] = None,
+                palette: Optional[List[Tuple[int, int, int]]] = None
+                ) -> bool:
+    """
+    Save the converted frames in each of the requested output formats.
+
+    A frame iterator is only consumed once: when both JSON and TVB
+    are requested, every frame the JSON writer takes is also appended
+    to the .tvb file on the way through. A frozen module is made from
+    the finished .tvb file, which is removed again if TVB itself was
+    not requested.
+
+    Args:
+        frames: List of frame data, or an iterator of frames
+        label: Label for the output files
+        target_dimensions: (width, height) of the display
+        formats: Output formats to write
+        encoding: Encoding the frames were produced with
+        palette: Palette the frames index into, if any
+
+    Returns:
+        True if every format was written, False otherwise
+    """
+    formats = tuple(dict.fromkeys(formats))
+    if OutputFormat.PY not in formats:
+        return _save_formats(frames, label, target_dimensions, formats,
+                             encoding, palette)
+
+    written = tuple(fmt for fmt in formats if fmt is not OutputFormat.PY)
+    keep_tvb = OutputFormat.TVB in written
+    if not keep_tvb:
+        written += (OutputFormat.TVB,)
+
+    success = _save_formats(frames, label, target_dimensions, written,
+                            encoding, palette)
+    if success:
+        success = save_frames_py(label)
+
+    tvb_path = _output_path(label, OutputFormat.TVB)
+    if not keep_tvb and path.exists(tvb_path):
+        remove(tvb_path)
+    return success
+
+
+def _save_formats(frames: Iterable[List[Tuple[int, int, int, int]]],
+                  label: str,
+                  target_dimensions: Tuple[int, int],
+                  formats: Tuple[OutputFormat, ...],
+                  encoding: Optional[Encoding] = None,
+                  palette: Optional[List[Tuple[int, int, int]]] = None
+                  ) -> bool:
+    """
+    Save the frames as JSON and/or TVB (see `save_frames`).
+    """
+    if isinstance(frames, list) or len(formats) == 1:
+        success = True
+        for fmt in formats:
+            if fmt is OutputFormat.JSON:
+                success &= save_frames_json(frames, label, target_dimensions,
+                                            encoding, palette)
+            elif fmt is OutputFormat.TVB:
+                success &= save_frames_tvb(frames, label, target_dimensions,
+                                           encoding, palette)
+        return success
+
+    metadata = _tvb_metadata(label, target_dimensions, encoding, palette)
+    output_dir = path.join(FOLDERS.JSON_DIR.value, label)
+    mkdir(output_dir)
+    savepath = path.join(output_dir, f'{label}.tvb')
+
+    try:
+        with TVBWriter(savepath, label, metadata["width"], metadata["height"],
+                       frame_type=metadata["type"],
+                       layout=metadata["layout"],
+                       palette=palette,
+                       hold=metadata["hold"],
+                       brightness=metadata["brightness"]) as writer:
+            success = save_frames_json(_write_through(frames, writer),
+                                       label, target_dimensions, encoding,
+                                       palette)
+    except Exception as e:
+        logging.error(f"Error writing to tvb file: {e}")
+        return False
+
+    if success:
+        logging.info(f"Saved animation '{label}' to TVB format: {savepath}")
+        logging.info(f"Frame count: {writer.frame_count}, "
+                     f"{writer.bytes_written} bytes")
+    return success
+
+
+@lru_cache(maxsize=None)
+def _pixel_order(tw: int,
+                 th: int,
+                 rotator: Rotation = Rotation.NONE,
+                 flipper: Flip = Flip.NONE) -> 'NDArray':
+    """
+    Precompute where each LED on the strip takes its pixel from.
+
+    Rotation, flip and the serpentine reversal of every second row are
+    all fixed permutations of pixel positions for a given target size,
+    so they are worked out once by pushing a grid of flat pixel indices
+    through the same transformations.
+
+    Args:
+        tw: Target width
+        th: Target height
+        rotator: Rotation transformation to apply
+        flipper: Flip transformation to apply
+
+    Returns:
+        Read-only array of flat (th * tw) source indices in strip order
+    """
+    grid = arange(tw * th, dtype=int32).reshape(th, tw)
+
+    try:
+        grid = flipper(rotator(grid))
+    except Exception as e:
+        logging.error(f"Error applying transformations: {e}")
+        raise
+
+    if len(grid.shape) != 2 or grid.size != tw * th:
+        raise ValueError(f"Transformations changed pixel count: {grid.shape}")
+
+    # Reverse the order of pixels in every second row
+    grid = grid.copy()
+    grid[1::2] = grid[1::2, ::-1]
+
+    order = grid.reshape(-1)
+    order.setflags(write=False)
+    return order
+
+
+def _prepare(IMAGES: 'MatLike', tw: int, th: int) -> 'MatLike':
+    """
+    Bring a stack of images to 3 channels at the target size.
+
+    Args:
+        IMAGES: Array of images, (N, h, w, 3) or grayscale (N, h, w)
+        tw: Target width
+        th: Target height
+
+    Returns:
+        (N, th, tw, 3) array
+    """
+    # Handle both grayscale and color images
+    if len(IMAGES.shape) == 3:
+        # Convert grayscale to 3-channel for consistency
+        IMAGES = IMAGES[..., None].repeat(3, axis=-1)
+        logging.debug(f"Converted grayscale to 3-channel, new shape: {IMAGES.shape}")
+    elif len(IMAGES.shape) != 4 or IMAGES.shape[-1] != 3:
+        raise ValueError(f"Unsupported image shape: {IMAGES.shape[1:]}")
+
+    height, width = IMAGES.shape[1:3]
+    if (tw, th) != (width, height):
+        logging.debug(f"Resampling from ({width}, {height}) to {(tw, th)}")
+        IMAGES = resample(IMAGES, tw, th)
+
+    return IMAGES
+
+
 def _realign(img: 'MatLike',
              tw: int,
              th: int,
@@ -110,62 +470,507 @@ def _realign(img: 'MatLike',
     """
     if img is None:
         raise ValueError("Input image is None")
-        
+
     logging.debug(f"Processing image with shape: {img.shape}")
-    
-    # Handle both grayscale (2D) and color (3D) images
-    if len(img.shape) == 2:
-        height, width = img.shape
-        channels = 1
-        # Convert grayscale to 3-channel for consistency
-        img = array([img, img, img]).transpose(1, 2, 0)
-        logging.debug(f"Converted grayscale to 3-channel, new shape: {img.shape}")
-    elif len(img.shape) == 3:
-        height, width, channels = img.shape
-    else:
-        raise ValueError(f"Unsupported image shape: {img.shape}")
-    
-    target_dimensions = (tw, th)
-    if target_dimensions != (width, height):
-        logging.debug(f"Resizing from ({width}, {height}) to {target_dimensions}")
-        img = resize(img, target_dimensions)
-        width, height = target_dimensions
+    return _realign_stack(img[None], tw, th, rotator, flipper)[0]
 
-    # Apply transformations
-    try:
-        img = rotator(img)
-        img = flipper(img)
-    except Exception as e:
-        logging.error(f"Error applying transformations: {e}")
-        raise
 
-    # Ensure we still have the right shape after transformations
-    if len(img.shape) != 3:
-        raise ValueError(f"Image has wrong shape after transformations: {img.shape}")
+def _realign_stack(IMAGES: 'MatLike',
+                   tw: int,
+                   th: int,
+                   rotator: Rotation = Rotation.NONE,
+                   flipper: Flip = Flip.NONE) -> 'MatLike':
+    """
+    Realign a whole stack of images with a single gather.
 
-    # Reverse the order of pixels in every second row
-    img[1::2, :] = flip(img[1::2, :], axis=1)
-    
-    # Flatten the image
-    flattened = img.reshape(-1, img.shape[-1])
-    logging.debug(f"Flattened image shape: {flattened.shape}")
-    
-    return flattened
+    Args:
+        IMAGES: Array of images, (N, h, w, 3) or (N, h, w)
+        tw: Target width
+        th: Target height
+        rotator: Rotation transformation to apply
+        flipper: Flip transformation to apply
+
+    Returns:
+        (N, tw * th, 3) array of frames in strip order
+    """
+    order = _pixel_order(tw, th, rotator, flipper)
+    IMAGES = _prepare(IMAGES, tw, th)
+    return IMAGES.reshape(len(IMAGES), -1, 3)[:, order]
 
 
 def _nonzero(img: MatLike) -> List[Tuple[int, int, int, int]]:
     """
     Extract non-zero values from image.
     """
-    nonzero_pixels = nonzero(img.any(axis=1))
-    frame = [(i, *img[i]) for i in nonzero_pixels[0]]
-    return frame
+    nonzero_pixels = nonzero(img.any(axis=1))[0]
+    rows = column_stack((nonzero_pixels, img[nonzero_pixels])).tolist()
+    return list(map(tuple, rows))
+
+
+def _diff_pair(old_frame: 'MatLike',
+               new_frame: 'MatLike') -> List[Tuple[int, int, int, int]]:
+    """
+    Diff a single pair of realigned frames.
+    """
+    changed = nonzero((new_frame != old_frame).any(axis=1))[0]
+    if len(changed) == 0:
+        return [(0, 0, 0, 0)]
+    rows = column_stack((changed, new_frame[changed])).tolist()
+    return list(map(tuple, rows))
+
+
+def _diff_loop(FRAMES: 'MatLike') -> List[List[Tuple[int, int, int, int]]]:
+    """
+    Diff consecutive realigned frames pixel by pixel.
+    This is the reference implementation kept for comparison
+    against the vectorized path in `_diff_stack`.
+    """
+    frames: List[List[Tuple[int, int, int, int]]] = [
+                                    [(0, 0, 0, 0)] for _ in range(len(FRAMES))
+                                ]
+    old_frame = FRAMES[0]
+    frames[0] = _nonzero(old_frame)
+
+    for index, new_frame in enumerate(FRAMES[1:]):
+        changes: List[Tuple[int, int, int, int]] = []
+
+        if not array_equal(new_frame, old_frame):
+            for i in range(len(new_frame)):
+                if not array_equal(new_frame[i], old_frame[i]):
+                    b, g, r = new_frame[i]
+                    changes.append((i, b, g, r))
+
+        # Store changes for further processing
+        if len(changes) > 0:
+            frames[index+1] = changes
+
+        # Update old_frame for the next iteration
+        old_frame = new_frame
+
+    return frames
+
+
+def _diff_stack(FRAMES: 'MatLike') -> List[List[Tuple[int, int, int, int]]]:
+    """
+    Diff the whole (N, P, 3) stack of realigned frames at once.
+
+    The changed-pixel masks for every frame pair are computed in one
+    comparison, then indices and colors are pulled out in bulk and
+    split back into per-frame lists. Frames without changes get the
+    same [(0, 0, 0, 0)] placeholder as `_diff_loop`.
+    """
+    frames: List[List[Tuple[int, int, int, int]]] = [_nonzero(FRAMES[0])]
+    if len(FRAMES) == 1:
+        return frames
+
+    changed = (FRAMES[1:] != FRAMES[:-1]).any(axis=2)
+    frame_idx, pixel_idx = nonzero(changed)
+    colors = FRAMES[1:][frame_idx, pixel_idx]
+    rows = list(map(tuple, column_stack((pixel_idx, colors)).tolist()))
+
+    start = 0
+    for end in cumsum(changed.sum(axis=1)).tolist():
+        frames.append(rows[start:end] if end > start else [(0, 0, 0, 0)])
+        start = end
+
+    return frames
+
+
+def _is_keyframe(index: int,
+                 lit: int,
+                 changed: int,
+                 interval: Optional[int]) -> bool:
+    """
+    Decide whether a frame should be stored as a keyframe.
+
+    Args:
+        index: Position of the frame in the animation
+        lit: Number of non-black pixels in the frame
+        changed: Number of entries in the frame's diff
+        interval: `Encoding.keyframe_interval`
+
+    Returns:
+        True if forced by the interval, or if the full frame is
+        cheaper to store than the diff
+    """
+    if interval is None:
+        return False
+    if index == 0 or (interval > 0 and index % interval == 0):
+        return True
+    return frame_cost(lit) < frame_cost(changed)
+
+
+def _fold(FRAMES: 'MatLike') -> Tuple['MatLike', List[int]]:
+    """
+    Drop frames identical to the one before them.
+
+    Returns:
+        (remaining frames, number of frame times each one is held for)
+    """
+    changed = (FRAMES[1:] != FRAMES[:-1]).any(axis=(1, 2))
+    starts = append(0, nonzero(changed)[0] + 1)
+    durations = diff(append(starts, len(FRAMES))).tolist()
+    if len(starts) < len(FRAMES):
+        logging.debug(f"Folded {len(FRAMES) - len(starts)} repeated frames")
+    return FRAMES[starts], durations
+
+
+def _keyframes(FRAMES: 'MatLike',
+               frames: List[List[Tuple[int, int, int, int]]],
+               interval: Optional[int]
+               ) -> List[List[Tuple[int, int, int, int]]]:
+    """
+    Replace diffs with keyframes where `_is_keyframe` says so.
+    """
+    if interval is None:
+        return frames
+
+    lit = FRAMES.any(axis=2).sum(axis=1).tolist()
+    for k, frame in enumerate(frames):
+        if _is_keyframe(k, lit[k], len(frame), interval):
+            frames[k] = Frame(_nonzero(FRAMES[k]), key=True)
+
+    logging.debug(f"Stored {sum(map(is_key, frames))} of {len(frames)}"
+                  " frames as keyframes")
+    return frames
+
+
+def _iter_images(img_paths: List[str],
+                 workers: Optional[int] = None) -> Iterator['MatLike']:
+    """
+    Decode images in order, skipping any that fail to load.
+
+    Decoding runs on a thread pool, since cv2 releases the GIL while it
+    decodes. Only a couple of images per worker are decoded ahead of the
+    one being consumed, so streaming conversion stays bounded in memory.
+
+    Args:
+        img_paths: List of paths to image files
+        workers: Number of decoding threads. None picks one from the
+            CPU count, 1 decodes on the calling thread.
+    """
+    if workers is None:
+        workers = min(32, (cpu_count() or 1) + 4)
+
+    if workers <= 1:
+        for img_path in img_paths:
+            with stage("decode"):
+                img = imread(img_path)
+            if img is None:
+                logging.warning(f"Failed to load image: {img_path}")
+                continue
+            yield img
+        return
+
+    paths = iter(img_paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque((img_path, pool.submit(imread, img_path))
+                        for img_path in islice(paths, workers * 2))
+        while pending:
+            img_path, future = pending.popleft()
+            for next_path in islice(paths, 1):
+                pending.append((next_path, pool.submit(imread, next_path)))
+
+            with stage("decode"):
+                img = future.result()
+            if img is None:
+                logging.warning(f"Failed to load image: {img_path}")
+                continue
+            yield img
+
+
+def _video_rate(video_path: str) -> Optional[float]:
+    """
+    Frame rate a video reports, or None if it cannot be opened or
+    does not report one.
+    """
+    if VideoCapture is None:
+        logging.error(f"Cannot open video {video_path} - OpenCV not available")
+        return None
+    capture = VideoCapture(video_path)
+    try:
+        if not capture.isOpened():
+            return None
+        rate = capture.get(CAP_PROP_FPS)
+        return rate if 0 < rate < float("inf") else None
+    finally:
+        capture.release()
+
+
+def _iter_video(video_path: str,
+                target_dimensions: Tuple[int, int],
+                fps: float) -> Iterator['MatLike']:
+    """
+    Decode a video or GIF as images at a fixed frame rate.
+
+    Each output frame shows the source frame on screen at its time, so
+    source frames are repeated or skipped to keep their timing, however
+    irregular (as in GIFs). Every image yielded is downscaled to the
+    target size as soon as it is decoded; one decoded source frame is
+    kept at a time.
+
+    Args:
+        video_path: Path to the video file
+        target_dimensions: Target (width, height) for output
+        fps: Frame rate to sample the video at
+    """
+    width, height = target_dimensions
+    capture = VideoCapture(video_path)
+    if not capture.isOpened():
+        logging.error(f"Failed to open video: {video_path}")
+        return
+
+    source_rate = capture.get(CAP_PROP_FPS)
+    period = 1000 / fps
+    # Source frames fall back to even spacing without timestamps
+    spacing = 1000 / source_rate if 0 < source_rate < float("inf") else period
+    start = None
+    last = -1.0
+    tick = 0
+    shown = small = None
+    n = 0
+    try:
+        while True:
+            with stage("decode"):
+                ok, img = capture.read()
+            if not ok:
+                break
+            stamp = capture.get(CAP_PROP_POS_MSEC)
+            if start is None:
+                start = stamp
+            at = stamp - start
+            if at <= last:
+                at = n * spacing
+            last = at
+            n += 1
+
+            # Ticks before this frame still show the previous one
+            while shown is not None and tick * period < at - 1e-6:
+                if small is None:
+                    with stage("decode"):
+                        small = _prepare(shown[None], width, height)[0]
+                yield small
+                tick += 1
+            shown, small = img, None
+
+        # The last frame lasts one source frame time
+        while shown is not None and tick * period < last + spacing - 1e-6:
+            if small is None:
+                with stage("decode"):
+                    small = _prepare(shown[None], width, height)[0]
+            yield small
+            tick += 1
+    finally:
+        capture.release()
+
+
+def stream_images(img_paths: List[str],
+                  target_dimensions: Tuple[int, int],
+                  rot: Rotation = Rotation.NONE,
+                  flip: Flip = Flip.NONE,
+                  workers: Optional[int] = None,
+                  encoding: Optional[Encoding] = None,
+                  palette: Optional[List[Tuple[int, int, int]]] = None
+                  ) -> Iterator[List[Tuple[int, int, int, int]]]:
+    """
+    Lazily convert a list of image paths into processed frame data.
+
+    Each image is decoded, realigned and diffed against the previous one
+    as the frame is requested, and only the previous realigned frame is
+    kept around. Memory use therefore stays flat however long the
+    animation is. Yields the same frames as `convert_images`.
+
+    Frames are yielded one image behind, once it is known whether the
+    next image repeats them (see `Encoding.hold`).
+
+    Args:
+        img_paths: List of paths to image files
+        target_dimensions: Target (width, height) for output
+        rot: Rotation transformation to apply
+        flip: Flip transformation to apply
+        workers: Number of image decoding threads (see `_iter_images`)
+        encoding: Frame encoding options (see `Encoding`)
+        palette: Palette to encode against when `encoding.palette` is
+            set, e.g. from `scan_palette`. Frames can only be streamed
+            once the palette is known.
+
+    Yields:
+        Frame data, one frame at a time
+    """
+    return _stream_frames(_iter_images(img_paths, workers), target_dimensions,
+                          rot, flip, encoding, palette)
+
+
+def _stream_frames(images: Iterable['MatLike'],
+                   target_dimensions: Tuple[int, int],
+                   rot: Rotation = Rotation.NONE,
+                   flip: Flip = Flip.NONE,
+                   encoding: Optional[Encoding] = None,
+                   palette: Optional[List[Tuple[int, int, int]]] = None
+                   ) -> Iterator[List[Tuple[int, int, int, int]]]:
+    """
+    Convert decoded images into frames one at a time (see `stream_images`).
+    """
+    width, height = target_dimensions
+    interval = encoding.keyframe_interval if encoding is not None else None
+    if encoding is not None and encoding.palette is not None and palette is None:
+        raise ValueError("Streaming with a palette needs the palette up front")
+    lookup = palette_lookup(palette) if palette is not None else None
+    hold = encoding is not None and encoding.hold
+    tolerance = encoding.tolerance if encoding is not None else 0
+    levels = output_levels(encoding) if encoding is not None else None
+    old_frame = None
+    # Last source frame and last displayed frame, before quantizing
+    source = shown = None
+    writes = [0, 0]
+    held = None
+    k = 0
+
+    for img in images:
+        with stage("realign"):
+            new_frame = _realign(img, width, height, rot, flip)
+            if levels is not None:
+                new_frame = levels[new_frame]
+
+        with stage("diff"):
+            if tolerance > 0:
+                writes[0] += count_writes(new_frame[None], source)
+                source = new_frame
+                new_frame = apply_tolerance(new_frame[None], tolerance,
+                                            encoding.perceptual, shown)[0]
+                writes[1] += count_writes(new_frame[None], shown)
+                shown = new_frame
+            if palette is not None:
+                new_frame = quantize(new_frame, palette)
+            if hold and old_frame is not None and array_equal(old_frame, new_frame):
+                held.duration += 1
+                continue
+            if old_frame is None:
+                frame = _nonzero(new_frame)
+            else:
+                frame = _diff_pair(old_frame, new_frame)
+            lit = int(new_frame.any(axis=1).sum()) if interval is not None else 0
+            if _is_keyframe(k, lit, len(frame), interval):
+                frame = Frame(_nonzero(new_frame), key=True)
+            elif hold:
+                frame = Frame(frame)
+            count(frames=1, pixels=len(frame))
+            ready = encode_frame(held, encoding, lookup) if held is not None else None
+
+        if ready is not None:
+            yield ready
+        held = frame
+        old_frame = new_frame
+        k += 1
+
+    if held is None:
+        logging.error("No images could be loaded")
+        return
+    with stage("diff"):
+        ready = encode_frame(held, encoding, lookup)
+    yield ready
+    if tolerance > 0:
+        _log_tolerance(encoding, *writes)
+
+
+def scan_palette(img_paths: List[str],
+                 target_dimensions: Tuple[int, int],
+                 rot: Rotation = Rotation.NONE,
+                 flip: Flip = Flip.NONE,
+                 workers: Optional[int] = None,
+                 size: Optional[int] = None,
+                 encoding: Optional[Encoding] = None
+                 ) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    Build an animation's palette in a first pass over its images.
+
+    Only the color counts are kept, so this runs in bounded memory
+    ahead of `stream_images`. The colors counted are those
+    `stream_images` will quantize, after any brightness and tolerance.
+
+    Args:
+        img_paths: List of paths to image files
+        target_dimensions: Target (width, height) for output
+        rot: Rotation transformation to apply
+        flip: Flip transformation to apply
+        workers: Number of image decoding threads (see `_iter_images`)
+        size: Largest palette allowed (see `build_palette`)
+        encoding: Encoding the frames will be streamed with
+
+    Returns:
+        List of (b, g, r) colors or None if no image could be loaded
+    """
+    return _scan_colors(_iter_images(img_paths, workers), target_dimensions,
+                        rot, flip, size, encoding)
+
+
+def _scan_colors(images: Iterable['MatLike'],
+                 target_dimensions: Tuple[int, int],
+                 rot: Rotation = Rotation.NONE,
+                 flip: Flip = Flip.NONE,
+                 size: Optional[int] = None,
+                 encoding: Optional[Encoding] = None
+                 ) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    Build a palette from decoded images (see `scan_palette`).
+    """
+    width, height = target_dimensions
+    levels = output_levels(encoding) if encoding is not None else None
+    tolerance = encoding.tolerance if encoding is not None else 0
+    counts: Dict[Tuple[int, int, int], int] = {}
+    shown = None
+    for img in images:
+        frame = _realign(img, width, height, rot, flip)
+        if levels is not None:
+            frame = levels[frame]
+        if tolerance > 0:
+            frame = shown = apply_tolerance(frame[None], tolerance,
+                                            encoding.perceptual, shown)[0]
+        count_colors(frame, counts)
+    if not counts:
+        return None
+    return build_palette(counts, size)
+
+
+def _log_tolerance(encoding: Encoding, before: int, after: int) -> None:
+    """
+    Report the pixel writes a change tolerance saved.
+    """
+    metric = "perceptual" if encoding.perceptual else "per-channel"
+    logging.info(f"Tolerance {encoding.tolerance} ({metric}) removed "
+                 f"{before - after} of {before} pixel writes")
+
+
+def _apply_tolerance(FRAMES: 'MatLike', encoding: Encoding) -> 'MatLike':
+    """
+    Drop changes within `encoding.tolerance` from a frame stack.
+    """
+    settled = apply_tolerance(FRAMES, encoding.tolerance, encoding.perceptual)
+    _log_tolerance(encoding, count_writes(FRAMES), count_writes(settled))
+    return settled
+
+
+def _apply_palette(FRAMES: 'MatLike',
+                   size: Optional[int]
+                   ) -> Tuple['MatLike', List[Tuple[int, int, int]]]:
+    """
+    Build a palette for a frame stack and snap the frames onto it.
+    """
+    counts = count_colors(FRAMES)
+    palette = build_palette(counts, size)
+    if set(counts) - set(palette):
+        logging.info(f"Quantized {len(counts)} colors to {len(palette)}")
+        FRAMES = quantize(FRAMES, palette)
+    return FRAMES, palette
 
 
 def convert_images(img_paths: List[str],
                    target_dimensions: Tuple[int, int],
                    rot: Rotation = Rotation.NONE,
-                   flip: Flip = Flip.NONE
+                   flip: Flip = Flip.NONE,
+                   vectorized: bool = True,
+                   workers: Optional[int] = None,
+                   encoding: Optional[Encoding] = None
                    ) -> Optional[List[List[Tuple[int, int, int, int]]]]:
     """
     Convert a list of image paths into processed frame data.
@@ -175,6 +980,9 @@ def convert_images(img_paths: List[str],
         target_dimensions: Target (width, height) for output
         rot: Rotation transformation to apply
         flip: Flip transformation to apply
+        vectorized: Use the vectorized diff engine (see `comparator`)
+        workers: Number of image decoding threads (see `_iter_images`)
+        encoding: Frame encoding options (see `Encoding`)
         
     Returns:
         List of frame data or None if failed
@@ -187,13 +995,7 @@ def convert_images(img_paths: List[str],
     
     try:
         # Load images with error checking
-        images = []
-        for img_path in img_paths:
-            img = imread(img_path)
-            if img is None:
-                logging.warning(f"Failed to load image: {img_path}")
-                continue
-            images.append(img)
+        images = list(_iter_images(img_paths, workers))
         
         if not images:
             logging.error("No images could be loaded")
@@ -206,7 +1008,9 @@ def convert_images(img_paths: List[str],
                                                                    width,
                                                                    height,
                                                                    rot,
-                                                                   flip)
+                                                                   flip,
+                                                                   vectorized,
+                                                                   encoding)
 
         return frames
         
@@ -219,7 +1023,10 @@ def comparator(IMAGES: 'MatLike',
                width: int,
                height: int,
                rot: Rotation = Rotation.NONE,
-               flip: Flip = Flip.NONE
+               flip: Flip = Flip.NONE,
+               vectorized: bool = True,
+               encoding: Optional[Encoding] = None,
+               order: Optional['NDArray'] = None
                ) -> Optional[List[List[Tuple[int, int, int, int]]]]:
     """
     Given a list of images, convert these into frames and return it.
@@ -230,6 +1037,21 @@ def comparator(IMAGES: 'MatLike',
         height: Target height
         rot: Rotation transformation
         flip: Flip transformation
+        vectorized: Diff the whole frame stack with NumPy. Set to False
+            to use the per-pixel reference loop instead.
+        encoding: Frame encoding options. With a keyframe interval set,
+            each frame is stored as a diff or as a keyframe (see
+            `_is_keyframe`). With a brightness or gamma set, colors
+            are first mapped through `output_levels`. With a tolerance
+            set, small changes are left out (see `apply_tolerance`).
+            With spans set, frames are returned as spans (see
+            `to_spans`). With a palette set, the frames
+            are returned as `Frames` holding the palette their
+            colors index into. With hold set, repeated frames are
+            folded into `Frame`s with a duration.
+        order: Index into IMAGES of the image each frame shows, so an
+            image used for several frames is realigned only once
+            (see `unique_tiles`). Defaults to one frame per image.
         
     Returns:
         List of frame data or None if failed
@@ -238,56 +1060,249 @@ def comparator(IMAGES: 'MatLike',
         if IMAGES is None or len(IMAGES) == 0:
             logging.error("No images provided to comparator")
             return None
-            
-        frames: List[List[Tuple[int, int, int, int]]] = [
-                                        [(0, 0, 0, 0)] for _ in range(len(IMAGES))
-                                    ]
 
         logging.debug(f"Processing {len(IMAGES)} images")
         
-        FRAMES = array([_realign(im, width, height, rot, flip) for im in IMAGES])
-        old_frame = FRAMES[0]
-        frames[0] = _nonzero(old_frame)
+        with stage("realign"):
+            FRAMES = _realign_stack(asarray(IMAGES), width, height, rot, flip)
 
-        for index, new_frame in enumerate(FRAMES[1:]):
-            changes: List[Tuple[int, int, int, int]] = []
+            levels = output_levels(encoding) if encoding is not None else None
+            if levels is not None:
+                FRAMES = levels[FRAMES]
+            if order is not None:
+                FRAMES = FRAMES[order]
 
-            if not array_equal(new_frame, old_frame):
-                for i in range(len(new_frame)):
-                    if not array_equal(new_frame[i], old_frame[i]):
-                        b, g, r = new_frame[i]
-                        changes.append((i, b, g, r))
+        with stage("diff"):
+            if encoding is not None and encoding.tolerance > 0:
+                FRAMES = _apply_tolerance(FRAMES, encoding)
 
-            # Store changes for further processing
-            if len(changes) > 0:
-                frames[index+1] = changes
+            palette = None
+            if encoding is not None and encoding.palette is not None:
+                FRAMES, palette = _apply_palette(FRAMES, encoding.palette)
 
-            # Update old_frame for the next iteration
-            old_frame = new_frame
+            durations = None
+            if encoding is not None and encoding.hold:
+                FRAMES, durations = _fold(FRAMES)
 
-        return frames
+            if vectorized:
+                frames = _diff_stack(FRAMES)
+            else:
+                frames = _diff_loop(FRAMES)
+
+            interval = encoding.keyframe_interval if encoding is not None else None
+            frames = _keyframes(FRAMES, frames, interval)
+            if durations is not None:
+                frames = [Frame(frame, is_key(frame), hold)
+                          for frame, hold in zip(frames, durations)]
+            count(frames=len(frames), pixels=sum(map(len, frames)))
+            if palette is None:
+                return [encode_frame(frame, encoding) for frame in frames]
+
+            lookup = palette_lookup(palette)
+            return Frames((encode_frame(frame, encoding, lookup)
+                           for frame in frames), palette)
         
     except Exception as e:
         logging.error(f"Error in comparator: {e}")
         return None
 
 
+def _label(folder: str) -> str:
+    """
+    Name an entry of the animations directory is saved under: the
+    folder name, or a video's file name without its extension, or a
+    sprite sheet's without its extension and ".sheet".
+    """
+    if not path.isfile(path.join(FOLDERS.IMAGE_DIR.value, folder)):
+        return folder
+    if issheet(folder):
+        return path.splitext(path.splitext(folder)[0])[0]
+    if isvideo(folder):
+        return path.splitext(folder)[0]
+    return folder
+
+
+def convert_sheet(sheet_path: str,
+                  label: str,
+                  target_dimensions: Tuple[int, int],
+                  rot: Rotation = Rotation.NONE,
+                  flip: Flip = Flip.NONE,
+                  tile_size: Optional[Tuple[int, int]] = None,
+                  formats: Iterable[OutputFormat] = (OutputFormat.JSON,),
+                  encoding: Optional[Encoding] = None
+                  ) -> Optional[List[List[Tuple[int, int, int, int]]]]:
+    """
+    Convert a sprite sheet to frame data, one frame per tile.
+
+    The sheet is decoded once and its tiles are passed straight to
+    `comparator`, read row by row. Blank tiles at the end of the sheet
+    are left out. Tiles that repeat are hashed (see `unique_tiles`) so
+    each distinct tile is realigned only once.
+
+    Args:
+        sheet_path: Path to the sprite sheet image
+        label: Label for the output files
+        target_dimensions: Target (width, height) for output
+        rot: Rotation transformation to apply
+        flip: Flip transformation to apply
+        tile_size: (width, height) of each tile, by default the
+            target dimensions
+        formats: Output formats to write (see `save_frames`)
+        encoding: Frame encoding options (see `Encoding`)
+
+    Returns:
+        List of frame data or None if failed
+    """
+    try:
+        width, height = target_dimensions
+        with stage("decode"):
+            sheet = load_sheet(sheet_path)
+            if sheet is None:
+                logging.error(f"Could not read sprite sheet: {sheet_path}")
+                return None
+            tiles = trim_tiles(slice_sheet(sheet, tile_size or target_dimensions))
+            if len(tiles) == 0:
+                logging.warning(f"No tiles found in {sheet_path}")
+                return None
+            distinct, order = unique_tiles(tiles)
+
+        logging.info(f"Processing {len(tiles)} tiles ({len(distinct)} distinct)"
+                     f" from {sheet_path}")
+
+        frames = comparator(distinct, width, height, rot, flip,
+                            encoding=encoding, order=order)
+        if frames is None:
+            logging.error(f"Failed to convert sprite sheet: {sheet_path}")
+            return None
+
+        with stage("serialize"):
+            saved = save_frames(frames, label, target_dimensions, formats,
+                                encoding, getattr(frames, "palette", None))
+        if not saved:
+            logging.error(f"Failed to save sprite sheet: {sheet_path}")
+            return None
+        _count_bytes(label, formats)
+        logging.info(f"Successfully processed sprite sheet: {sheet_path}")
+        return frames
+
+    except Exception as e:
+        logging.error(f"Error processing sprite sheet {sheet_path}: {e}")
+        return None
+
+
+def convert_video(video_path: str,
+                  label: str,
+                  target_dimensions: Tuple[int, int],
+                  rot: Rotation = Rotation.NONE,
+                  flip: Flip = Flip.NONE,
+                  formats: Iterable[OutputFormat] = (OutputFormat.JSON,),
+                  encoding: Optional[Encoding] = None
+                  ) -> Optional[List[List[Tuple[int, int, int, int]]]]:
+    """
+    Convert a video or animated GIF to frame data, streaming its frames.
+
+    Frames are decoded, downscaled and diffed one at a time as they
+    are written (see `stream_images`), so no frame images are written
+    to disk and memory use stays flat however long the clip is. The
+    video is sampled at `encoding.fps`, by default the rate it reports,
+    and that rate is recorded in the JSON metadata. With a palette the
+    video is decoded twice, once to build the palette.
+
+    Args:
+        video_path: Path to the video file
+        label: Label for the output files
+        target_dimensions: Target (width, height) for output
+        rot: Rotation transformation to apply
+        flip: Flip transformation to apply
+        formats: Output formats to write (see `save_frames`)
+        encoding: Frame encoding options (see `Encoding`)
+
+    Returns:
+        An empty list on success (the frames are written as they are
+        produced), None if failed
+    """
+    try:
+        encoding = encoding or Encoding()
+        if encoding.fps is None:
+            rate = _video_rate(video_path)
+            if rate is None:
+                logging.error(f"Could not read the frame rate of {video_path}")
+                return None
+            encoding = replace(encoding, fps=round(rate, 3))
+        if encoding.fps <= 0:
+            logging.error(f"Frame rate must be above 0, got {encoding.fps}")
+            return None
+
+        logging.info(f"Processing video {video_path} at {encoding.fps} fps")
+
+        palette = None
+        if encoding.palette is not None:
+            palette = _scan_colors(_iter_video(video_path, target_dimensions,
+                                               encoding.fps),
+                                   target_dimensions, rot, flip,
+                                   encoding.palette, encoding)
+            if palette is None:
+                logging.error(f"No frames could be read from {video_path}")
+                return None
+        frame_stream = _stream_frames(_iter_video(video_path, target_dimensions,
+                                                  encoding.fps),
+                                      target_dimensions, rot, flip, encoding,
+                                      palette)
+        with stage("serialize"):
+            saved = save_frames(frame_stream, label, target_dimensions,
+                                formats, encoding, palette)
+        if not saved:
+            logging.error(f"Failed to convert video: {video_path}")
+            return None
+
+        _count_bytes(label, formats)
+        logging.info(f"Successfully processed video: {video_path}")
+        return []
+
+    except Exception as e:
+        logging.error(f"Error processing video {video_path}: {e}")
+        return None
+
+
 def convert_dir(folder: str,
                 target_dimensions: Tuple[int, int],
                 rot: Rotation = Rotation.NONE,
-                flip: Flip = Flip.NONE
+                flip: Flip = Flip.NONE,
+                stream: bool = False,
+                workers: Optional[int] = None,
+                formats: Iterable[OutputFormat] = (OutputFormat.JSON,),
+                encoding: Optional[Encoding] = None,
+                tile_size: Optional[Tuple[int, int]] = None
                 ) -> Optional[List[List[Tuple[int, int, int, int]]]]:
     """
     Convert all images in a directory to frame data.
+
+    A sprite sheet in the animations directory, an image named
+    NAME.sheet.EXT, is converted with `convert_sheet` instead and
+    saved as NAME. A video or GIF is converted with `convert_video`,
+    saved under its name without the extension. Other loose images
+    are not animations and are rejected.
+    Sheets are always decoded whole and videos always streamed, so
+    stream and workers do not apply to them.
     
     Args:
-        folder: Name of the folder in the animations directory
+        folder: Name of the folder (or sprite sheet or video) in the
+            animations directory
         target_dimensions: Target (width, height) for output
         rot: Rotation transformation to apply
         flip: Flip transformation to apply
+        stream: Decode, diff and write one frame at a time with
+            `stream_images` instead of holding the whole clip in memory
+        workers: Number of image decoding threads (see `_iter_images`)
+        formats: Output formats to write (see `save_frames`)
+        encoding: Frame encoding options (see `Encoding`)
+        tile_size: (width, height) of a sprite sheet's tiles, by
+            default the target dimensions
         
     Returns:
-        List of frame data or None if failed
+        List of frame data or None if failed. When streaming, the frames
+        are written out as they are produced and an empty list is
+        returned on success.
     """
     try:
         folder_path = path.join(FOLDERS.IMAGE_DIR.value, folder)
@@ -295,6 +1310,19 @@ def convert_dir(folder: str,
         if not path.exists(folder_path):
             logging.error(f"Folder not found: {folder_path}")
             return None
+
+        if path.isfile(folder_path) and issheet(folder_path):
+            return convert_sheet(folder_path, _label(folder), target_dimensions,
+                                 rot, flip, tile_size, formats, encoding)
+
+        if path.isfile(folder_path) and isvideo(folder_path):
+            return convert_video(folder_path, _label(folder), target_dimensions,
+                                 rot, flip, formats, encoding)
+
+        if path.isfile(folder_path) and isimage(folder_path):
+            logging.error(f"Not a sprite sheet: {folder_path} "
+                          f"(name sheets NAME{SHEET_SUFFIX}.EXT)")
+            return None
         
         if not path.isdir(folder_path):
             logging.error(f"Path is not a directory: {folder_path}")
@@ -302,7 +1330,7 @@ def convert_dir(folder: str,
             
         # Get all image files in the directory
         all_files = listdir(folder_path)
-        image_files = [f for f in all_files if isimage(f)]
+        image_files = sorted(f for f in all_files if isimage(f))
         
         if not image_files:
             logging.warning(f"No image files found in {folder_path}")
@@ -313,14 +1341,41 @@ def convert_dir(folder: str,
         
         logging.info(f"Processing {len(animas)} images from {folder}")
         
-        frames = convert_images(animas, target_dimensions, rot, flip)
+        if stream:
+            palette = None
+            if encoding is not None and encoding.palette is not None:
+                palette = scan_palette(animas, target_dimensions, rot, flip,
+                                       workers, encoding.palette, encoding)
+                if palette is None:
+                    logging.error("No images could be loaded")
+                    return None
+            frame_stream = stream_images(animas, target_dimensions, rot, flip,
+                                         workers, encoding, palette)
+            with stage("serialize"):
+                saved = save_frames(frame_stream, folder, target_dimensions,
+                                    formats, encoding, palette)
+            if saved:
+                _count_bytes(folder, formats)
+                logging.info(f"Successfully processed folder: {folder}")
+                return []
+            logging.error(f"Failed to convert images in folder: {folder}")
+            return None
+
+        frames = convert_images(animas, target_dimensions, rot, flip,
+                                workers=workers, encoding=encoding)
         
-        if frames is not None:
-            save_frames_json(frames, folder, target_dimensions)
-            logging.info(f"Successfully processed folder: {folder}")
-        else:
+        if frames is None:
             logging.error(f"Failed to convert images in folder: {folder}")
+            return None
 
+        with stage("serialize"):
+            saved = save_frames(frames, folder, target_dimensions, formats,
+                                encoding, getattr(frames, "palette", None))
+        if not saved:
+            logging.error(f"Failed to save images in folder: {folder}")
+            return None
+        _count_bytes(folder, formats)
+        logging.info(f"Successfully processed folder: {folder}")
         return frames
         
     except Exception as e:
@@ -328,17 +1383,153 @@ def convert_dir(folder: str,
         return None
 
 
+def _count_bytes(folder: str,
+                 formats: Iterable[OutputFormat] = (OutputFormat.JSON,)) -> None:
+    """
+    Count the size of a folder's outputs in the active profile.
+    """
+    count(bytes=sum(path.getsize(o) for o in _build_outputs(folder, formats)
+                    if path.exists(o)))
+
+
+class _RecordCollector(logging.Handler):
+    """
+    Logging handler that keeps records so a worker process can hand
+    them back to the parent to be replayed in a fixed order.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Format now so the record pickles without its original args
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+def _convert_folder(folder: str,
+                    target_dimensions: Tuple[int, int],
+                    rotator: Rotation,
+                    flipper: Flip,
+                    stream: bool,
+                    workers: Optional[int] = None,
+                    formats: Tuple[OutputFormat, ...] = (OutputFormat.JSON,),
+                    encoding: Optional[Encoding] = None,
+                    tile_size: Optional[Tuple[int, int]] = None,
+                    capture: bool = False
+                    ) -> Tuple[str, bool, List[logging.LogRecord], Profile]:
+    """
+    Convert a single folder for `convert_all`.
+
+    Never raises, so one bad folder cannot take the batch down.
+    When capture is set the log records are collected and returned
+    instead of being emitted, for use inside pool workers.
+
+    Returns:
+        (folder, success, captured log records, stage timings)
+    """
+    root = logging.getLogger()
+    collector = _RecordCollector()
+    handlers = root.handlers[:]
+    if capture:
+        root.handlers = [collector]
+
+    profile = Profile(folder)
+    try:
+        logging.info(f"Processing folder: {folder}")
+        with profiling(folder) as profile:
+            result = convert_dir(folder, target_dimensions, rotator, flipper,
+                                 stream, workers, formats, encoding, tile_size)
+        success = result is not None
+    except Exception as e:
+        logging.error(f"Error processing folder {folder}: {e}")
+        success = False
+    finally:
+        if capture:
+            root.handlers = handlers
+
+    return (folder, success, collector.records, profile)
+
+
+def _build_settings(target_dimensions: Tuple[int, int],
+                    rotator: Rotation,
+                    flipper: Flip,
+                    formats: Iterable[OutputFormat] = (OutputFormat.JSON,),
+                    encoding: Optional[Encoding] = None,
+                    tile_size: Optional[Tuple[int, int]] = None
+                    ) -> Dict[str, Any]:
+    """
+    Settings an animation's output depends on, as recorded in the build cache.
+    """
+    width, height = target_dimensions
+    settings = {
+        "width": width,
+        "height": height,
+        "rotation": rotator.name,
+        "flip": flipper.name,
+        "formats": sorted(fmt.value for fmt in formats),
+    }
+    if tile_size is not None:
+        settings["tile"] = list(tile_size)
+    settings.update((encoding or Encoding()).settings())
+    return settings
+
+
+def _build_outputs(folder: str,
+                   formats: Iterable[OutputFormat] = (OutputFormat.JSON,)
+                   ) -> List[str]:
+    """
+    Files a conversion of the given folder is expected to produce.
+    """
+    return [_output_path(_label(folder), fmt) for fmt in formats]
+
+
 def convert_all(target_dimensions: Tuple[int, int],
                 rotator: Rotation = Rotation.NONE,
-                flipper: Flip = Flip.NONE
+                flipper: Flip = Flip.NONE,
+                stream: bool = False,
+                jobs: int = 1,
+                workers: Optional[int] = None,
+                cache: bool = True,
+                formats: Iterable[OutputFormat] = (OutputFormat.JSON,),
+                encoding: Optional[Encoding] = None,
+                profiles: Optional[List[Profile]] = None,
+                tile_size: Optional[Tuple[int, int]] = None,
+                only: Optional[Iterable[str]] = None
                 ) -> bool:
     """
-    Convert all animation folders.
+    Convert all animation folders, and any sprite sheets
+    (NAME.sheet.EXT) and videos in the animations directory (see
+    `convert_sheet`, `convert_video`). Other loose images are skipped.
+
+    With jobs > 1 the folders are spread over a process pool. Each
+    worker's log output is collected and replayed folder by folder in
+    sorted order, so the log reads the same however the work was
+    scheduled.
+
+    With cache enabled, folders whose frame files and settings match
+    the last successful build (see `BuildCache`) are skipped, and the
+    reason each remaining folder is rebuilt is logged.
     
     Args:
         target_dimensions: Target (width, height) for output
         rotator: Rotation transformation to apply
         flipper: Flip transformation to apply
+        stream: Convert each folder in bounded memory (see `convert_dir`)
+        jobs: Number of worker processes. 0 or less uses every core.
+        workers: Number of image decoding threads per folder
+            (see `_iter_images`)
+        cache: Skip folders that are unchanged since their last build
+        formats: Output formats to write (see `save_frames`)
+        encoding: Frame encoding options (see `Encoding`)
+        profiles: If given, the `Profile` of each converted folder is
+            appended to it, in folder order
+        tile_size: (width, height) of the sprite sheets' tiles, by
+            default the target dimensions
+        only: Names of the entries to consider, default all (see
+            `tvlib._watch.watch`)
         
     Returns:
         True if successful, False otherwise
@@ -350,25 +1541,227 @@ def convert_all(target_dimensions: Tuple[int, int],
             logging.error(f"Animations directory not found: {animations_dir}")
             return False
             
-        folders = [f for f in listdir(animations_dir) 
-                  if path.isdir(path.join(animations_dir, f))]
+        folders = sorted(f for f in listdir(animations_dir)
+                         if path.isdir(path.join(animations_dir, f))
+                         or issheet(f) or isvideo(f))
+        if only is not None:
+            wanted = set(only)
+            folders = [f for f in folders if f in wanted]
         
         if not folders:
             logging.warning(f"No folders found in {animations_dir}")
             return False
+
+        formats = tuple(dict.fromkeys(formats))
+        build_cache = BuildCache.load() if cache else None
+        entries: Dict[str, Dict[str, Any]] = {}
+        pending: List[str] = folders
+        if build_cache is not None:
+            settings = _build_settings(target_dimensions, rotator, flipper,
+                                       formats, encoding, tile_size)
+            pending = []
+            for folder in folders:
+                try:
+                    reason, entry = build_cache.check(folder, settings,
+                                                      _build_outputs(folder,
+                                                                     formats))
+                except Exception as e:
+                    reason, entry = (f"could not fingerprint inputs: {e}", None)
+                if reason is None:
+                    logging.info(f"Up to date: {folder}")
+                    continue
+                logging.info(f"Rebuilding {folder}: {reason}")
+                if entry is not None:
+                    entries[folder] = entry
+                pending.append(folder)
+
+        up_to_date = len(folders) - len(pending)
+        if not pending:
+            build_cache.save()
+            logging.info(f"All {len(folders)} folders are up to date")
+            return True
+
+        if jobs <= 0:
+            jobs = cpu_count() or 1
+        jobs = min(jobs, len(pending))
             
-        logging.info(f"Processing {len(folders)} animation folders")
-        
-        success_count = 0
-        for folder in folders:
-            logging.info(f"Processing folder: {folder}")
-            result = convert_dir(folder, target_dimensions, rotator, flipper)
-            if result is not None:
-                success_count += 1
+        logging.info(f"Processing {len(pending)} animation folders"
+                     f" with {jobs} job(s)")
+
+        results: List[Tuple[str, bool, List[logging.LogRecord], Profile]] = []
+        if jobs == 1:
+            for folder in pending:
+                results.append(_convert_folder(folder, target_dimensions,
+                                               rotator, flipper, stream,
+                                               workers, formats, encoding,
+                                               tile_size))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = [pool.submit(_convert_folder, folder,
+                                       target_dimensions, rotator, flipper,
+                                       stream, workers, formats, encoding,
+                                       tile_size, True)
+                           for folder in pending]
+                for folder, future in zip(pending, futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        record = logging.makeLogRecord({
+                            "levelno": logging.ERROR,
+                            "levelname": "ERROR",
+                            "msg": f"Worker failed on folder {folder}: {e}",
+                        })
+                        results.append((folder, False, [record],
+                                        Profile(folder)))
+
+            root = logging.getLogger()
+            for _, _, records, _ in results:
+                for record in records:
+                    root.handle(record)
+
+        if profiles is not None:
+            profiles.extend(profile for _, _, _, profile in results)
+
+        failed = [folder for folder, success, _, _ in results if not success]
+        success_count = len(results) - len(failed)
+        if failed:
+            logging.warning(f"Failed folders: {', '.join(failed)}")
+
+        if build_cache is not None:
+            for folder, success, _, _ in results:
+                if success and folder in entries:
+                    build_cache.update(folder, entries[folder])
+                else:
+                    build_cache.discard(folder)
+            build_cache.save()
+            logging.info(f"Rebuilt {success_count} folders, "
+                         f"{up_to_date} up to date, {len(failed)} failed")
             
-        logging.info(f"Successfully processed {success_count}/{len(folders)} folders")
-        return success_count > 0
+        logging.info(f"Successfully processed {success_count + up_to_date}/{len(folders)} folders")
+        return success_count + up_to_date > 0
         
     except Exception as e:
         logging.error(f"Error in convert_all: {e}")
         return False
+
+
+STORE_DIR: str = path.join(FOLDERS.JSON_DIR.value, "_shared")
+
+
+def build_frame_store(target_dimensions: Tuple[int, int],
+                      rotator: Rotation = Rotation.NONE,
+                      flipper: Flip = Flip.NONE,
+                      workers: Optional[int] = None,
+                      formats: Iterable[OutputFormat] = (OutputFormat.JSON,)
+                      ) -> Optional[Dict[str, int]]:
+    """
+    Store every distinct frame of every animation once, in a shared store.
+
+    Each animation folder is decoded and realigned one image at a time,
+    and frames are identified by a hash of their realigned pixels, so
+    a frame that appears in several animations (or several times in
+    one) is kept once. The store is written to STORE_DIR as:
+
+        frames.json / frames.tvb   the unique frames as full frames
+        animations.json            {folder: [frame id, ...]}
+
+    A player draws an animation by drawing the store frames its ids
+    point to, e.g. `store.draw(frame_id, display)` with the onboard
+    .tvb player.
+
+    Args:
+        target_dimensions: Target (width, height) for output
+        rotator: Rotation transformation to apply
+        flipper: Flip transformation to apply
+        workers: Number of image decoding threads (see `_iter_images`)
+        formats: Formats to write the frames in
+
+    Returns:
+        Statistics: "frames" referenced, "unique" frames stored, pixel
+        entries in the "store", entries the same frames take stored
+        "full" per animation, and as per-animation "diffs". None if
+        failed.
+    """
+    try:
+        animations_dir = FOLDERS.IMAGE_DIR.value
+        if not path.exists(animations_dir):
+            logging.error(f"Animations directory not found: {animations_dir}")
+            return None
+
+        width, height = target_dimensions
+        ids: Dict[bytes, int] = {}
+        frames: List[Frame] = []
+        animations: Dict[str, List[int]] = {}
+        stats = {"frames": 0, "unique": 0, "store": 0, "full": 0, "diffs": 0}
+
+        for folder in sorted(listdir(animations_dir)):
+            folder_path = path.join(animations_dir, folder)
+            if not path.isdir(folder_path):
+                continue
+            img_paths = [path.join(folder_path, f)
+                         for f in sorted(listdir(folder_path)) if isimage(f)]
+
+            refs: List[int] = []
+            old_frame = None
+            for img in _iter_images(img_paths, workers):
+                new_frame = _realign(img, width, height, rotator, flipper)
+                digest = sha256(new_frame.tobytes()).digest()
+                if digest not in ids:
+                    ids[digest] = len(frames)
+                    frames.append(Frame(_nonzero(new_frame), key=True))
+                refs.append(ids[digest])
+                stats["full"] += len(frames[refs[-1]])
+
+                if old_frame is None:
+                    stats["diffs"] += len(frames[refs[-1]])
+                else:
+                    stats["diffs"] += len(_diff_pair(old_frame, new_frame))
+                old_frame = new_frame
+
+            if refs:
+                animations[folder] = refs
+                stats["frames"] += len(refs)
+
+        if not frames:
+            logging.warning(f"No frames found in {animations_dir}")
+            return None
+
+        stats["unique"] = len(frames)
+        stats["store"] = sum(len(frame) for frame in frames)
+
+        mkdir(STORE_DIR)
+        formats = tuple(dict.fromkeys(formats))
+        if OutputFormat.JSON in formats:
+            write_json(path.join(STORE_DIR, "frames.json"), {
+                "metadata": {
+                    "name": "frames",
+                    "width": width,
+                    "height": height,
+                    "total_pixels": width * height,
+                    "frame_count": len(frames),
+                    "format": "bgr",
+                    "type": "full",
+                },
+                "frames": frames,
+            })
+        if OutputFormat.TVB in formats:
+            if write_tvb(path.join(STORE_DIR, "frames.tvb"),
+                         {"name": "frames", "width": width, "height": height,
+                          "type": "full"}, frames) is None:
+                return None
+        write_json(path.join(STORE_DIR, "animations.json"), animations)
+
+        saved = stats["full"] - stats["store"]
+        logging.info(f"Frame store: {stats['unique']} unique frames for "
+                     f"{stats['frames']} frames in {len(animations)} "
+                     f"animations")
+        logging.info(f"Frame store holds {stats['store']} pixel entries, "
+                     f"saving {saved} of {stats['full']} "
+                     f"({saved / max(stats['full'], 1) * 100:.1f}%) against "
+                     f"full frames per animation "
+                     f"(per-animation diffs hold {stats['diffs']})")
+        return stats
+
+    except Exception as e:
+        logging.error(f"Error building frame store: {e}")
+        return None
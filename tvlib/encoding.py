@@ -0,0 +1,542 @@
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from math import ceil, floor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+try:
+    from numpy import (zeros, zeros_like, uint8, int16, asarray, unique,
+                       bincount, add, rint, float32, sqrt, concatenate,
+                       arange)
+except ImportError:
+    zeros = None
+    uint8 = int
+
+if TYPE_CHECKING:
+    from tvlib._config import MatLike
+
+# Rough size of a .tvb frame record, used to compare encodings
+FRAME_COST: int = 2
+PIXEL_COST: int = 5
+
+# Shortest stretch of one color inside a run that gets its own solid
+# span. Shorter stretches cost less inline than a second span header.
+MIN_SOLID_SPAN: int = 4
+
+# Palette indices are stored in a byte, or a nibble for up to 16 colors
+MAX_PALETTE: int = 256
+NIBBLE_PALETTE: int = 16
+KMEANS_ITERATIONS: int = 10
+
+BLACK: Tuple[int, int, int] = (0, 0, 0)
+# Entry the diff encoders give a frame without changes, pixel 0 set to
+# black: as a pixel, a palette pixel, a span and a palette span
+NO_CHANGE: Tuple[Tuple[int, ...], ...] = ((0, 0, 0, 0), (0, 0),
+                                          (0, 1, 0, 0, 0), (0, 1, 0))
+
+
+@dataclass
+class Encoding:
+    """
+    Frame encoding options shared by the converters and writers.
+
+    Attributes:
+        keyframe_interval:
+            None diffs every frame against the previous one. Otherwise
+            each frame is stored as a diff or as a full keyframe,
+            whichever is cheaper, and every K-th frame is forced to be
+            a keyframe (0 never forces one).
+        spans:
+            Store each frame as spans of consecutive pixels instead of
+            one entry per pixel (see `to_spans`).
+        palette:
+            None stores a full color per pixel. Otherwise pixels are
+            stored as indices into a per-animation palette (see
+            `build_palette`) of at most this many colors (0 for the
+            animation's own colors, up to MAX_PALETTE).
+        hold:
+            Fold runs of identical frames into one frame with a
+            duration, instead of a frame per repeat.
+        tolerance:
+            Largest color change that is not written out (see
+            `apply_tolerance`). 0 writes every change.
+        perceptual:
+            Measure changes with `color_distance`'s perceptual metric
+            instead of the largest per-channel difference.
+        brightness:
+            None keeps source colors. Otherwise the brightness (0-1)
+            the device plays at: colors are stored as the LED values
+            at that brightness (see `output_levels`), so changes the
+            LEDs cannot show are never written.
+        max_brightness:
+            With a brightness, the top of the range the device may
+            play at. Colors are then kept at source scale, merged only
+            where the LEDs show no difference anywhere in the range.
+        gamma:
+            Gamma applied to each channel before brightness.
+        fps:
+            None leaves the frame time to the device. Otherwise the
+            frame rate the frames are timed at, recorded in the JSON
+            metadata. Videos are sampled at this rate (see
+            `convert_video`).
+    """
+    keyframe_interval: Optional[int] = None
+    spans: bool = False
+    palette: Optional[int] = None
+    hold: bool = False
+    tolerance: int = 0
+    perceptual: bool = False
+    brightness: Optional[float] = None
+    max_brightness: Optional[float] = None
+    gamma: float = 1.0
+    fps: Optional[float] = None
+
+    def baked(self) -> Optional[float]:
+        """
+        The brightness colors are stored at, or None for source scale.
+        """
+        if self.max_brightness is not None and self.max_brightness != self.brightness:
+            return None
+        return self.brightness
+
+    def settings(self) -> Dict[str, Any]:
+        """
+        Options as a plain dict, for the build cache.
+        """
+        return asdict(self)
+
+
+class Frame(list):
+    """
+    A frame's (index, b, g, r) entries plus how the frame is applied.
+
+    Plain lists are still accepted everywhere a frame is expected and
+    are treated as diffs. A Frame is encoded as a list, so it writes
+    the same JSON as one.
+
+    Attributes:
+        key: True for a keyframe, which holds every non-black pixel and
+            is drawn onto a cleared display.
+        duration: Number of frame times the frame stays on the display.
+    """
+
+    def __init__(self,
+                 pixels: Iterable[Tuple[int, int, int, int]] = (),
+                 key: bool = False,
+                 duration: int = 1) -> None:
+        super().__init__(pixels)
+        self.key = key
+        self.duration = duration
+
+
+class Frames(list):
+    """
+    An animation's frames together with the palette they index into.
+
+    Attributes:
+        palette: List of (b, g, r) colors, or None for full colors.
+    """
+
+    def __init__(self,
+                 frames: Iterable[List[Tuple[int, ...]]] = (),
+                 palette: Optional[List[Tuple[int, int, int]]] = None) -> None:
+        super().__init__(frames)
+        self.palette = palette
+
+
+def frame_cost(pixel_count: int) -> int:
+    """
+    Estimated encoded size of a frame with the given number of entries.
+    """
+    return FRAME_COST + PIXEL_COST * pixel_count
+
+
+def is_key(frame: List[Tuple[int, int, int, int]]) -> bool:
+    """
+    Whether a frame is a keyframe.
+    """
+    return getattr(frame, "key", False)
+
+
+def duration(frame: List[Tuple[int, int, int, int]]) -> int:
+    """
+    Number of frame times a frame is held for.
+    """
+    return getattr(frame, "duration", 1)
+
+
+def unchanged(frame: List[Tuple[int, ...]]) -> bool:
+    """
+    Whether a frame is the NO_CHANGE placeholder of a diff without
+    changes, which leaves the display as it is rather than clearing
+    pixel 0.
+
+    A diff that only turns pixel 0 black looks the same in the JSON
+    output, and is taken as a repeat of the previous frame too.
+    """
+    return (len(frame) == 1 and not is_key(frame)
+            and tuple(frame[0]) in NO_CHANGE)
+
+
+def _color_span(entries: List[Tuple[int, ...]]) -> Tuple[int, ...]:
+    """
+    (start, length, colors...) span of consecutive entries.
+    """
+    return (entries[0][0], len(entries)) + tuple(c for entry in entries
+                                                 for c in entry[1:])
+
+
+def _split_run(run: List[Tuple[int, ...]]) -> List[Tuple[int, ...]]:
+    """
+    Split a run of consecutive entries into solid and color spans.
+    """
+    spans: List[Tuple[int, ...]] = []
+    pending: List[Tuple[int, ...]] = []
+    i = 0
+    while i < len(run):
+        j = i + 1
+        while j < len(run) and run[j][1:] == run[i][1:]:
+            j += 1
+        if j - i >= MIN_SOLID_SPAN or j - i == len(run):
+            if pending:
+                spans.append(_color_span(pending))
+                pending = []
+            spans.append((run[i][0], j - i) + tuple(run[i][1:]))
+        else:
+            pending.extend(run[i:j])
+        i = j
+    if pending:
+        spans.append(_color_span(pending))
+    return spans
+
+
+def to_spans(frame: List[Tuple[int, ...]]) -> List[Tuple[int, ...]]:
+    """
+    Group a frame's (index, b, g, r) entries into spans.
+
+    Entries with consecutive indices become one (start, length, b, g, r,
+    b, g, r, ...) span holding a color per pixel. Stretches of a single
+    color become (start, length, b, g, r) solid spans. The two are told
+    apart by size, and a one-pixel span reads the same either way.
+    Palette frames of (index, p) entries group the same way, with one
+    value per color.
+
+    Args:
+        frame: Entries sorted by index, as produced by the comparator
+
+    Returns:
+        List of spans
+    """
+    spans: List[Tuple[int, ...]] = []
+    run: List[Tuple[int, ...]] = []
+    for entry in frame:
+        if run and entry[0] != run[-1][0] + 1:
+            spans.extend(_split_run(run))
+            run = []
+        run.append(entry)
+    if run:
+        spans.extend(_split_run(run))
+    return spans
+
+
+def expand(frame: Iterable[Tuple[int, ...]],
+           palette: Optional[List[Tuple[int, int, int]]] = None
+           ) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Yield (index, b, g, r) for every pixel of a frame in either layout.
+
+    Args:
+        frame: Pixel entries or spans
+        palette: Palette the frame's colors index into, if any
+    """
+    width = 3 if palette is None else 1
+    for entry in frame:
+        if len(entry) == 1 + width:
+            pixels = ((entry[0], entry[1:]),)
+        else:
+            start, length = entry[0], entry[1]
+            solid = len(entry) == 2 + width
+            pixels = ((start + n, entry[2:2+width] if solid
+                       else entry[2+width*n:2+width*(n+1)])
+                      for n in range(length))
+        for index, color in pixels:
+            if palette is not None:
+                color = palette[color[0]]
+            yield (index, color[0], color[1], color[2])
+
+
+def encode_frame(frame: List[Tuple[int, int, int, int]],
+                 encoding: Optional[Encoding],
+                 lookup: Optional[Dict[Tuple[int, int, int], int]] = None
+                 ) -> List[Tuple[int, ...]]:
+    """
+    Convert a frame of (index, b, g, r) entries to the output layout.
+
+    Args:
+        frame: Frame from the comparator
+        encoding: Encoding options
+        lookup: Palette index of each color, for palette encoding
+    """
+    encoded = frame
+    if lookup is not None:
+        encoded = [(i, lookup[(b, g, r)]) for i, b, g, r in encoded]
+    if encoding is not None and encoding.spans:
+        encoded = to_spans(encoded)
+    if encoded is frame or not isinstance(frame, Frame):
+        return encoded
+    return Frame(encoded, frame.key, frame.duration)
+
+
+def count_colors(FRAMES: 'MatLike',
+                 counts: Optional[Dict[Tuple[int, int, int], int]] = None
+                 ) -> Dict[Tuple[int, int, int], int]:
+    """
+    Count how often each color appears in a stack of realigned frames.
+
+    Args:
+        FRAMES: (..., 3) array of BGR values
+        counts: Counts to add to, for frames seen one at a time
+
+    Returns:
+        {(b, g, r): pixel count}
+    """
+    counts = {} if counts is None else counts
+    colors, found = unique(asarray(FRAMES).reshape(-1, 3), axis=0,
+                           return_counts=True)
+    for color, n in zip(map(tuple, colors.tolist()), found.tolist()):
+        counts[color] = counts.get(color, 0) + n
+    return counts
+
+
+def _nearest(colors: 'MatLike', centers: 'MatLike') -> 'MatLike':
+    """
+    Index of the nearest center for each color.
+    """
+    colors = asarray(colors, dtype=float32)
+    centers = asarray(centers, dtype=float32)
+    distances = ((centers ** 2).sum(axis=1)[None, :]
+                 - 2 * colors @ centers.T)
+    return distances.argmin(axis=1)
+
+
+def build_palette(counts: Dict[Tuple[int, int, int], int],
+                  size: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """
+    Choose the palette for an animation.
+
+    Black is always entry 0, since it is what pixels are cleared to.
+    When the animation has more colors than fit, the rest are reduced
+    with a few rounds of k-means weighted by how often each color
+    appears, starting from the most common colors.
+
+    Args:
+        counts: Color counts from `count_colors`
+        size: Largest palette allowed, from 2 (black and one color) to
+            MAX_PALETTE (0 or None for MAX_PALETTE)
+
+    Returns:
+        List of (b, g, r) colors
+
+    Raises:
+        ValueError: If size is out of range
+    """
+    if size and not 2 <= size <= MAX_PALETTE:
+        raise ValueError(f"Palette size must be 0 or 2-{MAX_PALETTE}, got {size}")
+    limit = size or MAX_PALETTE
+    others = sorted((c for c in counts if c != BLACK),
+                    key=lambda c: (-counts[c], c))
+    if len(others) < limit:
+        return [BLACK] + others
+
+    colors = asarray(others, dtype=float32)
+    weights = asarray([counts[c] for c in others], dtype=float32)
+    centers = colors[:limit - 1].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        labels = _nearest(colors, centers)
+        sums = zeros(centers.shape, dtype=float32)
+        add.at(sums, labels, colors * weights[:, None])
+        totals = bincount(labels, weights, minlength=len(centers))
+        used = totals > 0
+        centers[used] = sums[used] / totals[used, None]
+
+    quantized = rint(centers).clip(0, 255).astype(int).tolist()
+    return [BLACK] + [c for c in dict.fromkeys(map(tuple, quantized))
+                      if c != BLACK]
+
+
+def quantize(FRAMES: 'MatLike',
+             palette: List[Tuple[int, int, int]]) -> 'MatLike':
+    """
+    Replace every pixel with the nearest palette color.
+
+    Args:
+        FRAMES: (..., 3) array of BGR values
+        palette: List of (b, g, r) colors
+
+    Returns:
+        Array of the same shape holding only palette colors
+    """
+    FRAMES = asarray(FRAMES)
+    colors, inverse = unique(FRAMES.reshape(-1, 3), axis=0,
+                             return_inverse=True)
+    table = asarray(palette, dtype=uint8)
+    mapped = table[_nearest(colors, table)]
+    return mapped[inverse.reshape(-1)].reshape(FRAMES.shape)
+
+
+def color_distance(a: 'MatLike',
+                   b: 'MatLike',
+                   perceptual: bool = False) -> 'MatLike':
+    """
+    Distance between BGR colors, in 0-255 channel units.
+
+    By default this is the largest difference in any one channel.
+    The perceptual metric is the "redmean" weighted distance, which
+    counts green changes most and blue least, scaled so a change of d
+    in every channel measures about d.
+
+    Args:
+        a, b: (..., 3) arrays of BGR values
+        perceptual: Use the weighted metric
+
+    Returns:
+        (...) array of distances
+    """
+    delta = asarray(a, dtype=int16) - asarray(b, dtype=int16)
+    if not perceptual:
+        return abs(delta).max(axis=-1)
+
+    rmean = (asarray(a, dtype=float32)[..., 2]
+             + asarray(b, dtype=float32)[..., 2]) / 2
+    # Squares of full-range deltas do not fit in int16
+    delta = delta.astype(float32)
+    db, dg, dr = delta[..., 0], delta[..., 1], delta[..., 2]
+    return sqrt((2 + rmean / 256) * dr * dr + 4 * dg * dg
+                + (2 + (255 - rmean) / 256) * db * db) / 3
+
+
+def apply_tolerance(FRAMES: 'MatLike',
+                    tolerance: int,
+                    perceptual: bool = False,
+                    shown: Optional['MatLike'] = None) -> 'MatLike':
+    """
+    Drop pixel changes too small to matter.
+
+    Each frame is compared with what is on the display at that point,
+    rather than with the previous source frame, and pixels within
+    tolerance keep their displayed color. The error between display
+    and source is therefore never more than the tolerance, however
+    many small changes pile up.
+
+    Args:
+        FRAMES: (N, P, 3) stack of realigned frames
+        tolerance: Largest change left out
+        perceptual: Measure changes with the perceptual metric
+        shown: (P, 3) frame on the display before the first one.
+            Defaults to a blank display.
+
+    Returns:
+        The frames as they will be displayed
+    """
+    out = asarray(FRAMES).copy()
+    previous = zeros_like(out[0]) if shown is None else shown
+    for frame in out:
+        keep = color_distance(frame, previous, perceptual) <= tolerance
+        frame[keep] = previous[keep]
+        previous = frame
+    return out
+
+
+def count_writes(FRAMES: 'MatLike',
+                 shown: Optional['MatLike'] = None) -> int:
+    """
+    Number of pixel writes needed to play a frame stack as diffs.
+    """
+    FRAMES = asarray(FRAMES)
+    previous = zeros_like(FRAMES[:1]) if shown is None else shown[None]
+    before = concatenate((previous, FRAMES[:-1]))
+    return int((FRAMES != before).any(axis=-1).sum())
+
+
+def output_levels(encoding: Encoding) -> Optional['MatLike']:
+    """
+    Table mapping each source channel level to the level stored for it.
+
+    The device shows a stored level v at brightness b as int(v * b).
+    With a single brightness the table holds exactly those LED levels,
+    so a player can write them as they are. With a brightness range it
+    holds, for each source level, the lowest level the LEDs show the
+    same way at every brightness in the range; levels only merge when
+    no brightness in the range could tell them apart.
+
+    Args:
+        encoding: Encoding with the brightness and gamma to target
+
+    Returns:
+        (256,) uint8 array, or None if levels are kept as they are
+    """
+    if encoding.brightness is None and encoding.gamma == 1.0:
+        return None
+
+    levels = rint(255 * (arange(256) / 255) ** encoding.gamma)
+    if encoding.brightness is None:
+        return levels.astype(uint8)
+
+    baked = encoding.baked()
+    if baked is not None:
+        return (levels * baked).astype(uint8)
+
+    # int(v * b) only changes where v * b crosses an integer, so every
+    # brightness in the range acts like one of these crossings or a
+    # brightness between two of them.
+    low, high = encoding.brightness, encoding.max_brightness
+    points = sorted({low, high} | {k / v for v in range(1, 256)
+                                   for k in range(ceil(v * low), floor(v * high) + 1)})
+    points = asarray(points)
+    samples = concatenate((points, (points[1:] + points[:-1]) / 2))
+    shown = (levels[:, None] * samples[None, :]).astype(int16)
+    _, first, inverse = unique(shown, axis=0, return_index=True,
+                               return_inverse=True)
+    return levels[first][inverse.reshape(-1)].astype(uint8)
+
+
+def palette_lookup(palette: List[Tuple[int, int, int]]
+                   ) -> Dict[Tuple[int, int, int], int]:
+    """
+    Palette index of each palette color.
+    """
+    return {tuple(color): n for n, color in enumerate(palette)}
+
+
+def frame_types(frames: Iterable[List[Tuple[int, int, int, int]]]
+                ) -> List[str]:
+    """
+    Per-frame "full"/"diff" types, as stored in the metadata.
+    """
+    return ["full" if is_key(frame) else "diff" for frame in frames]
+
+
+def play(frames: Iterable[List[Tuple[int, int, int, int]]],
+         total_pixels: int,
+         palette: Optional[List[Tuple[int, int, int]]] = None
+         ) -> Iterator['MatLike']:
+    """
+    Reference decoder: apply frames to a blank display in turn.
+
+    Args:
+        frames: Encoded frames, as pixel entries or spans
+        total_pixels: Number of LEDs on the strip
+        palette: Palette the frames index into, if any
+
+    Yields:
+        (total_pixels, 3) array of BGR values after each frame. Held
+        frames are yielded once per frame time.
+    """
+    display = zeros((total_pixels, 3), dtype=uint8)
+    for frame in frames:
+        if is_key(frame):
+            display[:] = 0
+        if not unchanged(frame):
+            for i, b, g, r in expand(frame, palette):
+                display[i] = (b, g, r)
+        for _ in range(duration(frame)):
+            yield display.copy()
@@ -1,8 +1,24 @@
-import pygame
 from tvlib._config import MatLike
-from numpy import array, uint8
-from typing import Tuple
-from cv2 import cvtColor, COLOR_RGB2BGR
+from numpy import uint8, empty, memmap
+from hashlib import sha256
+from os import path
+from typing import Optional, Tuple
+import logging
+
+try:
+    from cv2 import imread, imdecode, IMREAD_COLOR
+except ImportError:
+    logging.warning("OpenCV not available. Sprite sheets cannot be loaded.")
+    def imread(path: str):
+        """Fallback imread function."""
+        logging.error(f"Cannot load image {path} - OpenCV not available")
+        return None
+    imdecode = lambda buf, flags: None
+    IMREAD_COLOR = 1
+
+# Sheets from this size on are decoded straight from a memory map of
+# the file instead of a copy of it
+SHEET_MMAP_SIZE: int = 1 << 24
 
 
 def _filter_pixels(arr: MatLike, value: int) -> MatLike:
@@ -10,15 +26,96 @@ def _filter_pixels(arr: MatLike, value: int) -> MatLike:
     Given a List of 3D numpy arrays representing images,
     filter out all images that are completely a single value
     """
-    return array([img for img in arr if not (img == value).all()],
-                 dtype=uint8)
+    if len(arr) == 0:
+        return arr
+    blank = (arr == value).reshape(len(arr), -1).all(axis=1)
+    return arr[~blank]
+
+
+def load_sheet(file: str) -> Optional[MatLike]:
+    """
+    Decode a sprite sheet image to BGR, or None if it cannot be read.
+
+    Large sheets are memory-mapped and decoded in place, so the
+    encoded file is never copied onto the heap.
+    """
+    try:
+        if path.getsize(file) >= SHEET_MMAP_SIZE:
+            return imdecode(memmap(file, dtype=uint8, mode='r'), IMREAD_COLOR)
+    except (OSError, ValueError):
+        return None
+    return imread(file)
+
+
+def slice_sheet(sheet: MatLike, size: Tuple[int, int]) -> MatLike:
+    """
+    Cut a sprite sheet into its tiles, row by row.
+
+    The grid is cut with one reshape and transpose, so the tiles are
+    copied out of the sheet in a single pass. Partial tiles at the
+    right and bottom edges are dropped.
+
+    Args:
+        sheet: (height, width, 3) image
+        size: The width and height of each sprite
+
+    Returns:
+        (N, height, width, 3) array of tiles
+    """
+    width, height = size
+    rows = sheet.shape[0] // height
+    columns = sheet.shape[1] // width
+    if rows == 0 or columns == 0:
+        return empty((0, height, width, 3), dtype=uint8)
+
+    grid = sheet[:rows * height, :columns * width]
+    return (grid.reshape(rows, height, columns, width, -1)
+                .swapaxes(1, 2)
+                .reshape(rows * columns, height, width, -1))
+
+
+def trim_tiles(tiles: MatLike, value: int = 0) -> MatLike:
+    """
+    Drop the tiles that are completely a single value from the end of
+    a sheet, such as the unused cells of its last row. Blank tiles
+    between sprites are kept.
+    """
+    if len(tiles) == 0:
+        return tiles
+    blank = (tiles == value).reshape(len(tiles), -1).all(axis=1)
+    used = len(blank)
+    while used and blank[used - 1]:
+        used -= 1
+    return tiles[:used]
+
+
+def unique_tiles(tiles: MatLike) -> Tuple[MatLike, MatLike]:
+    """
+    Find the distinct tiles of a sheet by hashing their pixels.
+
+    Returns:
+        (distinct tiles in order of first use, index into them of every tile)
+    """
+    seen = {}
+    first = []
+    order = empty(len(tiles), dtype=int)
+    for n, tile in enumerate(tiles):
+        digest = sha256(tile.tobytes()).digest()
+        if digest not in seen:
+            seen[digest] = len(first)
+            first.append(n)
+        order[n] = seen[digest]
+    return tiles[first], order
 
 
 def sprite_to_array(size: Tuple[int, int],
                     file: str,
-                    background_value: int = 0) -> MatLike:
+                    background_value: int = 0) -> Optional[MatLike]:
     """
     Converts a sprite sheet into an array of individual sprites.
+
+    The sheet is read with OpenCV, so no display is needed.
+
     Args:
         size (Tuple[int, int]):
             The width and height of each sprite.
@@ -30,24 +127,13 @@ def sprite_to_array(size: Tuple[int, int],
             The value to use for background pixels. Defaults to 0.
 
     Returns:
-        MatLike: A numpy array containing the individual sprites.
+        MatLike: A numpy array containing the individual BGR sprites,
+        or None if the sheet could not be read.
     """
+    sheet = load_sheet(file)
+    if sheet is None:
+        logging.error(f"Could not read sprite sheet {file}")
+        return None
 
-    width, height = size
-    sprites = []
-
-    pygame.display.set_mode(size)
-    sheet = pygame.image.load(file)
-    sheet_rect = sheet.get_rect()
-
-    for y in range(0, sheet_rect.height - height + 1, height):
-        for x in range(0, sheet_rect.width - width + 1, width):
-            rect = pygame.Rect(x, y, width, height)
-            img = sheet.subsurface(rect)
-            imgdata = pygame.surfarray.array3d(img)
-            imgdata = imgdata.swapaxes(0, 1)
-            imgdata = cvtColor(imgdata, COLOR_RGB2BGR)
-            sprites.append(imgdata)
-
-    return _filter_pixels(array(sprites, dtype=uint8),
+    return _filter_pixels(slice_sheet(sheet, size),
                           value=background_value)
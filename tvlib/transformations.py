@@ -1,7 +1,15 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Union, Any, Optional
 from enum import Enum
-from functools import partial
+from functools import partial, lru_cache
+
+try:
+    from numpy import arange, clip, einsum, float32, maximum, minimum, rint, uint8
+except ImportError:
+    # Resampling needs NumPy; the enums below do not
+    arange = clip = einsum = maximum = minimum = rint = None
+    float32 = float
+    uint8 = int
 
 try:
     from cv2 import (ROTATE_90_COUNTERCLOCKWISE, ROTATE_180, ROTATE_90_CLOCKWISE,
@@ -21,7 +29,7 @@ except ImportError:
         return image
 
 if TYPE_CHECKING:
-    from tvlib._config import MatLike, UMat
+    from tvlib._config import MatLike, UMat, NDArray
 
 # Type aliases for better readability
 ImageType = Union['MatLike', 'UMat']
@@ -44,6 +52,45 @@ def nothing(image: ImageType,
     return image
 
 
+@lru_cache(maxsize=None)
+def _area_weights(src: int, dst: int) -> 'NDArray':
+    """
+    Build the (dst, src) area-averaging matrix for one axis.
+
+    Row i holds the fraction of output pixel i covered by each source
+    pixel, so multiplying by it averages the source pixels under each
+    output pixel. The matrix only depends on the two sizes and is
+    shared by every frame resampled between them.
+    """
+    edges = arange(dst + 1) * (src / dst)
+    pos = arange(src)
+    overlap = clip(minimum(edges[1:, None], pos[None, :] + 1)
+                   - maximum(edges[:-1, None], pos[None, :]), 0, None)
+    weights = (overlap / overlap.sum(axis=1, keepdims=True)).astype(float32)
+    weights.setflags(write=False)
+    return weights
+
+
+def resample(images: 'MatLike', tw: int, th: int) -> 'MatLike':
+    """
+    Area-average a stack of images to the target size in one batched pass.
+
+    Args:
+        images: (N, h, w, c) array of images
+        tw: Target width
+        th: Target height
+
+    Returns:
+        (N, th, tw, c) uint8 array
+    """
+    _, height, width, _ = images.shape
+    wy = _area_weights(height, th)
+    wx = _area_weights(width, tw)
+    out = einsum('yh,nhwc,xw->nyxc', wy, images.astype(float32), wx,
+                 optimize=True)
+    return rint(out).clip(0, 255).astype(uint8)
+
+
 class Rotation(Enum):
     """
     An enumeration representing different rotation transformations.
@@ -68,6 +115,9 @@ class Rotation(Enum):
 
         __call__(self, *args):
             Calls the partial function associated with the enumeration value.
+
+        __reduce_ex__(self, protocol):
+            Pickles the member by name so it survives process boundaries.
     """
 
     ROTATE_90 = partial(mapped_rotate, rot=ROTATE_90_COUNTERCLOCKWISE)
@@ -82,6 +132,11 @@ class Rotation(Enum):
     def __call__(self, *args: Any) -> Any:
         return self.value(*args)
 
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # Pickle by name: the partial values compare by identity,
+        # so a by-value lookup would fall through to NONE.
+        return getattr, (self.__class__, self.name)
+
 
 class Flip(Enum):
     """
@@ -108,6 +163,9 @@ class Flip(Enum):
 
         __call__(self, *args):
             Calls the partial function associated with the Flip member.
+
+        __reduce_ex__(self, protocol):
+            Pickles the member by name so it survives process boundaries.
     """
     VERTICAL_FLIP = partial(mapped_flip, flp=1)
     HORIZONTAL_FLIP = partial(mapped_flip, flp=0)
@@ -120,3 +178,8 @@ class Flip(Enum):
 
     def __call__(self, *args: Any) -> Any:
         return self.value(*args)
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # Pickle by name: the partial values compare by identity,
+        # so a by-value lookup would fall through to NONE.
+        return getattr, (self.__class__, self.name)